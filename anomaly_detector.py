@@ -3,10 +3,11 @@
 
 from sklearn.ensemble import IsolationForest
 import numpy as np
-from scapy.all import IP, TCP, UDP
 import joblib
 import json
 import os
+import threading
+import time
 
 class AnomalyDetector:
     def __init__(self, n_packets_to_train=1000):
@@ -14,6 +15,7 @@ class AnomalyDetector:
         Khởi tạo mô hình AI.
         contamination='auto' để AI tự quyết định ngưỡng.
         n_packets_to_train: (MỚI) Nhận từ file config.
+            (MỚI) None: không tự huấn luyện, chờ mô hình từ nơi khác (use_model), vd: tiến trình con của AnalysisWorkerPool.
         """
         self.model = IsolationForest(contamination='auto', random_state=42)
         
@@ -25,36 +27,25 @@ class AnomalyDetector:
         # Lưu trữ các chỉ số thống kê để giải thích
         self.training_stats = {}
 
-    def _extract_features(self, packet):
-        """Trích xuất đặc trưng từ một gói tin để làm đầu vào cho AI."""
+    def _extract_features(self, view):
+        """Trích xuất đặc trưng từ một gói tin (PacketView) để làm đầu vào cho AI."""
         # Đặc trưng: [Độ dài gói tin, Giao thức, Cổng nguồn, Cổng đích]
-        length = len(packet)
-        proto = 0
-        sport = 0
-        dport = 0
-
-        if packet.haslayer(IP):
-            proto = packet[IP].proto
-            if packet.haslayer(TCP):
-                sport = packet[TCP].sport
-                dport = packet[TCP].dport
-            elif packet.haslayer(UDP):
-                sport = packet[UDP].sport
-                dport = packet[UDP].dport
-        
-        return [length, proto, sport, dport]
+        # (CẬP NHẬT) Đọc thẳng từ PacketView đã giải mã sẵn, không tra cứu lại các lớp scapy
+        return view.features()
 
-    def process_packet(self, packet):
+    def process_packet(self, view):
         """
-        Xử lý từng gói tin. Thu thập, huấn luyện, và sau đó dự đoán.
+        Xử lý từng gói tin (PacketView). Thu thập, huấn luyện, và sau đó dự đoán.
         Trả về:
             None: Nếu đang trong giai đoạn huấn luyện.
             1: Gói tin bình thường.
             -1: Gói tin bất thường (anomaly).
         """
-        features = self._extract_features(packet)
+        features = self._extract_features(view)
 
         if not self.is_trained:
+            if self.n_packets_to_train is None:
+                return None
             self.packet_buffer.append(features)
             # Nếu đã đủ gói tin để huấn luyện
             if len(self.packet_buffer) >= self.n_packets_to_train:
@@ -65,6 +56,30 @@ class AnomalyDetector:
             prediction = self.model.predict(np.array(features).reshape(1, -1))
             return prediction[0]
 
+    def predict_many(self, features_batch):
+        """(MỚI) Dự đoán cả một lô đặc trưng bằng MỘT lần gọi model.predict (vector hóa)."""
+        return self.model.predict(np.asarray(features_batch, dtype=np.float64))
+
+    def process_batch(self, features_batch):
+        """
+        (MỚI) Phiên bản theo lô của process_packet.
+        Trả về list dự đoán theo ĐÚNG thứ tự đầu vào (None cho các gói dùng để huấn luyện).
+        """
+        n = len(features_batch)
+        predictions = [None] * n
+        i = 0
+        if self.n_packets_to_train is None and not self.is_trained:
+            return predictions
+        # Phần đầu lô có thể vẫn thuộc giai đoạn huấn luyện
+        while i < n and not self.is_trained:
+            self.packet_buffer.append([int(v) for v in features_batch[i]])
+            if len(self.packet_buffer) >= self.n_packets_to_train:
+                self.fit_model()
+            i += 1
+        if i < n and self.is_trained:
+            predictions[i:] = self.predict_many(features_batch[i:]).tolist()
+        return predictions
+
     def fit_model(self):
         """Huấn luyện mô hình và tính toán các chỉ số thống kê."""
         try:
@@ -79,7 +94,7 @@ class AnomalyDetector:
             self.training_stats['std'] = np.std(data, axis=0).tolist()
             # Lấy các cổng phổ biến
             ports = data[:, 2:4]
-            common_ports = set(ports[ports > 0].flatten())
+            common_ports = set(ports[ports > 0].flatten().tolist()) # .tolist(): số nguyên Python để lưu được JSON
             # Giữ top 50 cổng phổ biến nhất (ví dụ)
             self.training_stats['common_ports'] = list(common_ports)[:50] 
             
@@ -89,6 +104,12 @@ class AnomalyDetector:
             print(f"[AI LỖI] {e}")
             self.packet_buffer = []
 
+    def use_model(self, model, training_stats):
+        """(MỚI) Dùng mô hình đã huấn luyện ở nơi khác (cùng kết quả với bộ phát hiện đã huấn luyện nó)."""
+        self.model = model
+        self.training_stats = training_stats
+        self.is_trained = True
+
     def explain_anomaly(self, features):
         """Cố gắng giải thích tại sao một gói tin là bất thường."""
         if not self.training_stats:
@@ -148,4 +169,54 @@ class AnomalyDetector:
             except Exception as e:
                 print(f"[AI Lỗi] Không thể tải mô hình: {e}. Sẽ huấn luyện lại.")
                 return False
-        return False
\ No newline at end of file
+        return False
+
+
+class MicroBatcher:
+    """
+    (MỚI) Gom đặc trưng của nhiều gói tin vào bộ đệm NumPy cấp phát sẵn,
+    rồi chấm điểm cả lô khi đầy (batch_size) hoặc khi quá hạn (max_delay giây).
+    on_results(list[(context, prediction)]) được gọi theo đúng thứ tự gói tin đến.
+    """
+    def __init__(self, detector, on_results, batch_size=256, max_delay=0.02, n_features=4):
+        self.detector = detector
+        self.on_results = on_results
+        self.batch_size = max(1, int(batch_size))
+        self.max_delay = max_delay
+
+        self._features = np.zeros((self.batch_size, n_features), dtype=np.float64)
+        self._contexts = [None] * self.batch_size
+        self._count = 0
+        self._first_time = 0.0
+        # Khóa đảm bảo thứ tự khi luồng quét và luồng hẹn giờ cùng xả lô
+        self._lock = threading.Lock()
+
+    def add(self, features, context):
+        with self._lock:
+            if self._count == 0:
+                self._first_time = time.monotonic()
+            self._features[self._count] = features
+            self._contexts[self._count] = context
+            self._count += 1
+            if self._count >= self.batch_size or time.monotonic() - self._first_time >= self.max_delay:
+                self._flush_locked()
+
+    def flush_if_due(self):
+        """Xả lô nếu đã quá hạn (gọi định kỳ khi lưu lượng thưa)."""
+        with self._lock:
+            if self._count and time.monotonic() - self._first_time >= self.max_delay:
+                self._flush_locked()
+
+    def flush(self):
+        """Xả toàn bộ gói tin còn lại (khi dừng quét)."""
+        with self._lock:
+            if self._count:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        n = self._count
+        predictions = self.detector.process_batch(self._features[:n])
+        results = list(zip(self._contexts[:n], predictions))
+        self._contexts[:n] = [None] * n
+        self._count = 0
+        self.on_results(results)
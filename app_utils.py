@@ -18,6 +18,7 @@ STATS_PATH = resource_path("network_stats.json")
 CONFIG_FILE = resource_path("config.json") 
 ICON_FILE = resource_path("my_icon.ico")
 FONT_DIR = resource_path("fonts")
+SESSION_DIR = resource_path("sessions")
 
 # --- TỪ ĐIỂN DỊCH THUẬT GÓI TIN ---
 TRANSLATION_MAP = {
@@ -42,7 +43,32 @@ TRANSLATION_MAP = {
 
 # --- LỊCH SỬ PHIÊN BẢN ---
 VERSION_HISTORY = {
-    "16.2": "Ổn định hóa & Fix lỗi (Hiện tại)\n- Sửa lỗi hiển thị biểu đồ không cập nhật khi xuất PDF.\n- Khắc phục lỗi ký tự lạ (Emoji) gây crash trên một số máy Windows.\n- Tinh chỉnh giao diện quét thiết bị.",
+    "16.27": "Số lượng Khác nhau theo Máy (Hiện tại)\n- Tab Thống kê có biểu đồ số IP nguồn khác nhau của mỗi máy đích, số cổng đích khác nhau của mỗi nguồn và số máy đối tác của mỗi máy, cho cửa sổ distinct_window_s giây gần nhất (mặc định 60) hoặc toàn phiên; cũng có trong báo cáo PDF.\n- Ước lượng bằng HyperLogLog (sai số ~3%): bộ nhớ cố định cho mỗi máy, tối đa distinct_keys máy mỗi bảng (mặc định 1024, giữ các máy có số lượng lớn nhất), gộp được giữa các cửa sổ / kho và được lưu cùng file phiên. 1 triệu gói với IP nguồn giả mạo: 4 MiB so với hơn 650 MiB nếu dùng set.\n- Phát hiện quét cổng / quét mạng chỉ kiểm tra bộ đếm của đích / cổng vừa gặp (nhanh hơn nhiều lần khi đang bị quét); đếm đúng tới 64 cổng / máy, vượt thì chuyển sang HyperLogLog (sai số ~3%), nên ngưỡng mặc định vẫn so với số đúng.",
+    "16.26": "Top IP / Cổng Bộ nhớ Cố định\n- Biểu đồ Top 5 IP và Top 5 Dịch vụ/Cổng dùng bản tóm tắt Top-k (Misra-Gries / Space-Saving) tối đa top_capacity mục (mặc định 4096) thay vì Counter có một mục cho mỗi IP / cổng khác nhau.\n- Khi bị quét cổng hoặc ngập gói với IP nguồn giả mạo, bộ nhớ không tăng theo số IP (2 triệu gói giả mạo: dưới 1 KiB so với gần 180 MiB) và mỗi lô 100.000 gói chỉ mất khoảng 11 ms.\n- Số đếm đúng tuyệt đối khi số IP / cổng khác nhau chưa vượt top_capacity; vượt thì biểu đồ ghi sai số tối đa của mỗi cột. Bản tóm tắt gộp được với phần gói đã loại khỏi cửa sổ lưu giữ và được lưu cùng file phiên.",
+    "16.25": "Biểu đồ Dùng lại\n- Các Figure / canvas của Tab Thống kê được tạo một lần và giữ suốt phiên làm việc (ChartManager), cùng dữ liệu đã tổng hợp lần gần nhất.\n- Đổi giao diện sáng / tối chỉ đổi màu các đối tượng vẽ đã có: khoảng 12 ms trên phiên 1 triệu gói tin thay vì hơn 1 giây tổng hợp lại và dựng lại.\n- Chuyển tab, xuất PDF dùng lại dữ liệu và biểu đồ đang hiển thị khi kho gói tin chưa thay đổi; phiên mới chỉ đưa biểu đồ về rỗng.",
+    "16.24": "Lưu lượng theo Thời gian\n- Tab Thống kê có biểu đồ gói tin/giây, byte/giây (chia theo giao thức hoặc phán quyết) và cảnh báo/giây, cộng dồn theo khoảng thời gian cố định khi gói tin đến.\n- Phiên dài: khoảng thời gian tự gộp đôi khi vượt giới hạn và mỗi đường được giảm mẫu bằng LTTB (tối đa 600 điểm), chi phí vẽ không tăng theo độ dài phiên.\n- Phóng to một đoạn bằng thanh công cụ của biểu đồ: chi tiết mịn hơn được tính lại từ kho gói tin qua chỉ mục thời gian (vài ms trên 2 triệu gói); nút 'Xem toàn phiên' để trở lại. Biểu đồ cũng có trong báo cáo PDF.",
+    "16.23": "Thống kê Trực tiếp\n- Bộ đếm giao thức, phán quyết, IP và cổng được cộng dồn khi thêm gói tin (kho cột: theo lô trên phần gói mới), không đếm lại cả phiên.\n- Tab Thống kê dùng được khi đang quét: biểu đồ cập nhật tại chỗ (đổi dữ liệu của cột / miếng bánh rồi draw_idle) mỗi live_stats_ms, không dựng lại Figure.\n- Chi phí mỗi lần làm mới không tăng theo kích thước phiên (khoảng 150 ms so với 630 ms ở 1 triệu gói).",
+    "16.22": "Xử lý Nền sau khi Dừng\n- Sau khi dừng quét hoặc mở phiên: lập chỉ mục cột, lọc danh sách và tổng hợp dữ liệu biểu đồ chạy trên luồng nền, cửa sổ không còn 'Not Responding'.\n- Thanh tiến độ và nút Hủy ở thanh trạng thái; chỉ bước cập nhật danh sách / biểu đồ cuối cùng chạy trên luồng giao diện.\n- Lọc thủ công trong lúc chờ được giữ nguyên (kết quả nền không ghi đè).",
+    "16.21": "Truy vấn Lọc có Chỉ mục\n- Ô tìm kiếm nhận truy vấn dạng ip==10.0.0.5 && dport in 22,3389 && tag==danger && time>12:00:00 (trường ip, src, dst, port, sport, dport, proto, tag, time, len, iface; toán tử == != > >= < <= in; && / || và dấu ngoặc; IP theo CIDR).\n- Truy vấn tra chỉ mục cột (IP, cổng, thời gian) bắt đầu từ điều kiện chọn lọc nhất: dưới 1 ms trên 2 triệu gói tin (quét toàn bộ: khoảng 30 ms); kho phiên SQLite dùng chỉ mục B-tree sẵn có.\n- Chuỗi không phải truy vấn vẫn là tìm kiếm tự do như trước; truy vấn sai cú pháp được báo trên thanh trạng thái.",
+    "16.20": "Hàng đợi Giao diện Theo lô\n- Luồng phân tích gửi bản ghi gói tin về giao diện theo lô (một thông điệp nhiều gói) thay vì từng gói.\n- Giao diện xử lý hàng đợi trong một ngân sách thời gian cố định mỗi lượt rồi trả quyền vẽ lại / nhận thao tác; chu kỳ kiểm tra tự rút ngắn khi còn tồn đọng và giãn ra khi rảnh.\n- Độ trễ thao tác ở 100.000 gói/giây giảm từ vài giây xuống dưới 25 ms.",
+    "16.19": "Danh sách Trực tiếp khi Quét\n- Danh sách gói tin lại được cập nhật ngay trong khi quét: gộp theo lô với số khung hình/giây giới hạn, chỉ hiện N gói mới nhất và tự bám theo cuối danh sách.\n- Khi tốc độ gói vượt ngưỡng cấu hình, tự chuyển sang chỉ hiện cảnh báo (Nguy hiểm / Bất thường) để thấy tấn công ngay mà giao diện không bị treo.\n- Cuộn lên để xem dòng cũ sẽ tạm dừng bám đuôi; cuộn xuống cuối để tiếp tục.",
+    "16.18": "Danh sách Gói tin Ảo\n- Danh sách giám sát chỉ dựng các dòng đang nhìn thấy (cộng một khoảng đệm) thay vì chèn một dòng cho mỗi gói tin; thanh cuộn ánh xạ sang vị trí trong kết quả lọc.\n- Dừng quét hoặc đổi bộ lọc trên phiên hàng triệu gói không còn treo giao diện; bộ nhớ Tk không tăng theo số gói tin.\n- Giữ nguyên cột, màu theo mức độ, sao chép và chọn gói tin.",
+    "16.17": "Cửa sổ Lưu giữ cho Giám sát Liên tục\n- Tùy chọn chỉ giữ gói bình thường trong N phút / N gói gần nhất; mọi gói Nguy hiểm / Bất thường cùng vài gói ngữ cảnh trước và sau được giữ mãi.\n- Gói bị giải phóng được cộng dồn vào bộ đếm trước, nên Tab Thống kê và báo cáo PDF vẫn đúng tổng số của cả phiên.\n- Bộ nhớ giới hạn theo cửa sổ đã cấu hình thay vì tăng theo thời gian chạy.",
+    "16.16": "Lưu & Mở lại Phiên\n- Thêm nút 'Lưu phiên': ghi file pcap (byte tiêu đề của từng gói) kèm file phụ nhị phân (phán quyết, thời điểm, tham chiếu lý do phát hiện) và bảng chuỗi.\n- Thêm nút 'Mở phiên': mở lại phiên bằng ánh xạ bộ nhớ (mmap), không chạy lại phát hiện; mở được cả file phiên SQLite.\n- Hỏi lưu phiên khi đóng chương trình.",
+    "16.15": "Bắt gói Không Giải mã & Tóm tắt Khi Cần\n- Socket bắt gói và trình đọc pcap trả về byte thô (RawFrame) thay vì dựng gói tin scapy cho từng khung; không còn gọi packet.summary() khi bắt gói.\n- Chuỗi tóm tắt được dựng từ byte tiêu đề khi hiển thị, có bộ nhớ đệm LRU cho các dòng đang xem.\n- Tìm kiếm trên các trường: địa chỉ IP, cổng, tên giao thức, giao diện và lý do phát hiện.\n- Chi phí mỗi gói tin trên đường bắt gói giảm khoảng 20 lần.",
+    "16.14": "Chọn Gói tin Tức thì\n- Tra số thứ tự gói tin -> dòng trong kho bằng chỉ mục (O(1), tìm nhị phân khi id không liên tục) thay vì duyệt cả danh sách.\n- Các tầng chi tiết chỉ được giải mã từ byte tiêu đề khi chọn gói tin; khung chi tiết được ghi trong một lần cập nhật.\n- Chọn một gói tin dưới 1 ms kể cả với phiên 1 triệu gói (RAM hoặc SQLite).",
+    "16.13": "Kho Phiên SQLite trên Đĩa\n- Tùy chọn lưu phiên quét vào file SQLite (thư mục sessions/, chế độ WAL) cho phiên Gateway kéo dài nhiều giờ.\n- Một luồng riêng ghi gói tin theo lô trong một giao dịch; có chỉ mục theo thời gian, IP nguồn/đích, cổng và phán quyết.\n- Trong RAM chỉ giữ bộ nhớ đệm nóng các gói mới nhất nên bộ nhớ không tăng theo thời gian; danh sách gói tin, Tab Thống kê và báo cáo PDF truy vấn trực tiếp từ file.\n- Chế độ không giao diện cũng ghi được kho phiên vào thư mục kết quả.",
+    "16.12": "Kho Gói tin Dạng Cột\n- Thay danh sách dict (mỗi gói vài KB) bằng kho dạng cột NumPy: thời gian, IP nguồn/đích (uint32), cổng, giao thức, độ dài, phán quyết; tóm tắt và byte tiêu đề nằm trong bảng phụ.\n- Chi tiết các tầng được giải mã lại từ byte tiêu đề khi chọn gói tin.\n- Danh sách gói tin, Tab Thống kê và báo cáo PDF đọc trực tiếp từ kho; bộ nhớ mỗi gói tin giảm khoảng 7 lần.",
+    "16.11": "Giám sát Nhiều Giao diện\n- Thêm nút 'Nhiều giao diện': bắt gói đồng thời trên nhiều card mạng (ví dụ WAN + LAN), mỗi giao diện một luồng và một bộ đệm riêng, kèm bộ lọc BPF riêng.\n- Các luồng được gộp theo thứ tự thời điểm bắt gói; một giao diện chậm hoặc im lặng không chặn các giao diện khác.\n- Mỗi gói tin ghi nhận giao diện đã bắt được; thanh trạng thái và báo cáo PDF có bộ đếm gói/giây và mất gói theo giao diện.\n- Nút 'Dừng quét' dừng ngay cả khi giao diện không có lưu lượng.",
+    "16.10": "Đồng hồ Thời điểm Bắt gói\n- AI Hành vi (Quét/Lũ lụt) và bản ghi gói tin dùng thời điểm bắt gói (packet.time) thay vì đồng hồ lúc xử lý, giữ độ chính xác micro giây.\n- Phát lại cùng một file pcap ở mọi tốc độ cho cùng kết quả phát hiện.",
+    "16.9": "Bộ đệm Bắt gói & Đếm Mất gói\n- Tách luồng bắt gói và luồng phân tích bằng bộ đệm vòng có giới hạn; dung lượng và chính sách khi đầy (bỏ gói mới / bỏ gói cũ / chờ) cấu hình trong Tab Cài đặt.\n- Thanh trạng thái và phần tóm tắt báo cáo PDF hiển thị số gói bị kernel bỏ (pcap stats), số gói bị bỏ do bộ đệm đầy và mức tồn đọng phân tích.",
+    "16.8": "Chế độ Không Giao diện (Headless)\n- Thêm headless.py: chạy giám sát trên thiết bị Gateway không có màn hình, không cần Tkinter/matplotlib.\n- Đọc config.json, ghi kết quả (verdicts.jsonl) và cảnh báo (alerts.jsonl) dạng JSON Lines, tự xoay vòng file theo dung lượng.\n- AI Hành vi định kỳ dọn các bộ theo dõi đã hết hạn để bộ nhớ ổn định khi chạy nhiều ngày.",
+    "16.7": "Phân tích Đa tiến trình\n- Tách quy trình phát hiện ra detection_pipeline.py để dùng chung.\n- Thêm chế độ đa tiến trình: luồng bắt gói chỉ chia gói tin theo địa chỉ nguồn cho N tiến trình phân tích, mỗi tiến trình có bộ phát hiện riêng và gửi kết quả gọn về giao diện.\n- Cấu hình số tiến trình trong Tab Cài đặt (0 = tắt).",
+    "16.6": "Phân tích Ngoại tuyến (pcap/pcapng)\n- Thêm nút 'Mở file pcap' để chạy toàn bộ quy trình phát hiện trên file bắt gói tin, nhanh nhất có thể hoặc theo hệ số tốc độ cấu hình.\n- Báo cáo tốc độ xử lý (gói/giây) khi phát lại xong.\n- Không có quyền Admin vẫn mở được chương trình để phân tích file pcap.",
+    "16.5": "Giải mã Gói tin Một lần (PacketView)\n- Thêm packet_view.py: giải mã tiêu đề Ethernet, ARP, IPv4, TCP, UDP, ICMP trực tiếp từ byte thô bằng struct.\n- AI Thống kê, AI Hành vi, Phân tích Quy tắc và Chi tiết gói tin dùng chung một PacketView thay vì tra cứu lớp scapy nhiều lần.",
+    "16.4": "Lọc Mục tiêu trong Kernel (BPF)\n- Các IP mục tiêu chọn từ 'Quét thiết bị' được biên dịch thành bộ lọc BPF (gồm cả ARP), gói tin không liên quan bị loại ngay trong kernel.\n- Thêm tùy chọn Snaplen trong Tab Cài đặt để chỉ bắt phần tiêu đề gói tin.",
+    "16.3": "Dự đoán AI theo lô (Micro-batching)\n- AI Thống kê gom đặc trưng của nhiều gói tin vào bộ đệm NumPy và dự đoán một lần cho cả lô (mặc định 256 gói hoặc 20 ms).\n- Kết quả vẫn được trả về theo đúng thứ tự gói tin. Thêm mục 'Hiệu năng' trong Tab Cài đặt.",
+    "16.2": "Ổn định hóa & Fix lỗi\n- Sửa lỗi hiển thị biểu đồ không cập nhật khi xuất PDF.\n- Khắc phục lỗi ký tự lạ (Emoji) gây crash trên một số máy Windows.\n- Tinh chỉnh giao diện quét thiết bị.",
     "16.1": "Sửa lỗi Giao diện & Icon\n- Cập nhật icon cho cửa sổ quét thiết bị.\n- Sửa lỗi cú pháp trong bộ lọc tìm kiếm.",
     "16.0": "Network Discovery (Hiện tại)\n- Thêm tính năng 'Quét thiết bị LAN' (ARP Scan).\n- Cho phép người dùng chọn các IP mục tiêu cụ thể để giám sát, giúp giảm tải và tập trung vào các máy quan trọng.",
     "15.1": "Phân loại Mối đe dọa (Red/Yellow)\n- Tách biệt khái niệm 'Nguy hiểm' (Đỏ - Tấn công rõ ràng) và 'Bất thường' (Vàng - Nghi vấn thống kê).\n- Cập nhật logic lọc, hiển thị màu sắc trên giao diện và trong báo cáo PDF.",
@@ -1,14 +1,52 @@
 # file: behavioral_analyzer.py
 # -*- coding: utf-8 -*-
 
-import time
-from scapy.all import IP, TCP, UDP 
+import bisect
+import ipaddress
+
+from packet_view import ipv4_to_int
+from sketches import HyperLogLog
+
+# (MỚI) Số cổng / máy khác nhau mà mỗi nguồn đã quét: đếm đúng bằng set tới SCAN_EXACT_LIMIT giá trị, vượt thì chuyển
+# sang HyperLogLog 2^10 thanh ghi (tối đa 1 KiB mỗi đích / cổng dù bị quét bao nhiêu, sai số chuẩn ~3,3 %).
+# Ngưỡng quét <= SCAN_EXACT_LIMIT (mặc định 20 / 40) luôn được so với số đúng (bộ đếm được reset khi báo động).
+SCAN_EXACT_LIMIT = 64
+SCAN_SKETCH_PRECISION = 10
+
+
+def _host_value(addr):
+    # Số nguyên của địa chỉ máy cho HyperLogLog: IPv4 32 bit, IPv6 128 bit gộp (XOR) còn 64 bit
+    if ':' not in addr:
+        return ipv4_to_int(addr)
+    try:
+        value = int(ipaddress.ip_address(addr))
+    except ValueError:
+        return 0
+    return (value >> 64) ^ (value & 0xFFFFFFFFFFFFFFFF)
+
+
+def _add_distinct(counters, key, value, to_int=int):
+    """Thêm value vào bộ đếm khác nhau của key (set, hoặc HyperLogLog khi vượt SCAN_EXACT_LIMIT). Trả về (mới, số lượng)."""
+    counter = counters.get(key)
+    if counter is None:
+        counter = counters[key] = set()
+    if isinstance(counter, HyperLogLog):
+        return counter.add(to_int(value)), round(counter.count())
+    if value in counter:
+        return False, len(counter)
+    counter.add(value)
+    if len(counter) > SCAN_EXACT_LIMIT:
+        sketch = counters[key] = HyperLogLog(SCAN_SKETCH_PRECISION)
+        for item in counter:
+            sketch.add(to_int(item))
+    return True, len(counter)
+
 
 class BehavioralAnalyzer:
     def __init__(self, 
                  portscan_count=20, portscan_window=10,
                  hostscan_count=20, hostscan_window=10,
-                 flood_count=500, flood_window=2):
+                 flood_count=500, flood_window=2, floods=True):
         
         self.portscan_count = portscan_count
         self.portscan_window = portscan_window
@@ -16,31 +54,46 @@ class BehavioralAnalyzer:
         self.hostscan_window = hostscan_window
         self.flood_count = flood_count
         self.flood_window = flood_window
+        # (MỚI) False: không kiểm tra Lũ lụt trong process_packet (tiến trình con của AnalysisWorkerPool chỉ thấy
+        # một phần gói tin của mỗi đích; tiến trình chính kiểm tra trên mọi bản ghi bằng check_flood)
+        self.floods = floods
 
         # Bộ theo dõi (Chỉ lưu timestamp, không lưu trạng thái "đã phát hiện" vĩnh viễn)
         self.scan_tracker = {}
         self.flood_tracker = {}
         print("[Hành vi] Khởi tạo với chế độ Báo động Định kỳ (Periodic Alert).")
 
+    @classmethod
+    def from_config(cls, config, floods=True):
+        """(MỚI) Tạo bộ phân tích từ dict cấu hình (config.json)."""
+        return cls(portscan_count=config.get('portscan_count', 20), portscan_window=config.get('portscan_window', 10),
+                   hostscan_count=config.get('hostscan_count', 20), hostscan_window=config.get('hostscan_window', 10),
+                   flood_count=config.get('flood_count', 500), flood_window=config.get('flood_window', 2), floods=floods)
+
     def reset(self):
         """Xóa bộ nhớ khi bắt đầu phiên quét mới."""
         self.scan_tracker = {}
         self.flood_tracker = {}
         print("[Hành vi] Đã xóa bộ nhớ theo dõi.")
 
-    def _check_floods(self, packet, current_time):
-        if not packet.haslayer(IP):
+    def prune(self, current_time):
+        """
+        (MỚI) Xóa các bộ theo dõi đã hết hạn cửa sổ thời gian.
+        Gọi định kỳ khi chạy lâu dài (chế độ không giao diện) để bộ nhớ không tăng theo số nguồn/đích đã gặp.
+        """
+        scan_window = max(self.portscan_window, self.hostscan_window)
+        for src_ip in [ip for ip, t in self.scan_tracker.items() if current_time - t['first_seen'] > scan_window]:
+            del self.scan_tracker[src_ip]
+        for key in [k for k, ts in self.flood_tracker.items() if not ts or ts[-1] < current_time - self.flood_window]:
+            del self.flood_tracker[key]
+
+    def _check_floods(self, view, current_time):
+        if not view.has_ip:
             return None
-            
-        dst_ip = packet[IP].dst
-        proto = packet[IP].proto
-        dst_port = 0
-        
-        if packet.haslayer(TCP):
-            dst_port = packet[TCP].dport
-        elif packet.haslayer(UDP):
-            dst_port = packet[UDP].dport
-            
+        return self.check_flood(view.dst, view.proto, view.dport, current_time) # dport: 0 nếu không phải TCP/UDP
+
+    def check_flood(self, dst_ip, proto, dst_port, current_time):
+        """(MỚI) Kiểm tra Lũ lụt cho một gói IP tới (dst_ip, proto, dst_port) tại current_time (không cần PacketView)."""
         target_key = (dst_ip, proto, dst_port)
 
         # (THAY ĐỔI) Không kiểm tra 'if target_key in self.detected_floods' nữa
@@ -50,15 +103,19 @@ class BehavioralAnalyzer:
             self.flood_tracker[target_key] = []
             
         timestamps = self.flood_tracker[target_key]
-        timestamps.append(current_time)
+        # (CẬP NHẬT) Giữ danh sách theo thứ tự thời điểm: bản ghi có thể tới không theo thứ tự
+        # (luồng thu gom của nhiều tiến trình phân tích, gộp nhiều giao diện)
+        bisect.insort(timestamps, current_time)
+        
+        # Xóa các gói tin cũ quá cửa sổ thời gian (tính từ gói mới nhất)
+        del timestamps[:bisect.bisect_left(timestamps, timestamps[-1] - self.flood_window)]
         
-        # Xóa các gói tin cũ quá cửa sổ thời gian
+        # Số gói trong cửa sổ kết thúc tại gói này (gói tới trễ không được đếm cùng các gói mới hơn nó)
         window_start_time = current_time - self.flood_window
-        while timestamps and timestamps[0] < window_start_time:
-            timestamps.pop(0)
+        count = bisect.bisect_right(timestamps, current_time) - bisect.bisect_left(timestamps, window_start_time)
             
         # Nếu vượt ngưỡng -> Báo động & Reset bộ đếm ngay lập tức
-        if len(timestamps) > self.flood_count:
+        if count > self.flood_count:
             # Reset bộ đếm để bắt đầu chu kỳ mới (tránh spam từng gói một)
             self.flood_tracker[target_key] = [] 
             
@@ -71,16 +128,13 @@ class BehavioralAnalyzer:
             
         return None
 
-    def _check_scans(self, packet, current_time):
-        if not packet.haslayer(IP):
+    def _check_scans(self, view, current_time):
+        if not view.has_ip:
             return None
             
-        src_ip = packet[IP].src
-        dst_ip = packet[IP].dst
-        dst_port = 0
-        
-        if packet.haslayer(TCP): dst_port = packet[TCP].dport
-        elif packet.haslayer(UDP): dst_port = packet[UDP].dport
+        src_ip = view.src
+        dst_ip = view.dst
+        dst_port = view.dport
         
         # (THAY ĐỔI) Tương tự, bỏ qua kiểm tra 'detected_scans'
 
@@ -99,51 +153,53 @@ class BehavioralAnalyzer:
             tracker['ports_targeted'] = {}
             tracker['hosts_targeted'] = {}
 
-        if dst_port > 0:
-            if dst_ip not in tracker['ports_targeted']:
-                tracker['ports_targeted'][dst_ip] = set()
-            tracker['ports_targeted'][dst_ip].add(dst_port)
-            
-            if dst_port not in tracker['hosts_targeted']:
-                tracker['hosts_targeted'][dst_port] = set()
-            tracker['hosts_targeted'][dst_port].add(dst_ip)
+        if dst_port <= 0:
+            return None
+
+        # (CẬP NHẬT) Chỉ bộ đếm vừa được cộng mới có thể vượt ngưỡng (các bộ khác đã dưới ngưỡng từ gói trước),
+        # nên chỉ kiểm tra đích / cổng của gói này
+        new_port, port_count = _add_distinct(tracker['ports_targeted'], dst_ip, dst_port)
+        new_host, host_count = _add_distinct(tracker['hosts_targeted'], dst_port, dst_ip, _host_value)
 
         # Phân tích Quét Cổng
-        for target_ip, ports in tracker['ports_targeted'].items():
-            if len(ports) >= self.portscan_count:
-                # Reset để báo lại đợt sau
-                tracker['ports_targeted'][target_ip] = set()
-                
-                return (
-                    f"PHÁT HIỆN QUÉT CỔNG (Port Scan):\n"
-                    f"     Nguồn: {src_ip}\n"
-                    f"     Đích: {target_ip}\n"
-                    f"     Đã quét: >{self.portscan_count} cổng trong {self.portscan_window} giây."
-                )
-        
+        if new_port and port_count >= self.portscan_count:
+            # Reset để báo lại đợt sau
+            tracker['ports_targeted'][dst_ip] = set()
+
+            return (
+                f"PHÁT HIỆN QUÉT CỔNG (Port Scan):\n"
+                f"     Nguồn: {src_ip}\n"
+                f"     Đích: {dst_ip}\n"
+                f"     Đã quét: >{self.portscan_count} cổng trong {self.portscan_window} giây."
+            )
+
         # Phân tích Quét Mạng
-        for target_port, hosts in tracker['hosts_targeted'].items():
-            if len(hosts) >= self.hostscan_count:
-                # Reset
-                tracker['hosts_targeted'][target_port] = set()
-                
-                return (
-                    f"PHÁT HIỆN QUÉT MẠNG (Host Scan):\n"
-                    f"     Nguồn: {src_ip}\n"
-                    f"     Trên Cổng: {target_port}\n"
-                    f"     Đã quét: >{self.hostscan_count} máy chủ trong {self.hostscan_window} giây."
-                )
+        if new_host and host_count >= self.hostscan_count:
+            # Reset
+            tracker['hosts_targeted'][dst_port] = set()
+
+            return (
+                f"PHÁT HIỆN QUÉT MẠNG (Host Scan):\n"
+                f"     Nguồn: {src_ip}\n"
+                f"     Trên Cổng: {dst_port}\n"
+                f"     Đã quét: >{self.hostscan_count} máy chủ trong {self.hostscan_window} giây."
+            )
 
         return None
 
-    def process_packet(self, packet):
-        current_time = time.time()
+    def process_packet(self, view):
+        """
+        Phân tích hành vi cho một gói tin (PacketView).
+        (CẬP NHẬT) Cửa sổ thời gian tính theo thời điểm bắt gói (view.time), không theo đồng hồ lúc xử lý:
+        phân tích chậm hơn bắt gói hay phát lại file ở tốc độ bất kỳ đều cho cùng kết quả.
+        """
+        current_time = view.time
         
-        flood_analysis = self._check_floods(packet, current_time)
+        flood_analysis = self._check_floods(view, current_time) if self.floods else None
         if flood_analysis:
             return flood_analysis
         
-        scan_analysis = self._check_scans(packet, current_time)
+        scan_analysis = self._check_scans(view, current_time)
         if scan_analysis:
             return scan_analysis
 
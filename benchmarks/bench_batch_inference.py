@@ -0,0 +1,68 @@
+# file: benchmarks/bench_batch_inference.py
+# -*- coding: utf-8 -*-
+"""
+So sánh tốc độ AI Thống kê: dự đoán từng gói (process_packet) và dự đoán theo lô (MicroBatcher).
+Chạy: python benchmarks/bench_batch_inference.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scapy.all import Ether, IP, TCP, UDP
+from anomaly_detector import AnomalyDetector, MicroBatcher
+from packet_view import PacketView
+
+
+def make_packets(n, seed=1):
+    """Tạo n gói tin TCP/UDP giả lập dưới dạng PacketView."""
+    rng = np.random.default_rng(seed)
+    packets = []
+    for _ in range(n):
+        sport = int(rng.integers(1024, 65535))
+        dport = int(rng.choice([53, 80, 443, 22, 3389]))
+        payload = b"x" * int(rng.integers(0, 1200))
+        if rng.random() < 0.7:
+            pkt = Ether() / IP(src="10.0.0.2", dst="10.0.0.1") / TCP(sport=sport, dport=dport) / payload
+        else:
+            pkt = Ether() / IP(src="10.0.0.2", dst="10.0.0.1") / UDP(sport=sport, dport=dport) / payload
+        packets.append(PacketView.from_bytes(bytes(pkt)))
+    return packets
+
+
+def trained_detector(packets):
+    detector = AnomalyDetector(n_packets_to_train=len(packets))
+    for pkt in packets:
+        detector.process_packet(pkt)
+    return detector
+
+
+def main(n_train=1000, n_test=2000, batch_size=256):
+    print(f"[BENCH] Chuẩn bị {n_train} gói huấn luyện và {n_test} gói kiểm tra...")
+    detector = trained_detector(make_packets(n_train, seed=1))
+    packets = make_packets(n_test, seed=2)
+
+    start = time.perf_counter()
+    single = [detector.process_packet(pkt) for pkt in packets]
+    single_time = time.perf_counter() - start
+
+    batched = []
+    batcher = MicroBatcher(detector, lambda results: batched.extend(p for _, p in results), batch_size=batch_size, max_delay=60)
+    start = time.perf_counter()
+    for pkt in packets:
+        batcher.add(detector._extract_features(pkt), None)
+    batcher.flush()
+    batch_time = time.perf_counter() - start
+
+    assert single == batched, "Kết quả dự đoán theo lô phải trùng với từng gói"
+    print(f"Từng gói : {n_test / single_time:10.0f} pps ({single_time:.2f} s)")
+    print(f"Theo lô  : {n_test / batch_time:10.0f} pps ({batch_time:.2f} s, batch_size={batch_size})")
+    print(f"Tăng tốc : x{single_time / batch_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
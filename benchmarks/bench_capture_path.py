@@ -0,0 +1,61 @@
+# file: benchmarks/bench_capture_path.py
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí mỗi gói tin trên đường bắt gói -> phân tích:
+cũ (scapy giải mã khung + packet.summary() + PacketView) so với mới (RawFrame + PacketView, tóm tắt khi hiển thị).
+Chạy: python benchmarks/bench_capture_path.py [số_gói]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scapy.all import Ether
+from bench_packet_store import make_frames
+from anomaly_detector import AnomalyDetector
+from behavioral_analyzer import BehavioralAnalyzer
+from detection_pipeline import DetectionPipeline
+from packet_store import PacketStore
+from packet_view import PacketView, RawFrame
+
+
+def run(frames, old_path):
+    records = []
+    pipeline = DetectionPipeline(AnomalyDetector(n_packets_to_train=10 ** 9), BehavioralAnalyzer(), records.append)
+    start = time.perf_counter()
+    for i, raw in enumerate(frames):
+        ts = 1700000000.0 + i * 0.001
+        if old_path:
+            # Socket scapy dựng cây lớp cho từng khung, bản ghi mang chuỗi tóm tắt tạo sẵn
+            packet = Ether(raw)
+            packet.time = ts
+            packet.summary()
+        else:
+            packet = RawFrame(raw, ts, "Ether")
+        pipeline.process(PacketView.from_packet(packet))
+    pipeline.flush()
+    return time.perf_counter() - start, records
+
+
+def main(n=50000):
+    frames = [raw for raw, _ in make_frames(n)]
+    old_time, _ = run(frames, old_path=True)
+    new_time, records = run(frames, old_path=False)
+    print(f"[BENCH] {n} gói tin")
+    print(f"Cũ (scapy + summary()) : {old_time / n * 1e6:7.1f} µs/gói")
+    print(f"Mới (RawFrame)         : {new_time / n * 1e6:7.1f} µs/gói (x{old_time / new_time:.1f})")
+
+    # Tóm tắt chỉ dựng cho các dòng được hiển thị (một màn hình danh sách)
+    store = PacketStore()
+    for rec in records:
+        store.append(rec)
+    start = time.perf_counter()
+    for row in range(50):
+        store.summary(row)
+    print(f"Dựng tóm tắt khi hiển thị: {(time.perf_counter() - start) / 50 * 1e6:.1f} µs/dòng (chỉ các dòng đang xem)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
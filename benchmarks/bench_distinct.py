@@ -0,0 +1,71 @@
+# file: benchmarks/bench_distinct.py
+# -*- coding: utf-8 -*-
+"""
+Đo số lượng khác nhau theo máy khi bị ngập gói với IP nguồn giả mạo (mỗi gói một IP nguồn / cổng ngẫu nhiên,
+vài máy đích bị tấn công): set Python đầy đủ cho mỗi máy (cách cũ của BehavioralAnalyzer, mỗi giá trị khác nhau
+một phần tử) so với bảng HyperLogLog cố định (DistinctCounts: nguồn / đích, cổng / nguồn, đối tác / máy).
+Cộng theo lô như thống kê trực tiếp khi đang quét; in bộ nhớ, thời gian mỗi lô và sai số của các đích bị tấn công.
+Chạy: python benchmarks/bench_distinct.py [số_gói]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from packet_view import int_to_ipv4
+from sketches import DISTINCT_MAX_KEYS, DistinctCounts
+
+
+def make_batch(rng, start, size):
+    # Nguồn giả mạo ngẫu nhiên, cổng đích ngẫu nhiên; đích: 5 máy bị tấn công (tỉ lệ khác nhau), 1000 gói / giây
+    src = rng.integers(1, 1 << 32, size, dtype=np.int64)
+    targets = np.array([0xC0A80101, 0xC0A80102, 0xC0A80103, 0x08080808, 0x0A000001], dtype=np.int64)
+    dst = targets[rng.choice(len(targets), size, p=(0.4, 0.25, 0.15, 0.12, 0.08))]
+    dport = rng.integers(1, 65536, size, dtype=np.int64)
+    return start + np.arange(size) / 1000.0, src, dst, dport
+
+
+def add_exact(tables, src, dst, dport):
+    sources, ports, peers = tables
+    for s, d, p in zip(src.tolist(), dst.tolist(), dport.tolist()):
+        sources[d].add(s)
+        ports[s].add(p)
+        peers[s].add(d)
+        peers[d].add(s)
+
+
+def main(n=1000000, batch=100000, max_keys=DISTINCT_MAX_KEYS):
+    rng = np.random.default_rng(0)
+    batches = [make_batch(rng, i * batch / 1000.0, batch) for i in range(n // batch)]
+    exact = (defaultdict(set), defaultdict(set), defaultdict(set))
+    sketch = DistinctCounts(max_keys=max_keys)
+    old_time = new_time = 0.0
+    tracemalloc.start()
+    print(f"[BENCH] {n} gói, IP nguồn giả mạo, lô {batch} gói; tối đa {max_keys} máy mỗi bảng")
+    print(f"{'Số gói':>10} | {'set: máy':>10} {'bộ nhớ':>11} {'ms/lô':>7} | {'HLL: bộ nhớ':>11} {'ms/lô':>7}")
+    for i, (ts, src, dst, dport) in enumerate(batches, 1):
+        start = time.perf_counter()
+        add_exact(exact, src, dst, dport)
+        old_time += time.perf_counter() - start
+        start = time.perf_counter()
+        sketch.add(ts, src, dst, dport)
+        new_time += time.perf_counter() - start
+        if i % max(1, len(batches) // 5) == 0:
+            memory = tracemalloc.get_traced_memory()[0]
+            print(f"{i * batch:>10} | {len(exact[2]):>10} {memory / 1024 / 1024:>7.1f} MiB {old_time / i * 1000:>7.1f} | "
+                  f"{sketch.nbytes() / 1024 / 1024:>7.1f} MiB {new_time / i * 1000:>7.1f}")
+    tracemalloc.stop()
+    estimates = dict(sketch.top('session', 5)['sources_per_dst'])
+    print("Số IP nguồn khác nhau của các đích (đúng / ước lượng):")
+    for dst, sources in sorted(exact[0].items(), key=lambda item: -len(item[1])):
+        print(f"  {int_to_ipv4(dst):<15} {len(sources):>9} / {estimates.get(dst, 0):>9}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,134 @@
+# file: benchmarks/bench_gui_queue.py
+# -*- coding: utf-8 -*-
+"""
+Đo độ phản hồi của giao diện khi lưu lượng cao: độ trễ xử lý sự kiện nhập liệu (click mỗi 10 ms)
+trong vòng lặp sự kiện đơn luồng mô phỏng Tk, trong khi một luồng khác đẩy bản ghi gói tin vào hàng đợi.
+    Cũ: mỗi gói một thông điệp, process_queue xả hết hàng đợi trong một lượt (while not empty).
+    Mới: thông điệp theo lô (MessageBatcher), process_queue của chương trình xả theo ngân sách thời gian.
+Không cần màn hình: chỉ mô phỏng lịch after() / sự kiện của Tk, phần xử lý hàng đợi là mã thật.
+Chạy: python benchmarks/bench_gui_queue.py [gói/giây] [số_giây]
+"""
+
+import heapq
+import os
+import queue
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from capture_buffer import MessageBatcher
+from packet_store import PacketStore
+import main
+
+
+class SimulatedTkLoop:
+    """Vòng lặp sự kiện đơn luồng: hẹn giờ after(ms, fn) chạy theo thứ tự đến hạn, như mainloop của Tk."""
+    def __init__(self):
+        self._timers = []
+        self._seq = 0
+
+    def after(self, ms, fn):
+        heapq.heappush(self._timers, (time.perf_counter() + ms / 1000.0, self._seq, fn))
+        self._seq += 1
+
+    def run(self, until):
+        latencies = []
+        next_input = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            # Sự kiện nhập liệu (click) mỗi 10 ms: được xử lý ngay khi vòng lặp rảnh
+            # (kể cả các sự kiện đã phải chờ một lượt xử lý hàng đợi kéo dài quá thời điểm kết thúc)
+            if now >= next_input and next_input < until:
+                latencies.append(now - next_input)
+                next_input += 0.01
+                continue
+            if now >= until:
+                break
+            if self._timers and self._timers[0][0] <= now:
+                _, _, fn = heapq.heappop(self._timers)
+                fn()
+                continue
+            time.sleep(min(0.0005, max(0.0, next_input - now)))
+        return latencies
+
+
+def legacy_process_queue(app):
+    # Cách cũ: một get() mỗi gói tin, xả tới khi hàng đợi rỗng rồi mới trả quyền cho Tk
+    try:
+        while not app.message_queue.empty():
+            msg_type, data = app.message_queue.get()
+            if msg_type == "PACKET":
+                app.packet_count = app.packet_store.append(data)
+                if app.packet_count % 50 == 0:
+                    app.status_var.set(f"Đang quét... Đã phát hiện {app.packet_count} gói tin.")
+    finally:
+        app.root.after(100, lambda: legacy_process_queue(app))
+
+
+def produce(records, pps, duration, emit):
+    per_ms = max(1, pps // 1000)
+    start = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - start < duration:
+        target = int((time.perf_counter() - start) * pps)
+        while sent < target:
+            for _ in range(per_ms):
+                emit(records[sent % len(records)])
+                sent += 1
+        time.sleep(0.001)
+    return sent
+
+
+def run(records, pps, duration, legacy):
+    app = types.SimpleNamespace()
+    app.root = SimulatedTkLoop()
+    app.message_queue = queue.Queue()
+    app.packet_store = PacketStore()
+    app.packet_count = 0
+    app.config = {}
+    app.queue_delay = 100
+    app.ai_detector = None
+    app.worker_pool = None
+    app.live_state = None
+    app.sniff_thread = types.SimpleNamespace(is_alive=lambda: True)
+    app.status_var = types.SimpleNamespace(set=lambda text: None)
+    app.get_capture_counters = lambda: None
+    app.format_capture_counters = lambda counters: ""
+    for name in ('process_queue', 'live_view_status'):
+        setattr(app, name, getattr(main.NetworkScannerApp, name).__get__(app))
+
+    if legacy:
+        emit = lambda record: app.message_queue.put(("PACKET", record))
+        flush = lambda: None
+        app.root.after(100, lambda: legacy_process_queue(app))
+    else:
+        batcher = MessageBatcher(app.message_queue)
+        emit = batcher.add
+        flush = batcher.flush
+        app.root.after(100, app.process_queue)
+
+    producer = threading.Thread(target=lambda: (produce(records, pps, duration, emit), flush()), daemon=True)
+    producer.start()
+    latencies = app.root.run(time.perf_counter() + duration + 0.5)
+    producer.join()
+    latencies.sort()
+    return latencies, app.packet_count, app.message_queue.qsize()
+
+
+def main_bench(pps=50000, duration=5.0):
+    records = make_records(make_frames(20000))
+    print(f"[BENCH] {pps} gói/giây trong {duration:.0f} giây, sự kiện nhập liệu mỗi 10 ms")
+    for name, legacy in (("Cũ (từng gói, xả hết)", True), ("Mới (theo lô, ngân sách)", False)):
+        latencies, stored, backlog = run(records, pps, duration, legacy)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"{name:<26} độ trễ nhập liệu p50 {p50:7.1f} ms | p99 {p99:7.1f} ms | tối đa {latencies[-1] * 1000:7.1f} ms "
+              f"| đã lưu {stored} gói, tồn đọng {backlog} thông điệp")
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50000, float(sys.argv[2]) if len(sys.argv) > 2 else 5.0)
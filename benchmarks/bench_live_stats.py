@@ -0,0 +1,116 @@
+# file: benchmarks/bench_live_stats.py
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí một lần làm mới Tab Thống kê khi kho gói tin lớn dần trong lúc quét:
+    Cũ: đếm lại toàn bộ kho vào Counter mới, xóa và dựng lại các Figure (kể cả biểu đồ lưu lượng) rồi vẽ.
+    Mới: bộ đếm cộng dồn (chỉ phần gói mới), cập nhật dữ liệu các đối tượng vẽ tại chỗ rồi draw_idle.
+Không cần màn hình: canvas Tk được thay bằng canvas Agg, phần thống kê / vẽ biểu đồ là mã thật.
+Chạy: python benchmarks/bench_live_stats.py [số_gói]
+"""
+
+import os
+import sys
+import time
+import types
+from collections import Counter
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_query import make_query_records
+from packet_store import PacketStore, PROTO_NAMES, VERDICT_CODES
+from packet_view import int_to_ipv4
+from gui import tab_statistics
+from gui.chart_manager import ChartManager
+from gui.tab_statistics import StatisticsTab
+
+
+class AggCanvas(FigureCanvasAgg):
+    """Thay FigureCanvasTkAgg: cùng giao diện tối thiểu mà StatisticsTab dùng."""
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+
+    def get_tk_widget(self):
+        return types.SimpleNamespace(pack=lambda **kw: None, destroy=lambda: None)
+
+
+class NoToolbar:
+    """Thay NavigationToolbar2Tk (cần cửa sổ Tk)."""
+    def __init__(self, canvas, window, pack_toolbar=True):
+        pass
+
+    def update(self):
+        pass
+
+    def pack(self, **kw):
+        pass
+
+    def destroy(self):
+        pass
+
+
+def make_tab(store):
+    app = types.SimpleNamespace(packet_store=store, charts=ChartManager(), chart_facecolor="#FFFFFF",
+                                chart_textcolor="#000000", colors_dark={'header': "#87CEFA"}, current_theme="light",
+                                colors_light={'normal_tree': "#505050", 'anomaly': "#E69500", 'danger': "#FF0000"},
+                                stats_pie_frame=None, stats_bar_ip_frame=None, stats_bar_ports_frame=None,
+                                stats_series_frame=None, stats_distinct_frame=None, status_var=types.SimpleNamespace(set=lambda text: None))
+    # after(): chạy ngay (không có vòng lặp Tk)
+    tab = types.SimpleNamespace(app=app, series_axis=0, series_range=None, distinct_scope='window', _series_zoom_job=None, _series_updating=False,
+                                after=lambda ms, func: func(), after_cancel=lambda job: None)
+    for name in ('_process_statistics', 'prepare_statistics', 'draw_statistics', 'clear_charts', '_create_bar_chart',
+                 '_create_pie_chart', '_update_bar_chart', '_update_pie_chart', '_create_series_chart', '_series_color',
+                 '_set_series_lines', '_update_series_chart', '_series_lines', '_on_series_xlim_changed',
+                 '_load_series_range', 'reset_series_zoom', '_series_legend', 'statistics_key', 'empty_statistics',
+                 'current_statistics', 'apply_chart_theme', '_create_distinct_chart', '_update_distinct_chart', '_distinct_bars'):
+        setattr(tab, name, getattr(StatisticsTab, name).__get__(tab))
+    return tab
+
+
+def exact_counter(keys, label):
+    # Counter đầy đủ (mỗi IP / cổng khác nhau một mục) như trước khi có bản tóm tắt Top-k
+    values, counts = np.unique(keys, return_counts=True)
+    return Counter({label(int(v)): int(c) for v, c in zip(values, counts)})
+
+
+def legacy_refresh(tab, store):
+    # Cách cũ: Counter mới từ toàn bộ kho, dựng lại mọi Figure
+    ip_counter, port_counter = exact_counter(store._ip_keys(), int_to_ipv4), exact_counter(store._port_keys(), lambda k: f"{k & 0xFFFF}/{PROTO_NAMES[k >> 16]}")
+    proto_counter = Counter(store.proto_counts())
+    store.verdict_counts()[VERDICT_CODES['danger']]
+    tab.app.charts = ChartManager()
+    data = {'protos': proto_counter, 'top_ips': dict(ip_counter.most_common(5)), 'top_ports': dict(port_counter.most_common(5)),
+            'errors': {'ips': 0, 'ports': 0}, 'series': tab._series_lines(store.traffic_series(), 0),
+            'distinct': tab._distinct_bars(store.distinct_counts())}
+    tab.draw_statistics(data)
+    for fig in tab.app.charts.figures():
+        fig.canvas.draw()
+
+
+def main(n=1000000, step=100000):
+    tab_statistics.FigureCanvasTkAgg = AggCanvas
+    tab_statistics.NavigationToolbar2Tk = NoToolbar
+    records = make_query_records()
+    store = PacketStore()
+    legacy_tab, live_tab = make_tab(store), make_tab(store)
+    print(f"[BENCH] Làm mới Tab Thống kê mỗi {step} gói tin mới, tới {n} gói tin")
+    print(f"{'Số gói':>10} | {'Cũ (đếm lại + dựng lại)':>24} | {'Mới (cộng dồn + tại chỗ)':>25}")
+    for i in range(n):
+        rec = records[i % len(records)]
+        store.append(rec)
+        if (i + 1) % step == 0:
+            t0 = time.perf_counter()
+            legacy_refresh(legacy_tab, store)
+            legacy_time = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            live_tab.draw_statistics(live_tab.prepare_statistics(store))
+            live_time = time.perf_counter() - t0
+            print(f"{i + 1:>10} | {legacy_time * 1000:21.0f} ms | {live_time * 1000:22.0f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
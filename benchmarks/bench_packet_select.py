@@ -0,0 +1,48 @@
+# file: benchmarks/bench_packet_select.py
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian chọn một gói tin (tra id -> dòng + dựng lại bản ghi, giải mã các tầng từ byte tiêu đề)
+trên phiên lớn, với kho trong RAM (PacketStore) và kho phiên SQLite (SessionDatabase).
+Chạy: python benchmarks/bench_packet_select.py [số_gói]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from packet_store import PacketStore
+from session_db import SessionDatabase
+
+
+def measure_select(store, n, samples=2000):
+    ids = [random.randint(1, n) for _ in range(samples)]
+    times = []
+    for packet_id in ids:
+        t0 = time.perf_counter()
+        row = store.row_of(packet_id)
+        record = store.get(row)
+        assert record['id'] == packet_id
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.99)], times[-1]
+
+
+def main(n=1000000):
+    records = make_records(make_frames(20000))
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, store in (("PacketStore (RAM)", PacketStore()), ("SessionDatabase (SQLite)", SessionDatabase(os.path.join(tmp, "bench.db")))):
+            for i in range(n):
+                store.append(records[i % len(records)])
+            store.flush()
+            p50, p99, worst = measure_select(store, n)
+            print(f"{name:<26} {n} gói: chọn gói tin p50 {p50:.3f} ms | p99 {p99:.3f} ms | chậm nhất {worst:.3f} ms")
+            store.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
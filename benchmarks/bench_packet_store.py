@@ -0,0 +1,95 @@
+# file: benchmarks/bench_packet_store.py
+# -*- coding: utf-8 -*-
+"""
+Đo bộ nhớ mỗi gói tin: danh sách dict cũ (all_packets_data) so với kho dạng cột (PacketStore).
+Chạy: python benchmarks/bench_packet_store.py [số_gói]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scapy.all import Ether, IP, TCP, UDP, ICMP
+from anomaly_detector import AnomalyDetector
+from behavioral_analyzer import BehavioralAnalyzer
+from detection_pipeline import DetectionPipeline
+from packet_store import PacketStore
+from packet_view import PacketView
+
+
+def make_frames(n):
+    templates = []
+    for i in range(64):
+        src = f"10.0.{i % 4}.{i + 1}"
+        if i % 3 == 0:
+            pkt = Ether() / IP(src=src, dst="192.168.1.1") / TCP(sport=40000 + i, dport=443, flags="PA") / (b"x" * 600)
+        elif i % 3 == 1:
+            pkt = Ether() / IP(src=src, dst="8.8.8.8") / UDP(sport=50000 + i, dport=53) / (b"q" * 40)
+        else:
+            pkt = Ether() / IP(src=src, dst="192.168.1.1") / ICMP()
+        templates.append((bytes(pkt), pkt.summary()))
+    return [templates[i % len(templates)] for i in range(n)]
+
+
+def make_records(frames):
+    records = []
+    pipeline = DetectionPipeline(AnomalyDetector(n_packets_to_train=500), BehavioralAnalyzer(), records.append)
+    start = 1700000000.0
+    for i, (raw, _) in enumerate(frames):
+        pipeline.process(PacketView.from_bytes(raw, start + i * 0.001))
+    pipeline.flush()
+    return records
+
+
+def fresh(text):
+    """Bản sao mới của chuỗi (như khi bắt gói thật, mỗi gói có chuỗi tóm tắt riêng)."""
+    return (text + " ")[:-1]
+
+
+def measure(build):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - t0
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return result, used, elapsed
+
+
+def main(n=100000):
+    frames = make_frames(n)
+    records = make_records(frames)
+
+    def build_dicts():
+        # Định dạng cũ: mỗi gói một dict kèm parsed_layers đã giải mã
+        data = []
+        for i, rec in enumerate(records):
+            rec = dict(rec, id=i + 1, summary=fresh(frames[i][1]), parsed_layers=PacketView.from_bytes(rec['raw'], rec['timestamp'], rec['linktype']).to_layers())
+            rec['features'] = list(rec['features'])
+            for key in ('raw', 'linktype', 'ip_version', 'src', 'dst', 'iface', 'timestamp'):  # Trường mới, bản ghi cũ không có
+                del rec[key]
+            data.append(rec)
+        return data
+
+    def build_store():
+        store = PacketStore()
+        for rec in records:
+            store.append(rec)
+        return store
+
+    old, old_bytes, _ = measure(build_dicts)
+    del old
+    store, store_bytes, elapsed = measure(build_store)
+
+    print(f"[BENCH] {n} gói tin")
+    print(f"Danh sách dict (cũ)   : {old_bytes / n:8.0f} byte/gói")
+    print(f"PacketStore (cột)     : {store_bytes / n:8.0f} byte/gói (ước lượng nbytes(): {store.nbytes() / n:.0f}), thêm vào {n / elapsed:.0f} gói/giây")
+    print(f"Tiết kiệm             : x{old_bytes / store_bytes:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
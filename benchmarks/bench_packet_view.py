@@ -0,0 +1,104 @@
+# file: benchmarks/bench_packet_view.py
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí CPU cho mỗi gói tin: tra cứu lớp scapy (cách cũ, ~15 lần haslayer/packet[Layer])
+so với PacketView giải mã một lần từ byte thô.
+Chạy: python benchmarks/bench_packet_view.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scapy.all import Ether, IP, TCP, UDP, ICMP, ARP
+from packet_view import PacketView, TCP_RST
+
+
+def make_frames(n):
+    frames = []
+    for i in range(n):
+        kind = i % 10
+        if kind < 6:
+            pkt = Ether() / IP(src=f"10.0.0.{i % 250}", dst="10.0.1.1") / TCP(sport=1024 + i % 5000, dport=443, flags="PA") / (b"x" * 200)
+        elif kind < 9:
+            pkt = Ether() / IP(src=f"10.0.0.{i % 250}", dst="8.8.8.8") / UDP(sport=1024 + i % 5000, dport=53) / (b"q" * 40)
+        else:
+            pkt = Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / ICMP(type=8)
+        frames.append(bytes(pkt))
+    return frames
+
+
+def legacy_stages(packet):
+    """Các lượt tra cứu lớp scapy của phiên bản trước (đặc trưng, lũ lụt, quét, chi tiết, quy tắc)."""
+    # AnomalyDetector._extract_features
+    length, proto, sport, dport = len(packet), 0, 0, 0
+    if packet.haslayer(IP):
+        proto = packet[IP].proto
+        if packet.haslayer(TCP):
+            sport, dport = packet[TCP].sport, packet[TCP].dport
+        elif packet.haslayer(UDP):
+            sport, dport = packet[UDP].sport, packet[UDP].dport
+    # BehavioralAnalyzer._check_floods / _check_scans
+    for _ in range(2):
+        if packet.haslayer(IP):
+            key = (packet[IP].src, packet[IP].dst, packet[IP].proto)
+            if packet.haslayer(TCP):
+                key += (packet[TCP].dport,)
+            elif packet.haslayer(UDP):
+                key += (packet[UDP].dport,)
+    # parse_packet_to_dict
+    layers = {}
+    if packet.haslayer(Ether): layers['Ether'] = {"dst": packet[Ether].dst, "src": packet[Ether].src, "type": packet[Ether].type}
+    if packet.haslayer(ARP): layers['ARP'] = {"op": packet[ARP].op, "psrc": packet[ARP].psrc, "pdst": packet[ARP].pdst}
+    if packet.haslayer(IP): layers['IP'] = {"version": packet[IP].version, "ihl": packet[IP].ihl, "ttl": packet[IP].ttl, "proto": packet[IP].proto, "src": packet[IP].src, "dst": packet[IP].dst}
+    if packet.haslayer(TCP): layers['TCP'] = {"sport": packet[TCP].sport, "dport": packet[TCP].dport, "seq": packet[TCP].seq, "ack": packet[TCP].ack, "flags": str(packet[TCP].flags), "window": packet[TCP].window}
+    if packet.haslayer(UDP): layers['UDP'] = {"sport": packet[UDP].sport, "dport": packet[UDP].dport, "len": packet[UDP].len}
+    if packet.haslayer(ICMP): layers['ICMP'] = {"type": packet[ICMP].type, "code": packet[ICMP].code, "id": packet[ICMP].id}
+    # Quy tắc trong packet_callback
+    if packet.haslayer(TCP) and packet[TCP].flags.R:
+        pass
+    elif packet.haslayer(ICMP):
+        _ = packet[ICMP].type
+    return [length, proto, sport, dport], layers
+
+
+def view_stages(view):
+    """Cùng công việc nhưng đọc từ PacketView đã giải mã."""
+    features = view.features()
+    for _ in range(2):
+        if view.has_ip:
+            key = (view.src, view.dst, view.proto, view.dport)
+    layers = view.to_layers()
+    if view.l4 == 'TCP' and view.tcp_flags & TCP_RST:
+        pass
+    elif view.l4 == 'ICMP':
+        _ = view.icmp_type
+    return features, layers
+
+
+def timeit(label, func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed / len(items) * 1e6:8.1f} µs/gói")
+    return elapsed
+
+
+def main(n=20000):
+    frames = make_frames(n)
+    dissected = [Ether(f) for f in frames]
+
+    print(f"[BENCH] {n} gói tin")
+    t_legacy = timeit("Tra cứu lớp scapy (gói đã dissect)", legacy_stages, dissected)
+    t_view = timeit("PacketView.from_packet + các tầng", lambda p: view_stages(PacketView.from_packet(p)), dissected)
+    t_full_legacy = timeit("Dissect scapy + tra cứu lớp (từ byte thô)", lambda f: legacy_stages(Ether(f)), frames)
+    t_full_view = timeit("PacketView.from_bytes + các tầng (từ byte thô)", lambda f: view_stages(PacketView.from_bytes(f)), frames)
+    print(f"Tăng tốc phần phân tích : x{t_legacy / t_view:.1f}")
+    print(f"Tăng tốc từ byte thô    : x{t_full_legacy / t_full_view:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# file: benchmarks/bench_query.py
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian truy vấn lọc danh sách gói tin trên kho lớn:
+    Quét toàn bộ: so sánh trên từng cột cho mọi dòng (như tìm kiếm tự do vector hóa).
+    Chỉ mục: tra chỉ mục cột (IP, cổng, thời gian) cho điều kiện chọn lọc nhất, kiểm tra phần còn lại trên các dòng ứng viên.
+Lần truy vấn đầu tiên trên một cột gồm cả thời gian dựng chỉ mục của cột đó.
+Chạy: python benchmarks/bench_query.py [số_gói]
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from packet_query import parse_query
+from packet_store import PacketStore
+
+
+def make_query_records():
+    # Đa dạng hóa IP nguồn / cổng đích để điều kiện IP, cổng thật sự chọn lọc
+    rng = random.Random(1)
+    base = make_records(make_frames(20000))
+    records = []
+    for i in range(20000):
+        rec = dict(base[i])
+        rec['src'] = f"10.{rng.randint(0, 15)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        if rec['sport']:
+            rec['dport'] = rng.choice((22, 53, 80, 443, 3389, 8080) + tuple(range(1024, 1100)))
+        rec['tag'] = rng.choice(('normal',) * 48 + ('anomaly', 'danger'))
+        records.append(rec)
+    return records
+
+
+def build_store(n):
+    records = make_query_records()
+    store = PacketStore()
+    start = 1700000000.0
+    for i in range(n):
+        rec = records[i % len(records)]
+        rec['timestamp'] = start + i * 0.001
+        store.append(rec)
+    return store
+
+
+def scan(store, ip, ports, verdict, since):
+    # Cách làm không có chỉ mục: một phép so sánh trên cả cột cho mỗi điều kiện
+    mask = (store.column('src') == ip) | (store.column('dst') == ip)
+    mask &= np.isin(store.column('dport'), ports)
+    mask &= store.column('verdict') == verdict
+    mask &= store.column('ts') > since
+    return np.flatnonzero(mask)
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(n=2000000):
+    store = build_store(n)
+    since = datetime.datetime.fromtimestamp(float(store.column('ts')[len(store) // 2])).replace(microsecond=0)
+    # IP của một gói nguy hiểm tới cổng 22 / 3389 sau thời điểm since: truy vấn có kết quả
+    hits = np.flatnonzero((store.column('verdict') == 2) & np.isin(store.column('dport'), (22, 3389)))
+    ip = int(store.column('src')[hits[-1]])
+    ip_text = ".".join(str(b) for b in ip.to_bytes(4, 'big'))
+    since_text = since.strftime("%H:%M:%S")
+    until_text = (since + datetime.timedelta(minutes=1)).strftime("%H:%M:%S")
+    text = f"ip=={ip_text} && dport in 22,3389 && tag==danger && time>{since_text}"
+    print(f"[BENCH] {len(store)} gói tin, truy vấn: {text}")
+
+    query = parse_query(text)
+    t0 = time.perf_counter()
+    first = store.select(query=query)
+    first_time = time.perf_counter() - t0
+    indexed, indexed_time = timed(lambda: store.select(query=parse_query(text)))
+    scanned, scan_time = timed(lambda: scan(store, ip, [22, 3389], 2, since.timestamp()))
+    assert list(first) == list(indexed) == list(scanned)
+    print(f"Quét toàn bộ các cột             : {scan_time * 1000:8.1f} ms ({len(scanned)} dòng)")
+    print(f"Chỉ mục (lần đầu, gồm dựng chỉ mục): {first_time * 1000:8.1f} ms")
+    print(f"Chỉ mục (các lần sau)            : {indexed_time * 1000:8.2f} ms")
+
+    for text in ("ip==10.3.0.0/16 && port==443", "dport==3389 && tag==alert", f"time>={since_text} && time<{until_text}", "tag==danger"):
+        rows, elapsed = timed(lambda: store.select(query=parse_query(text)))
+        print(f"{text:<33}: {elapsed * 1000:8.2f} ms ({len(rows)} dòng)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000000)
@@ -0,0 +1,55 @@
+# file: benchmarks/bench_report_list.py
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí dựng danh sách giám sát sau khi dừng quét / đổi bộ lọc:
+cũ (dựng giá trị cho MỌI dòng kết quả lọc rồi chèn từng dòng Treeview) so với danh sách ảo (chỉ cửa sổ đang nhìn thấy).
+Không cần màn hình: chỉ đo phần lấy dữ liệu; chi phí chèn Treeview (vài chục µs/dòng) còn cộng thêm ở cách cũ.
+Chạy: python benchmarks/bench_report_list.py [số_gói]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from gui.virtual_tree import RowWindow
+from packet_store import PacketStore
+
+
+def main(n=1000000):
+    records = make_records(make_frames(20000))
+    store = PacketStore()
+    for i in range(n):
+        store.append(records[i % len(records)])
+
+    t0 = time.perf_counter()
+    rows = store.select(verdicts=('danger', 'anomaly', 'normal'))
+    select_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    limit = min(len(rows), 200000)   # Cách cũ rất chậm: đo một phần rồi ngoại suy
+    for _ in store.display_rows(rows[:limit]):
+        pass
+    old_time = (time.perf_counter() - t0) * len(rows) / max(1, limit)
+
+    window = RowWindow()
+    window.reset(len(rows))
+    t0 = time.perf_counter()
+    start, end = window.window_for(0)
+    first = list(store.display_rows(rows[start:end]))
+    first_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    start, end = window.window_for(len(rows) // 2)
+    list(store.display_rows(rows[start:end]))
+    jump_time = time.perf_counter() - t0
+
+    print(f"[BENCH] {n} gói tin, {len(rows)} dòng sau lọc (select: {select_time * 1000:.0f} ms)")
+    print(f"Cũ  - dựng giá trị cho mọi dòng   : {old_time:8.2f} giây (chưa tính chèn Treeview)")
+    print(f"Ảo  - cửa sổ đầu ({len(first)} dòng)      : {first_time * 1000:8.2f} ms")
+    print(f"Ảo  - kéo thanh cuộn tới giữa     : {jump_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,39 @@
+# file: benchmarks/bench_retention.py
+# -*- coding: utf-8 -*-
+"""
+Đo bộ nhớ của kho gói tin theo thời gian chạy: giữ toàn bộ so với cửa sổ lưu giữ
+(gói bình thường trong cửa sổ, cảnh báo + gói ngữ cảnh giữ mãi), và tốc độ append khi có loại bỏ.
+Chạy: python benchmarks/bench_retention.py [số_gói]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from packet_store import PacketStore
+
+
+def main(n=1000000, window=100000, alert_rate=0.001):
+    records = make_records(make_frames(20000))
+    rng = random.Random(0)
+    tags = ['danger' if rng.random() < alert_rate else 'normal' for _ in range(len(records))]
+    for name, store in (("Giữ toàn bộ", PacketStore()), (f"Cửa sổ {window} gói", PacketStore(window_packets=window, context_packets=5))):
+        step = n // 4
+        start = time.perf_counter()
+        for i in range(n):
+            record = records[i % len(records)]
+            record['tag'] = tags[i % len(tags)]
+            store.append(record)
+            if (i + 1) % step == 0:
+                print(f"{name:<20} sau {i + 1:>8} gói: {store.nbytes() / 1024 / 1024:7.1f} MiB, {len(store):>8} dòng giữ lại")
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} append: {n / elapsed:9.0f} gói/giây | tổng {store.total_count()} gói, "
+              f"{int(store.verdict_counts()[2])} cảnh báo, {len(store.ip_counts())} IP trong bộ đếm")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,68 @@
+# file: benchmarks/bench_series.py
+# -*- coding: utf-8 -*-
+"""
+Đo chi phí vẽ biểu đồ lưu lượng theo thời gian khi phiên quét dài dần (1 giờ tới 24 giờ, 50 gói tin / giây):
+    Không giảm mẫu: mỗi khoảng của chuỗi thời gian là một điểm trên đường.
+    LTTB: mỗi đường giảm mẫu còn tối đa SERIES_MAX_POINTS điểm.
+Và thời gian tính lại chi tiết khi phóng to một đoạn 60 giây (traffic_between, chỉ mục cột thời gian).
+Không cần màn hình: canvas Tk được thay bằng canvas Agg.
+Chạy: python benchmarks/bench_series.py
+"""
+
+import numpy as np
+
+from bench_live_stats import AggCanvas, NoToolbar, make_tab
+from bench_query import build_store, timed
+from gui import tab_statistics
+from packet_store import PROTO_NAMES, VERDICTS
+from time_series import SERIES_MAX_POINTS, TrafficSeries
+
+RATE = 50
+
+
+def make_series(hours):
+    rng = np.random.default_rng(int(hours * 100))
+    n = int(hours * 3600 * RATE)
+    ts = 1700000000.0 + np.sort(rng.random(n)) * hours * 3600
+    series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)))
+    for part in np.array_split(np.arange(n), max(1, n // 1000000)):
+        series.add(ts[part], rng.integers(0, len(PROTO_NAMES), len(part)), rng.choice(3, len(part), p=(0.96, 0.02, 0.02)),
+                   rng.integers(60, 1500, len(part)))
+    return series
+
+
+def render(fig, tab, series, points):
+    # Một lần làm mới: chuẩn bị các đường, cập nhật tại chỗ rồi vẽ. points = None: vẽ mọi khoảng (không giảm mẫu)
+    tab_statistics.SERIES_MAX_POINTS = points or len(series) + 1
+
+    def refresh():
+        tab._update_series_chart(fig, {'series': tab._series_lines(series, 0)}, redraw=False)
+        fig.canvas.draw()
+
+    _, elapsed = timed(refresh, repeat=3)
+    return elapsed, len(fig.axes[0].lines[0].get_xdata())
+
+
+def main():
+    tab_statistics.FigureCanvasTkAgg = AggCanvas
+    tab_statistics.NavigationToolbar2Tk = NoToolbar
+    tab = make_tab(None)
+    tab.after = lambda ms, func: None
+    fig = tab._create_series_chart(None, {'series': tab._series_lines(make_series(0.01), 0)})
+    print(f"[BENCH] Biểu đồ lưu lượng (3 trục, 12 đường), {RATE} gói tin / giây")
+    print(f"{'Phiên':>6} | {'Khoảng':>7} | {'Không giảm mẫu':>25} | {'LTTB':>22}")
+    for hours in (1, 4, 12, 24):
+        series = make_series(hours)
+        raw_time, raw_points = render(fig, tab, series, None)
+        lttb_time, lttb_points = render(fig, tab, series, SERIES_MAX_POINTS)
+        print(f"{hours:>5}h | {series.bucket:>6.0f}s | {raw_time * 1000:8.0f} ms ({raw_points:>6} điểm) | {lttb_time * 1000:6.0f} ms ({lttb_points:>5} điểm)")
+
+    store = build_store(2000000)
+    start = float(store.column('ts')[len(store) // 2])
+    store.traffic_between(start, start + 60, 0.1)   # Dựng chỉ mục cột thời gian
+    series, elapsed = timed(lambda: store.traffic_between(start, start + 60, 0.1))
+    print(f"Phóng to 60 giây trên {len(store)} gói tin (khoảng 0,1 giây): {elapsed * 1000:.2f} ms ({series.rates()[1].sum() * series.bucket:.0f} gói)")
+
+
+if __name__ == "__main__":
+    main()
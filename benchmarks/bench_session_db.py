@@ -0,0 +1,64 @@
+# file: benchmarks/bench_session_db.py
+# -*- coding: utf-8 -*-
+"""
+Đo tốc độ ghi của kho phiên SQLite (WAL, ghi theo lô từ luồng riêng) và bộ nhớ khi phiên kéo dài
+(kể cả số dòng chờ ghi lớn nhất khi thêm gói nhanh hơn tốc độ ghi đĩa, và kết quả lọc không điều kiện).
+Chạy: python benchmarks/bench_session_db.py [số_gói]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_packet_store import make_frames, make_records
+from session_db import SessionDatabase
+
+
+def main(n=200000):
+    records = make_records(make_frames(min(n, 20000)))
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in (1, 100, 2000):
+            count = n if batch_size > 1 else min(n, 5000)  # Mỗi gói một giao dịch: chậm, đo ít gói hơn
+            store = SessionDatabase(os.path.join(tmp, f"bench_{batch_size}.db"), batch_size=batch_size)
+            t0 = time.perf_counter()
+            for i in range(count):
+                store.append(records[i % len(records)])
+            queued = time.perf_counter() - t0
+            store.flush()
+            elapsed = time.perf_counter() - t0
+            size = os.path.getsize(store.path)
+            store.close()
+            print(f"Lô {batch_size:>5} dòng/giao dịch: {count / elapsed:9.0f} gói/giây ghi xuống đĩa "
+                  f"(append ở luồng gọi: {count / queued:9.0f} gói/giây), {size / count:.0f} byte/gói trên đĩa")
+
+        # Bộ nhớ theo độ dài phiên: chỉ bộ nhớ đệm nóng nằm trong RAM
+        store = SessionDatabase(os.path.join(tmp, "bench_memory.db"))
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        step = max(1, n // 4)
+        max_backlog = 0
+        for i in range(n):
+            store.append(records[i % len(records)])
+            if i % 1000 == 0:
+                max_backlog = max(max_backlog, store.backlog)
+            if (i + 1) % step == 0:
+                print(f"Sau {i + 1:>8} gói: {(tracemalloc.get_traced_memory()[0] - base) / 1024:8.0f} KiB trong bộ nhớ, "
+                      f"tối đa {max_backlog} dòng chờ ghi")
+        store.flush()
+        t0 = time.perf_counter()
+        ids = store.select()
+        print(f"Lọc không điều kiện: {(time.perf_counter() - t0) * 1000:.0f} ms, {ids.nbytes / 1024:.0f} KiB cho {len(ids)} id")
+        tracemalloc.stop()
+        t0 = time.perf_counter()
+        ids = store.select(verdicts=('danger', 'anomaly'))
+        ip_counts = store.ip_counts()
+        print(f"Truy vấn cảnh báo + đếm IP trên {len(store)} gói: {(time.perf_counter() - t0) * 1000:.0f} ms ({len(ids)} cảnh báo, {len(ip_counts)} IP)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,74 @@
+# file: benchmarks/bench_session_file.py
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian lưu phiên (pcap + file phụ) và mở lại bằng ánh xạ bộ nhớ cho tới khi xem được trang đầu của danh sách,
+theo đúng trình tự của open_session: nạp file, select() với bộ lọc mặc định (mọi phán quyết / giao thức), dựng trang đầu.
+Sau đó đo riêng phần được làm sau khi danh sách đã hiện: truy vấn lọc đầu tiên (dựng chỉ mục cột khi cần)
+và tổng hợp thống kê (luồng nền); so với cách cũ lập chỉ mục mọi cột và tổng hợp thống kê trước khi hiện dòng nào.
+Chạy: python benchmarks/bench_session_file.py [số_gói]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_live_stats import make_tab
+from bench_packet_store import make_frames, make_records
+from packet_query import INDEXED_COLUMNS, parse_query
+from packet_store import PacketStore, PROTO_NAMES, SIDECAR_SUFFIX, VERDICTS
+
+
+def main(n=2000000):
+    records = make_records(make_frames(20000))
+    store = PacketStore()
+    for i in range(n):
+        store.append(records[i % len(records)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.pcap")
+        t0 = time.perf_counter()
+        store.save(path)
+        save_time = time.perf_counter() - t0
+        size = os.path.getsize(path) + os.path.getsize(path + SIDECAR_SUFFIX)
+
+        # Cách cũ: lập chỉ mục mọi cột và tổng hợp thống kê rồi mới hiện danh sách
+        t0 = time.perf_counter()
+        loaded = PacketStore.load(path)
+        for name in INDEXED_COLUMNS:
+            loaded.column_index(name)
+        make_tab(loaded).prepare_statistics(loaded)
+        rows = loaded.select(verdicts=VERDICTS, protos=PROTO_NAMES)
+        list(loaded.display_rows(rows[:50]))
+        old_page_time = time.perf_counter() - t0
+        loaded.close()
+
+        t0 = time.perf_counter()
+        loaded = PacketStore.load(path)
+        open_time = time.perf_counter() - t0
+        rows = loaded.select(verdicts=VERDICTS, protos=PROTO_NAMES)
+        first_page = list(loaded.display_rows(rows[:50]))
+        page_time = time.perf_counter() - t0
+        loaded.get(loaded.row_of(n // 2))
+        detail_time = time.perf_counter() - t0 - page_time
+        t0 = time.perf_counter()
+        matched = loaded.select(verdicts=VERDICTS, protos=PROTO_NAMES, query=parse_query("dport==443 && tag==alert"))
+        query_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        make_tab(loaded).prepare_statistics(loaded)
+        stats_time = time.perf_counter() - t0
+
+        print(f"[BENCH] {n} gói tin, {size / n:.0f} byte/gói trên đĩa (pcap + file phụ)")
+        print(f"Lưu phiên                        : {save_time:6.2f} giây")
+        print(f"Mở lại (mmap)                    : {open_time * 1000:6.1f} ms")
+        print(f"Mở lại -> trang đầu danh sách    : {page_time * 1000:6.1f} ms ({len(first_page)} dòng; cách cũ: {old_page_time * 1000:.0f} ms)")
+        print(f"Chọn một gói tin                 : {detail_time * 1000:6.2f} ms")
+        print(f"Truy vấn lọc đầu tiên (chỉ mục)  : {query_time * 1000:6.0f} ms ({len(matched)} dòng)")
+        print(f"Thống kê toàn phiên (luồng nền)  : {stats_time * 1000:6.0f} ms")
+        loaded.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000000)
@@ -0,0 +1,60 @@
+# file: benchmarks/bench_theme.py
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian đổi giao diện sáng / tối khi Tab Thống kê đang hiển thị một phiên lớn:
+    Cũ: tổng hợp lại toàn bộ thống kê và dựng lại mọi Figure (update_statistics_tab) rồi vẽ.
+    Mới: đổi màu các đối tượng vẽ đã có (apply_chart_theme, ChartManager.restyle) rồi vẽ.
+Không cần màn hình: canvas Tk được thay bằng canvas Agg.
+Chạy: python benchmarks/bench_theme.py [số_gói]
+"""
+
+import sys
+import time
+
+from bench_live_stats import AggCanvas, NoToolbar, make_tab
+from bench_query import build_store
+from gui import tab_statistics
+from gui.chart_manager import ChartManager
+
+class DeferredAggCanvas(AggCanvas):
+    """draw_idle chỉ hẹn vẽ (như canvas Tk): phần vẽ được đo riêng trong render()."""
+    def draw_idle(self, *args, **kwargs):
+        pass
+
+
+DARK = {'chart_facecolor': "#3C3C3C", 'chart_textcolor': "#FFFFFF", 'current_theme': "dark"}
+
+
+def render(tab):
+    t0 = time.perf_counter()
+    for fig in tab.app.charts.figures():
+        fig.canvas.draw()
+    return time.perf_counter() - t0
+
+
+def main(n=1000000):
+    tab_statistics.FigureCanvasTkAgg = DeferredAggCanvas
+    tab_statistics.NavigationToolbar2Tk = NoToolbar
+    print(f"[BENCH] Đổi giao diện sáng / tối, {n} gói tin (vẽ = 4 Figure trên canvas Agg)")
+    tab = make_tab(None)
+    tab.app.colors_dark.update({'normal_tree': "#C0C0C0", 'anomaly': "#FFD700", 'danger': "#FF5252"})
+
+    # Cách cũ: kho chưa thống kê lần nào (như trước đây: đếm lại toàn bộ), bỏ các Figure và dựng lại
+    tab.app.packet_store = store = build_store(n)
+    vars(tab.app).update(DARK)
+    t0 = time.perf_counter()
+    tab.app.charts = ChartManager()
+    tab.draw_statistics(tab.prepare_statistics(store))
+    rebuild = time.perf_counter() - t0
+    print(f"Cũ (tổng hợp lại + dựng lại): {rebuild * 1000:7.0f} ms + vẽ {render(tab) * 1000:4.0f} ms")
+
+    # Cách mới: đổi màu các đối tượng vẽ đã có, dữ liệu đã tổng hợp được dùng lại
+    vars(tab.app).update(chart_facecolor="#FFFFFF", chart_textcolor="#000000", current_theme="light")
+    t0 = time.perf_counter()
+    tab.apply_chart_theme()
+    restyle = time.perf_counter() - t0
+    print(f"Mới (đổi màu tại chỗ)       : {restyle * 1000:7.1f} ms + vẽ {render(tab) * 1000:4.0f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,85 @@
+# file: benchmarks/bench_workers.py
+# -*- coding: utf-8 -*-
+"""
+Đo khả năng mở rộng của chế độ đa tiến trình (AnalysisWorkerPool) theo số tiến trình.
+Chạy: python benchmarks/bench_workers.py [số_gói] [danh_sách_tiến_trình, ví dụ 1,2,4,8]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scapy.all import Ether, IP, TCP, UDP
+from anomaly_detector import AnomalyDetector
+from behavioral_analyzer import BehavioralAnalyzer
+from detection_pipeline import DetectionPipeline
+from packet_view import PacketView
+from worker_pool import AnalysisWorkerPool
+
+
+def make_frames(n):
+    frames = []
+    for i in range(n):
+        src = f"10.{i % 7}.{i % 251}.{i % 13 + 1}"
+        if i % 3:
+            pkt = Ether() / IP(src=src, dst="192.168.1.1") / TCP(sport=1024 + i % 60000, dport=443, flags="PA") / (b"x" * (i % 900))
+        else:
+            pkt = Ether() / IP(src=src, dst="8.8.8.8") / UDP(sport=1024 + i % 60000, dport=53) / (b"q" * 40)
+        frames.append(bytes(pkt))
+    return frames
+
+
+def train_model(frames, model_path, stats_path):
+    detector = AnomalyDetector(n_packets_to_train=len(frames))
+    for raw in frames:
+        detector.process_packet(PacketView.from_bytes(raw))
+    detector.save_model(model_path, stats_path)
+
+
+def run_inline(frames, config, model_path, stats_path):
+    detector = AnomalyDetector()
+    detector.load_model(model_path, stats_path)
+    records = []
+    pipeline = DetectionPipeline(detector, BehavioralAnalyzer.from_config(config), records.append)
+    start = time.perf_counter()
+    for raw in frames:
+        pipeline.process(PacketView.from_bytes(raw))
+    pipeline.flush()
+    return time.perf_counter() - start, len(records)
+
+
+def run_pool(frames, n_workers, config, model_path, stats_path):
+    records = []
+    pool = AnalysisWorkerPool(n_workers, config, records.append, model_path, stats_path)
+    pool.start()
+    time.sleep(3.0)  # Chờ tiến trình con khởi động và tải mô hình (không tính vào thời gian đo)
+    start = time.perf_counter()
+    for raw in frames:
+        pool.submit_raw(raw, 0.0)
+    pool.stop()
+    return time.perf_counter() - start, len(records)
+
+
+def main(n=20000, worker_counts=(1, 2, 4)):
+    config = {'training_packets': 1000}
+    frames = make_frames(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.joblib")
+        stats_path = os.path.join(tmp, "stats.json")
+        train_model(frames[:1000], model_path, stats_path)
+
+        print(f"[BENCH] {n} gói tin, máy có {os.cpu_count()} lõi CPU")
+        base_time, count = run_inline(frames, config, model_path, stats_path)
+        print(f"Một luồng (không tiến trình con): {n / base_time:8.0f} pps ({count} bản ghi)")
+        for workers in worker_counts:
+            elapsed, count = run_pool(frames, workers, config, model_path, stats_path)
+            print(f"{workers} tiến trình                     : {n / elapsed:8.0f} pps ({count} bản ghi, x{base_time / elapsed:.2f})")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    counts = tuple(int(x) for x in sys.argv[2].split(",")) if len(sys.argv) > 2 else (1, 2, 4)
+    main(n, counts)
@@ -0,0 +1,232 @@
+# file: capture_buffer.py
+# -*- coding: utf-8 -*-
+
+import heapq
+import threading
+import time
+from collections import deque
+
+# Chính sách khi bộ đệm đầy
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class CaptureRingBuffer:
+    """
+    (MỚI) Bộ đệm vòng có giới hạn giữa luồng bắt gói và luồng phân tích.
+    Khi đầy, áp dụng chính sách overflow_policy:
+        drop_newest: bỏ gói mới đến (luồng bắt gói không bao giờ bị chặn)
+        drop_oldest: bỏ gói cũ nhất đang chờ để nhường chỗ cho gói mới
+        block:       chờ luồng phân tích giải phóng chỗ (dùng khi phát lại file, không được mất gói)
+    Đếm số gói đã nhận, đã bỏ và mức tồn đọng lớn nhất.
+    wakeup: threading.Event dùng chung (tùy chọn) để báo có gói mới cho bộ gộp nhiều giao diện.
+    """
+    def __init__(self, capacity=65536, overflow_policy="drop_newest", wakeup=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Chính sách không hợp lệ: {overflow_policy} (hợp lệ: {', '.join(OVERFLOW_POLICIES)})")
+        self.capacity = max(1, int(capacity))
+        self.overflow_policy = overflow_policy
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+        self._wakeup = wakeup
+
+        self.pushed = 0
+        self.dropped = 0
+        self.max_backlog = 0
+
+    def put(self, item):
+        """Đưa một gói tin vào bộ đệm. Trả về False nếu gói bị bỏ."""
+        with self._lock:
+            if self._closed:
+                return False
+            if len(self._items) >= self.capacity:
+                if self.overflow_policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow_policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.capacity and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        return False
+            self._items.append(item)
+            self.pushed += 1
+            backlog = len(self._items)
+            if backlog > self.max_backlog:
+                self.max_backlog = backlog
+            self._not_empty.notify()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def get_batch(self, max_items=256, timeout=0.02):
+        """Lấy tối đa max_items gói tin; chờ tối đa timeout giây nếu bộ đệm rỗng."""
+        with self._lock:
+            if not self._items and not self._closed:
+                self._not_empty.wait(timeout)
+            n = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(n)]
+            if n:
+                self._not_full.notify_all()
+            return batch
+
+    def close(self):
+        """Không nhận thêm gói tin; luồng phân tích xử lý nốt phần còn lại rồi dừng."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def drained(self):
+        """True khi đã đóng và không còn gói tin nào chờ xử lý."""
+        with self._lock:
+            return self._closed and not self._items
+
+    @property
+    def backlog(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'pushed': self.pushed,
+                'dropped': self.dropped,
+                'backlog': len(self._items),
+                'max_backlog': self.max_backlog,
+            }
+
+
+class MergedCaptureStream:
+    """
+    (MỚI) Gộp các bộ đệm vòng của nhiều giao diện thành MỘT luồng theo thứ tự thời điểm bắt gói.
+    Mỗi giao diện có bộ đệm riêng nên một giao diện chậm/đầy không chặn các giao diện khác.
+    Một gói được đưa ra khi mọi giao diện khác đã có gói mới hơn nó, hoặc khi đã chờ quá max_delay giây
+    (giao diện im lặng không giữ cả luồng). timestamp_of(item) trả về thời điểm bắt gói của phần tử.
+    Có cùng giao diện get_batch()/drained với CaptureRingBuffer để dùng trong run_analysis_loop.
+    """
+    def __init__(self, rings, timestamp_of, max_delay=0.05, wakeup=None):
+        self.rings = dict(rings)
+        self.timestamp_of = timestamp_of
+        self.max_delay = max_delay
+        self._wakeup = wakeup or threading.Event()
+        self._heap = []
+        self._seq = 0
+        self._last_ts = {name: None for name in self.rings}
+
+    def _pull(self, max_items):
+        # Chỉ lấy phần còn trống của hàng gộp (tối đa max_items, chia đều cho các giao diện): phần tồn đọng
+        # nằm lại trong các bộ đệm vòng có giới hạn, nơi chính sách tràn và bộ đếm gói bỏ vẫn áp dụng.
+        room = max_items - len(self._heap)
+        share = max(1, room // len(self.rings)) if room > 0 else 0
+        head_ts = self._heap[0][0] if self._heap else None
+        now = time.monotonic()
+        for name, ring in self.rings.items():
+            n = share
+            last = self._last_ts[name]
+            if not n and head_ts is not None and (last is None or last < head_ts):
+                # Hàng gộp đầy nhưng giao diện này còn chậm hơn gói đầu hàng: lấy thêm một gói
+                # để gói đầu hàng không phải chờ hết max_delay
+                n = 1
+            if not n:
+                continue
+            for item in ring.get_batch(n, timeout=0):
+                ts = self.timestamp_of(item)
+                heapq.heappush(self._heap, (ts, self._seq, now, item))
+                self._seq += 1
+                self._last_ts[name] = ts
+
+    def _ready(self, ts, arrival, now, closing):
+        if closing or now - arrival >= self.max_delay:
+            return True
+        # Giao diện đã dừng (bộ đệm đóng và rỗng) không còn giữ thứ tự
+        return all((last is not None and last >= ts) or self.rings[name].drained for name, last in self._last_ts.items())
+
+    def get_batch(self, max_items=256, timeout=0.02):
+        self._wakeup.clear()
+        self._pull(max_items)
+        if not self._heap:
+            self._wakeup.wait(timeout)
+            self._pull(max_items)
+        closing = all(ring.drained for ring in self.rings.values())
+        now = time.monotonic()
+        batch = []
+        while self._heap and len(batch) < max_items:
+            ts, _, arrival, item = self._heap[0]
+            if not self._ready(ts, arrival, now, closing):
+                break
+            heapq.heappop(self._heap)
+            batch.append(item)
+        if not batch and self._heap and not closing:
+            # Chờ gói đầu hàng đủ hạn max_delay thay vì quay vòng liên tục
+            self._wakeup.wait(min(timeout, self.max_delay))
+        return batch
+
+    @property
+    def drained(self):
+        return not self._heap and all(ring.drained for ring in self.rings.values())
+
+    @property
+    def backlog(self):
+        return len(self._heap) + sum(ring.backlog for ring in self.rings.values())
+
+
+class MessageBatcher:
+    """
+    (MỚI) Gom bản ghi kết quả thành lô trước khi đưa vào hàng đợi của giao diện: một thông điệp
+    (msg_type, [bản ghi, ...]) thay cho một thông điệp mỗi gói tin. Lô được gửi khi đủ max_items bản ghi,
+    hoặc khi bản ghi đầu lô đã chờ quá max_delay giây (flush_if_due, gọi định kỳ từ luồng phân tích).
+    An toàn luồng: luồng phân tích và luồng thu gom của tiến trình con cùng gọi được.
+    """
+    def __init__(self, out_queue, msg_type="PACKETS", max_items=512, max_delay=0.05):
+        self.out_queue = out_queue
+        self.msg_type = msg_type
+        self.max_items = max(1, int(max_items))
+        self.max_delay = max_delay
+        self._items = []
+        self._first = None
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            if not self._items:
+                self._first = time.monotonic()
+            self._items.append(item)
+            if len(self._items) >= self.max_items:
+                self._send()
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._items and time.monotonic() - self._first >= self.max_delay:
+                self._send()
+
+    def flush(self):
+        with self._lock:
+            if self._items:
+                self._send()
+
+    def _send(self):
+        self.out_queue.put((self.msg_type, self._items))
+        self._items = []
+
+
+def run_analysis_loop(ring, process_item, on_tick, batch_size=256, tick=0.02):
+    """
+    Vòng lặp của luồng phân tích: lấy gói tin theo lô từ bộ đệm và xử lý từng gói.
+    on_tick() được gọi sau mỗi lượt (kể cả khi rỗng) để xả lô AI quá hạn.
+    Kết thúc khi bộ đệm đã đóng và được xử lý hết.
+    """
+    while True:
+        batch = ring.get_batch(batch_size, timeout=tick)
+        for item in batch:
+            process_item(item)
+        on_tick()
+        if not batch and ring.drained:
+            break
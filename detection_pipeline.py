@@ -0,0 +1,112 @@
+# file: detection_pipeline.py
+# -*- coding: utf-8 -*-
+
+import datetime
+import time
+
+from anomaly_detector import MicroBatcher
+from packet_view import TCP_RST
+
+
+# Chu kỳ (giây) dọn các bộ theo dõi hành vi đã hết hạn
+PRUNE_INTERVAL = 10
+# Số byte đầu của khung được giữ lại trong bản ghi (đủ cho tiêu đề Ethernet/VLAN + IP + TCP có tùy chọn)
+HEADER_BYTES = 128
+
+
+def format_event_time(timestamp):
+    """Chuỗi hiển thị thời điểm bắt gói, giữ độ chính xác micro giây (HH:MM:SS.ffffff)."""
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")
+
+
+def check_rules(view):
+    """Tầng 1 - Phân tích Quy tắc: phát hiện các lỗi mạng kỹ thuật rõ ràng."""
+    if view.l4 == 'TCP' and view.tcp_flags & TCP_RST:
+        return "LỖI PHẦN MỀM: Gói tin TCP Reset (RST) - Kết nối bị từ chối."
+    if view.l4 == 'ICMP':
+        if view.icmp_type == 3: return "LỖI MẠNG: ICMP Destination Unreachable."
+        if view.icmp_type == 11: return "LỖI MẠNG: ICMP Time Exceeded."
+        if view.icmp_type == 5: return "CẢNH BÁO MẠNG: ICMP Redirect."
+    return ""
+
+
+class DetectionPipeline:
+    """
+    (MỚI) Quy trình phát hiện 3 tầng (Quy tắc, AI Hành vi, AI Thống kê) cho từng PacketView.
+    Dùng chung cho giao diện, tiến trình phân tích con và chế độ không giao diện.
+    on_record(packet_data) được gọi theo đúng thứ tự gói tin sau khi AI chấm điểm theo lô.
+    """
+    def __init__(self, ai_detector, behavior_analyzer, on_record, target_ips=None, batch_size=256, max_delay=0.02):
+        self.ai_detector = ai_detector
+        self.behavior_analyzer = behavior_analyzer
+        self.on_record = on_record
+        self.target_ips = set(target_ips or ())
+        self.batcher = MicroBatcher(ai_detector, self._on_batch_scored, batch_size=batch_size, max_delay=max_delay)
+        self._last_prune = None
+
+    def process(self, view, iface=None):
+        """
+        Phân tích một gói tin.
+        (CẬP NHẬT) Không tạo chuỗi tóm tắt: kho gói tin dựng tóm tắt từ byte tiêu đề khi hiển thị.
+        iface: tên giao diện đã bắt gói tin (gắn vào bản ghi khi giám sát nhiều giao diện).
+        (CẬP NHẬT) Mọi tầng dùng thời điểm bắt gói (view.time); chỉ dùng đồng hồ hệ thống khi gói không có timestamp.
+        """
+        if not view.time:
+            view.time = time.time()
+        now = view.time
+        # (MỚI) Định kỳ dọn bộ theo dõi hành vi đã hết hạn (cùng luồng với phân tích, giữ bộ nhớ ổn định)
+        if self._last_prune is None:
+            self._last_prune = now
+        elif now - self._last_prune >= PRUNE_INTERVAL:
+            self._last_prune = now
+            self.behavior_analyzer.prune(now)
+        features = self.ai_detector._extract_features(view)
+        behavior_analysis = self.behavior_analyzer.process_packet(view)
+        rule_analysis = check_rules(view)
+
+        packet_data = None
+        # (CẬP NHẬT) Logic Lọc IP Mục tiêu
+        # Thông thường kernel (BPF) đã lọc; kiểm tra này chỉ là dự phòng khi không gắn được bộ lọc.
+        # Gói không phải mục tiêu vẫn đi qua AI (để huấn luyện) nhưng không được hiển thị
+        if not self.target_ips or view.host_src in self.target_ips or view.host_dst in self.target_ips:
+            # (CẬP NHẬT) Không giải mã sẵn các tầng: giữ byte tiêu đề, chi tiết được giải mã lại khi cần
+            packet_data = {
+                'raw': bytes(view.raw[:HEADER_BYTES]),
+                'linktype': view.linktype,
+                'ip_version': view.ip_version if view.has_ip else 0,
+                'src': view.host_src,
+                'dst': view.host_dst,
+                'sport': view.sport,
+                'dport': view.dport,
+                'features': features,
+                'rule_analysis': rule_analysis,
+                'behavior_analysis': behavior_analysis,
+                'proto_name': view.proto_name,
+                'iface': iface,
+                'timestamp': now, # Thời điểm bắt gói (epoch, giây)
+                'time': format_event_time(now) # Lưu thời gian
+            }
+
+        # (MỚI) Dự đoán AI theo lô; kết quả trả về _on_batch_scored theo đúng thứ tự
+        self.batcher.add(features, packet_data)
+
+    def _on_batch_scored(self, results):
+        for packet_data, prediction in results:
+            if packet_data is None: continue # Không phải mục tiêu
+
+            # (CẬP NHẬT) Logic gán Tag
+            tag = 'normal'
+            if packet_data['behavior_analysis'] or packet_data['rule_analysis']:
+                tag = 'danger'
+            elif prediction == -1:
+                tag = 'anomaly'
+
+            packet_data['prediction'] = prediction
+            packet_data['tag'] = tag
+            self.on_record(packet_data)
+
+    def flush_if_due(self):
+        self.batcher.flush_if_due()
+
+    def flush(self):
+        self.batcher.flush()
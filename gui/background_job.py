@@ -0,0 +1,95 @@
+# file: gui/background_job.py
+# -*- coding: utf-8 -*-
+
+import threading
+import traceback
+
+
+class JobCancelled(Exception):
+    """Công việc nền đã bị hủy (ném ra từ BackgroundJob.progress ở bước kế tiếp)."""
+
+
+class BackgroundJob:
+    """
+    (MỚI) Chạy phần xử lý dữ liệu nặng (lọc, tổng hợp, chuẩn bị dữ liệu biểu đồ) trên một luồng nền để cửa sổ
+    không bị treo. work(job) chạy trên luồng nền và trả về kết quả; giữa các bước nó gọi job.progress(tỉ_lệ, mô_tả),
+    hàm này ném JobCancelled nếu công việc đã bị hủy.
+    Luồng nền không chạm vào widget: tiến độ và kết quả được luồng Tk đọc định kỳ qua root.after, rồi
+    on_progress / on_done / on_error được gọi trên luồng giao diện. Sau cancel() không còn callback nào được gọi.
+    """
+    def __init__(self, root, work, on_done, on_progress=None, on_error=None, poll_ms=50):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.poll_ms = max(10, int(poll_ms))
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._progress = (0.0, "")
+        self._reported = None
+        self._finished = False
+        self._result = None
+        self._error = None
+        self._thread = None
+        self._poll_job = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._poll_job = self.root.after(self.poll_ms, self._poll)
+        return self
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def progress(self, fraction, text=""):
+        """Gọi từ luồng nền: ghi tiến độ (0..1) và dừng công việc nếu đã bị hủy."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self._progress = (max(0.0, min(1.0, float(fraction))), text)
+
+    def cancel(self, wait=0.0):
+        """
+        Hủy công việc (gọi trên luồng Tk): bỏ kết quả và ngừng kiểm tra tiến độ. wait > 0: chờ tối đa wait giây
+        cho luồng nền dừng (trước khi đóng hoặc thay kho gói tin mà nó đang đọc).
+        """
+        self._cancel_event.set()
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        if wait and self._thread is not None:
+            self._thread.join(wait)
+
+    def _run(self):
+        result = error = None
+        try:
+            result = self.work(self)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            traceback.print_exc()
+            error = e
+        with self._lock:
+            self._finished = True
+            self._result, self._error = result, error
+
+    def _poll(self):
+        self._poll_job = None
+        if self._cancel_event.is_set():
+            return
+        with self._lock:
+            finished, progress = self._finished, self._progress
+            result, error = self._result, self._error
+        if not finished:
+            if self.on_progress and progress != self._reported:
+                self._reported = progress
+                self.on_progress(*progress)
+            self._poll_job = self.root.after(self.poll_ms, self._poll)
+        elif error is not None:
+            if self.on_error:
+                self.on_error(error)
+        else:
+            self.on_done(result)
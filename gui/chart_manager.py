@@ -0,0 +1,68 @@
+# file: gui/chart_manager.py
+# -*- coding: utf-8 -*-
+
+
+class ChartManager:
+    """
+    (MỚI) Giữ các Figure / canvas của Tab Thống kê suốt đời ứng dụng (tạo một lần, sau đó chỉ cập nhật dữ liệu
+    các đối tượng vẽ) cùng dữ liệu đã tổng hợp lần gần nhất.
+    data: kết quả prepare_statistics gần nhất; data['key'] cho biết nó được tính từ kho nào, ở bao nhiêu gói tin,
+    nên vẽ lại / đổi giao diện / xuất PDF dùng lại được mà không đếm lại. Đổi giao diện sáng / tối chỉ đổi màu
+    của các đối tượng vẽ đã có (restyle), không dựng lại Figure.
+    """
+    def __init__(self):
+        self._figures = {}     # Tên biểu đồ -> Figure
+        self.widgets = []      # Widget Tk của các canvas / thanh công cụ
+        self.data = None
+
+    def __bool__(self):
+        return bool(self._figures)
+
+    def get(self, name):
+        return self._figures.get(name)
+
+    def figures(self):
+        return list(self._figures.values())
+
+    def add(self, name, fig):
+        if fig is not None:
+            self._figures[name] = fig
+
+    def has_all(self, names):
+        return all(self._figures.get(name) for name in names)
+
+    def cache(self, data):
+        self.data = data
+
+    def cached(self, key):
+        """Dữ liệu đã tổng hợp nếu vẫn đúng với key (kho, số gói tin, cách chia), ngược lại None."""
+        if self.data is not None and self.data.get('key') == key:
+            return self.data
+        return None
+
+    def invalidate(self):
+        self.data = None
+
+    def restyle(self, facecolor, textcolor):
+        """Đổi màu nền / chữ / trục / chú thích của mọi biểu đồ đã có rồi vẽ lại khi rảnh."""
+        for fig in self.figures():
+            fig.set_facecolor(facecolor)
+            for text in fig.texts:
+                text.set_color(textcolor)
+            for ax in fig.axes:
+                ax.set_facecolor(facecolor)
+                ax.tick_params(which='both', colors=textcolor)
+                for spine in ax.spines.values():
+                    spine.set_edgecolor(textcolor)
+                ax.xaxis.label.set_color(textcolor)
+                ax.yaxis.label.set_color(textcolor)
+                ax.title.set_color(textcolor)
+                for text in ax.texts:
+                    text.set_color(textcolor)
+                legend = ax.get_legend()
+                if legend is not None:
+                    legend.get_frame().set_facecolor(facecolor)
+                    legend.get_title().set_color(textcolor)
+                    for text in legend.get_texts():
+                        text.set_color(textcolor)
+            fig.canvas.draw_idle()
@@ -4,6 +4,8 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, Toplevel
 
+from gui.virtual_tree import VirtualTreeview
+
 class MonitorTab(ttk.Frame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, **kwargs)
@@ -20,6 +22,9 @@ class MonitorTab(ttk.Frame):
         self.app.iface_var = tk.StringVar()
         self.app.iface_combo = ttk.Combobox(control_frame, textvariable=self.app.iface_var, width=30, state='readonly')
         self.app.iface_combo.pack(side='left', fill='x', expand=True, padx=5)
+        # (MỚI) Giám sát nhiều giao diện cùng lúc
+        self.app.multi_iface_button = ttk.Button(control_frame, text="🖧 Nhiều giao diện", command=self.app.show_interface_selector, style="App.TButton")
+        self.app.multi_iface_button.pack(side='left', padx=5)
         
         # (MỚI) Nút Quét thiết bị LAN
         self.app.scan_lan_button = ttk.Button(control_frame, text="🔍 Quét thiết bị", command=self.app.show_device_scanner, style="App.TButton")
@@ -27,6 +32,14 @@ class MonitorTab(ttk.Frame):
 
         self.app.start_button = ttk.Button(control_frame, text="Bắt đầu quét", command=self.app.start_scan, style="App.TButton")
         self.app.start_button.pack(side='left', padx=5)
+        # (MỚI) Phân tích ngoại tuyến từ file pcap/pcapng
+        self.app.open_pcap_button = ttk.Button(control_frame, text="📂 Mở file pcap", command=self.app.open_pcap_file, style="App.TButton")
+        self.app.open_pcap_button.pack(side='left', padx=5)
+        # (MỚI) Lưu / mở lại phiên (không phải phát hiện lại)
+        self.app.save_session_button = ttk.Button(control_frame, text="💾 Lưu phiên", command=self.app.save_session, state='disabled', style="App.TButton")
+        self.app.save_session_button.pack(side='left', padx=5)
+        self.app.open_session_button = ttk.Button(control_frame, text="📁 Mở phiên", command=self.app.open_session, style="App.TButton")
+        self.app.open_session_button.pack(side='left', padx=5)
         self.app.stop_button = ttk.Button(control_frame, text="Dừng quét", command=self.app.stop_scan, state='disabled', style="App.TButton")
         self.app.stop_button.pack(side='left', padx=5)
         self.app.retrain_button = ttk.Button(control_frame, text="Huấn luyện lại", command=self.app.clear_model, style="App.TButton")
@@ -36,7 +49,7 @@ class MonitorTab(ttk.Frame):
         filter_frame = ttk.Frame(self, style="White.TFrame", relief=tk.RIDGE, borderwidth=1)
         filter_frame.pack(fill='x', pady=5, padx=2)
         
-        ttk.Label(filter_frame, text="Tìm kiếm:", style="White.TLabel").pack(side='left', padx=5)
+        ttk.Label(filter_frame, text="Tìm kiếm / truy vấn (vd: ip==10.0.0.5 && dport in 22,3389 && tag==danger):", style="White.TLabel").pack(side='left', padx=5)
         self.app.search_var = tk.StringVar()
         self.app.search_entry = ttk.Entry(filter_frame, textvariable=self.app.search_var, width=40)
         self.app.search_entry.pack(side='left', fill='x', expand=True, padx=5, pady=5)
@@ -71,19 +84,20 @@ class MonitorTab(ttk.Frame):
         ttk.Label(report_frame, text="Danh sách Gói tin", font=("Arial", 12, "bold"), style="White.TLabel").pack(pady=5)
         
         cols = ('id', 'time', 'summary', 'status')
-        self.app.report_tree = ttk.Treeview(report_frame, columns=cols, show='headings')
+        # (CẬP NHẬT) Danh sách ảo: chỉ các dòng đang nhìn thấy (cộng khoảng đệm) là dòng Treeview thật
+        self.app.report_tree = VirtualTreeview(report_frame, columns=cols, show='headings')
         self.app.report_tree.heading('id', text='ID')
         self.app.report_tree.heading('time', text='Thời gian')
         self.app.report_tree.heading('summary', text='Tóm tắt')
         self.app.report_tree.heading('status', text='Trạng thái')
         
         self.app.report_tree.column('id', width=50, anchor='center')
-        self.app.report_tree.column('time', width=100, anchor='center')
+        self.app.report_tree.column('time', width=120, anchor='center')
         self.app.report_tree.column('summary', width=450)
         self.app.report_tree.column('status', width=100, anchor='center')
         
         tree_scroll = ttk.Scrollbar(report_frame, orient="vertical", command=self.app.report_tree.yview)
-        self.app.report_tree.configure(yscrollcommand=tree_scroll.set)
+        self.app.report_tree.set_scrollbar(tree_scroll)
         tree_scroll.pack(side='right', fill='y')
         self.app.report_tree.pack(fill='both', expand=True, padx=5, pady=5)
         self.app.report_tree.bind('<<TreeviewSelect>>', self.app.on_packet_select)
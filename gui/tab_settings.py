@@ -4,6 +4,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from capture_buffer import OVERFLOW_POLICIES
+
 class SettingsTab(ttk.Frame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, **kwargs)
@@ -37,6 +39,36 @@ class SettingsTab(ttk.Frame):
 
         f3 = create_setting_entry(settings_frame, "Phát hiện Tấn công Lũ lụt (Số gói tin):", "flood_count")
         create_setting_entry(f3, "Trong (giây):", "flood_window")
+
+        ttk.Label(settings_frame, text="Hiệu năng (Gateway)", font=("Arial", 11, "bold"), style="App.TLabel").pack(fill='x', pady=(15, 5))
+        f4 = create_setting_entry(settings_frame, "Số gói tin mỗi lô dự đoán AI:", "batch_size")
+        create_setting_entry(f4, "Chờ tối đa (ms):", "batch_max_delay_ms")
+        create_setting_entry(settings_frame, "Snaplen - chỉ bắt tiêu đề (byte, 0 = toàn bộ):", "snaplen")
+        create_setting_entry(settings_frame, "Tốc độ phát lại file pcap (x lần, 0 = tối đa):", "replay_speed")
+        create_setting_entry(settings_frame, "Số tiến trình phân tích song song (0 = tắt):", "analysis_workers")
+        f5 = create_setting_entry(settings_frame, "Dung lượng bộ đệm bắt gói (số gói tin):", "ring_capacity")
+        ttk.Label(f5, text="Khi đầy:", style="App.TLabel").pack(side=tk.LEFT, padx=5)
+        self.app.config_vars["ring_overflow_policy"] = tk.StringVar(value=self.app.config.get("ring_overflow_policy", "drop_newest"))
+        ttk.Combobox(f5, textvariable=self.app.config_vars["ring_overflow_policy"], values=OVERFLOW_POLICIES, state="readonly", width=12).pack(side=tk.LEFT, padx=5)
+        create_setting_entry(settings_frame, "Thời gian chờ gộp nhiều giao diện (ms):", "merge_delay_ms")
+        f6 = create_setting_entry(settings_frame, "Lưu phiên vào SQLite trên đĩa (1 = bật, 0 = tắt):", "session_db")
+        create_setting_entry(f6, "Bộ nhớ đệm nóng (dòng):", "session_hot_cache")
+        create_setting_entry(settings_frame, "Số dòng mỗi giao dịch ghi SQLite:", "session_batch_size")
+        f7 = create_setting_entry(settings_frame, "Cửa sổ lưu giữ gói bình thường (1 = bật, 0 = tắt):", "retention_mode")
+        create_setting_entry(f7, "Trong (phút):", "retention_minutes")
+        f8 = create_setting_entry(settings_frame, "Số gói bình thường tối đa giữ lại:", "retention_packets")
+        create_setting_entry(f8, "Gói ngữ cảnh quanh cảnh báo:", "retention_context")
+        f9 = create_setting_entry(settings_frame, "Danh sách trực tiếp khi quét (1 = bật, 0 = tắt):", "live_view")
+        create_setting_entry(f9, "Khung hình/giây:", "live_view_fps")
+        f10 = create_setting_entry(settings_frame, "Số dòng mới nhất hiển thị trực tiếp:", "live_view_rows")
+        create_setting_entry(f10, "Chỉ hiện cảnh báo khi vượt (gói/s):", "live_alert_only_pps")
+        f11 = create_setting_entry(settings_frame, "Số gói tin mỗi lô gửi về giao diện:", "queue_batch_size")
+        create_setting_entry(f11, "Thời gian xử lý mỗi lượt (ms):", "queue_budget_ms")
+        f12 = create_setting_entry(settings_frame, "Chu kỳ kiểm tra hàng đợi khi rảnh (ms):", "queue_poll_ms")
+        create_setting_entry(f12, "Cập nhật Thống kê khi quét (ms, 0 = tắt):", "live_stats_ms")
+        create_setting_entry(settings_frame, "Số mục theo dõi Top IP / Cổng (bộ nhớ cố định):", "top_capacity")
+        f13 = create_setting_entry(settings_frame, "Cửa sổ đếm số lượng khác nhau (giây):", "distinct_window_s")
+        create_setting_entry(f13, "Số máy theo dõi tối đa:", "distinct_keys")
         
         save_button = ttk.Button(self, text="Lưu Cài đặt", command=self.app.save_config, style="App.TButton")
         save_button.pack(pady=20, anchor='w', padx=5)
\ No newline at end of file
@@ -9,14 +9,43 @@ import os
 
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.ticker import FuncFormatter
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 from pdf_report import PDFReport 
+from packet_store import VERDICTS, VERDICT_CODES, PROTO_NAMES
+from packet_view import int_to_ipv4
+from sketches import DISTINCT_METRICS, DistinctCounts
+from time_series import SERIES_MAX_POINTS, TrafficSeries, lttb, nice_bucket
+
+# Số cột của biểu đồ Top N (cố định để cập nhật tại chỗ khi đang quét)
+TOP_N = 5
+CHART_NAMES = ('pie_chart', 'ip_chart', 'port_chart', 'series_chart', 'distinct_chart')
+# (MỚI) Biểu đồ lưu lượng theo thời gian: cách chia các đường gói/giây, byte/giây (chiều của TrafficSeries)
+SERIES_GROUPS = {"Giao thức": 0, "Phán quyết": 1}
+SERIES_METRICS = (('packets', "Gói tin / giây"), ('bytes', "Byte / giây"), ('alerts', "Cảnh báo / giây"))
+VERDICT_LABELS = {'normal': "Bình thường", 'anomaly': "Bất thường", 'danger': "Nguy hiểm"}
+SERIES_ZOOM_DELAY_MS = 250   # Chờ người dùng phóng to / kéo xong rồi mới tính lại chi tiết
+# (MỚI) Số lượng khác nhau theo máy (HyperLogLog): trong cửa sổ gần nhất hoặc toàn phiên
+DISTINCT_SCOPES = {"Cửa sổ gần nhất": 'window', "Toàn phiên": 'session'}
+
+
+def _format_clock(value, pos=None):
+    # Trục thời gian: giờ địa phương, thêm mili giây khi phóng to dưới 1 giây
+    ms = int(round(value * 1000))
+    text = datetime.datetime.fromtimestamp(ms // 1000).strftime("%H:%M:%S")
+    return f"{text}.{ms % 1000:03d}" if ms % 1000 else text
+
 
 class StatisticsTab(ttk.Frame):
     def __init__(self, parent, app, **kwargs):
         super().__init__(parent, **kwargs)
         self.app = app 
+        self.series_axis = 0              # (MỚI) Chia đường lưu lượng theo giao thức (0) / phán quyết (1)
+        self.series_range = None          # (đầu, cuối) đoạn đang phóng to; None = toàn phiên (cập nhật trực tiếp)
+        self._series_zoom_job = None
+        self._series_updating = False
+        self.distinct_scope = 'window'    # (MỚI) Phạm vi của biểu đồ số lượng khác nhau (DISTINCT_SCOPES)
 
         self.create_widgets()
 
@@ -27,13 +56,16 @@ class StatisticsTab(ttk.Frame):
         self.app.export_pdf_button = ttk.Button(stats_control_frame, text="Xuất Báo cáo PDF...", command=self.export_to_pdf, style="App.TButton", state="disabled")
         self.app.export_pdf_button.pack(side=tk.LEFT, anchor='w', pady=5)
         
-        ttk.Label(self, text="* Biểu đồ sẽ được tạo/cập nhật khi bạn dừng quét.", style="App.TLabel").pack(anchor='w', fill='x', pady=5)
+        ttk.Label(self, text="* Biểu đồ được cập nhật trực tiếp khi đang quét và tổng hợp đầy đủ khi bạn dừng quét.", style="App.TLabel").pack(anchor='w', fill='x', pady=5)
         
         self.stats_main_frame = ttk.Frame(self, style="App.TFrame")
         self.stats_main_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
         
-        top_charts_pane = ttk.PanedWindow(self.stats_main_frame, orient=tk.HORIZONTAL)
-        top_charts_pane.pack(fill=tk.BOTH, expand=True)
+        main_pane = ttk.PanedWindow(self.stats_main_frame, orient=tk.VERTICAL)
+        main_pane.pack(fill=tk.BOTH, expand=True)
+
+        top_charts_pane = ttk.PanedWindow(main_pane, orient=tk.HORIZONTAL)
+        main_pane.add(top_charts_pane, weight=40)
         
         self.app.stats_pie_frame = ttk.Frame(top_charts_pane, style="White.TFrame", relief=tk.RIDGE, borderwidth=2)
         top_charts_pane.add(self.app.stats_pie_frame, weight=40) 
@@ -49,34 +81,50 @@ class StatisticsTab(ttk.Frame):
         self.app.stats_bar_ports_frame = ttk.Frame(right_pane_vertical, style="White.TFrame", relief=tk.RIDGE, borderwidth=2)
         right_pane_vertical.add(self.app.stats_bar_ports_frame, weight=50)
 
-    def _process_statistics(self):
-        ip_counter = Counter()
-        port_counter = Counter()
-        proto_counter = Counter()
-        alert_counter = Counter()
+        # (MỚI) Lưu lượng theo thời gian, phóng to bằng thanh công cụ của biểu đồ
+        series_frame = ttk.Frame(main_pane, style="App.TFrame")
+        main_pane.add(series_frame, weight=30)
+        series_control_frame = ttk.Frame(series_frame, style="App.TFrame")
+        series_control_frame.pack(fill='x', pady=(5, 0))
+        ttk.Label(series_control_frame, text="Lưu lượng theo thời gian, chia theo:", style="App.TLabel").pack(side=tk.LEFT)
+        self.series_group_var = tk.StringVar(value="Giao thức")
+        series_combo = ttk.Combobox(series_control_frame, textvariable=self.series_group_var, values=list(SERIES_GROUPS), state="readonly", width=12)
+        series_combo.pack(side=tk.LEFT, padx=5)
+        series_combo.bind("<<ComboboxSelected>>", self.on_series_group_changed)
+        ttk.Button(series_control_frame, text="Xem toàn phiên", command=self.reset_series_zoom, style="App.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Label(series_control_frame, text="(Kính lúp trên thanh công cụ: phóng to một đoạn thời gian để xem chi tiết)", style="App.TLabel").pack(side=tk.LEFT, padx=5)
+        self.app.stats_series_frame = ttk.Frame(series_frame, style="White.TFrame", relief=tk.RIDGE, borderwidth=2)
+        self.app.stats_series_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
 
-        for pkt in self.app.all_packets_data:
-            tag = pkt.get('tag', 'normal') # Dùng .get để tránh lỗi nếu thiếu key
-            if tag == 'danger':
-                alert_counter['Nguy hiểm (Tấn công)'] += 1
-            elif tag == 'anomaly':
-                alert_counter['Bất thường (Thống kê)'] += 1
-            
-            proto_counter[pkt.get('proto_name', 'Other')] += 1
-            
-            if 'IP' in pkt['parsed_layers']:
-                ip_counter[pkt['parsed_layers']['IP']['src']] += 1
-                ip_counter[pkt['parsed_layers']['IP']['dst']] += 1
-            if 'TCP' in pkt['parsed_layers']:
-                port_counter[f"{pkt['parsed_layers']['TCP']['dport']}/TCP"] += 1
-            elif 'UDP' in pkt['parsed_layers']:
-                port_counter[f"{pkt['parsed_layers']['UDP']['dport']}/UDP"] += 1
+        # (MỚI) Số lượng khác nhau theo máy: nhiều nguồn tới một đích (DDoS / giả mạo), nhiều cổng / máy từ một nguồn (quét)
+        distinct_frame = ttk.Frame(main_pane, style="App.TFrame")
+        main_pane.add(distinct_frame, weight=30)
+        distinct_control_frame = ttk.Frame(distinct_frame, style="App.TFrame")
+        distinct_control_frame.pack(fill='x', pady=(5, 0))
+        ttk.Label(distinct_control_frame, text="Số lượng khác nhau theo máy (ước lượng HyperLogLog, sai số ~3%), trong:", style="App.TLabel").pack(side=tk.LEFT)
+        self.distinct_scope_var = tk.StringVar(value="Cửa sổ gần nhất")
+        distinct_combo = ttk.Combobox(distinct_control_frame, textvariable=self.distinct_scope_var, values=list(DISTINCT_SCOPES), state="readonly", width=16)
+        distinct_combo.pack(side=tk.LEFT, padx=5)
+        distinct_combo.bind("<<ComboboxSelected>>", self.on_distinct_scope_changed)
+        self.app.stats_distinct_frame = ttk.Frame(distinct_frame, style="White.TFrame", relief=tk.RIDGE, borderwidth=2)
+        self.app.stats_distinct_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+
+    def _process_statistics(self, store=None):
+        # (CẬP NHẬT) Đếm trực tiếp trên các cột NumPy của kho gói tin
+        store = self.app.packet_store if store is None else store
+        verdict_counts = store.verdict_counts()
+        alert_counter = Counter()
+        if verdict_counts[VERDICT_CODES['danger']]:
+            alert_counter['Nguy hiểm (Tấn công)'] = int(verdict_counts[VERDICT_CODES['danger']])
+        if verdict_counts[VERDICT_CODES['anomaly']]:
+            alert_counter['Bất thường (Thống kê)'] = int(verdict_counts[VERDICT_CODES['anomaly']])
         
-        return ip_counter, port_counter, proto_counter, alert_counter
+        # (CẬP NHẬT) Top IP / cổng lấy từ bản tóm tắt Top-k của kho (bộ nhớ cố định), chỉ TOP_N mục
+        return store.ip_counts(TOP_N), store.port_counts(TOP_N), store.proto_counts(), alert_counter
 
     def export_to_pdf(self):
         self.app.status_var.set("Đang chuẩn bị xuất PDF...")
-        if not self.app.all_packets_data:
+        if not self.app.packet_store:
             messagebox.showerror("Lỗi", "Không có dữ liệu để xuất. Hãy chạy một phiên quét trước.")
             return
 
@@ -93,42 +141,47 @@ class StatisticsTab(ttk.Frame):
         self.app.status_var.set("Đang xử lý dữ liệu báo cáo...")
         
         try:
-            ip_counter, port_counter, proto_counter, alert_counter = self._process_statistics()
-            total_packets = len(self.app.all_packets_data)
+            # (CẬP NHẬT) Dùng lại dữ liệu đã tổng hợp và các biểu đồ đang hiển thị (chỉ tổng hợp lại khi kho đã thay đổi)
+            alert_counter = self.current_statistics()['alerts']
+            # (CẬP NHẬT) Tổng trên toàn phiên, kể cả gói đã bị loại khỏi cửa sổ lưu giữ
+            total_packets = self.app.packet_store.total_count()
+            evicted_packets = self.app.packet_store.evicted_count
+            retention_note = f"  (Cửa sổ lưu giữ: {evicted_packets} gói bình thường đã được giải phóng, chỉ còn trong bộ đếm)\n" if evicted_packets else ""
             total_alerts = sum(alert_counter.values())
-            
-            # (SỬA LỖI QUAN TRỌNG) Gọi hàm của chính class này (self), không phải self.app
-            if not self.app.charts:
-                self.update_statistics_tab()
 
             chart_files = []
             # Lưu ảnh với DPI cao
             if self.app.charts.get('pie_chart'):
-                self.app.charts['pie_chart'].savefig("pie_chart.png", bbox_inches='tight', dpi=150)
+                self.app.charts.get('pie_chart').savefig("pie_chart.png", bbox_inches='tight', dpi=150)
                 chart_files.append("pie_chart.png")
             if self.app.charts.get('ip_chart'):
-                self.app.charts['ip_chart'].savefig("ip_chart.png", bbox_inches='tight', dpi=150)
+                self.app.charts.get('ip_chart').savefig("ip_chart.png", bbox_inches='tight', dpi=150)
                 chart_files.append("ip_chart.png")
             if self.app.charts.get('port_chart'):
-                self.app.charts['port_chart'].savefig("port_chart.png", bbox_inches='tight', dpi=150)
+                self.app.charts.get('port_chart').savefig("port_chart.png", bbox_inches='tight', dpi=150)
                 chart_files.append("port_chart.png")
+            if self.app.charts.get('series_chart'):
+                self.app.charts.get('series_chart').savefig("series_chart.png", bbox_inches='tight', dpi=150)
+                chart_files.append("series_chart.png")
+            if self.app.charts.get('distinct_chart'):
+                self.app.charts.get('distinct_chart').savefig("distinct_chart.png", bbox_inches='tight', dpi=150)
+                chart_files.append("distinct_chart.png")
 
             alert_data = []
-            for pkt in self.app.all_packets_data:
-                tag = pkt.get('tag', 'normal')
-                if tag in ['danger', 'anomaly']:
-                    reason = ""
-                    if pkt.get('rule_analysis'): reason = pkt['rule_analysis']
-                    elif pkt.get('behavior_analysis'): reason = pkt['behavior_analysis'].replace("\n", " ").replace("     ", " ")
-                    elif pkt.get('prediction') == -1 and self.app.ai_detector: 
-                        reason = self.app.ai_detector.explain_anomaly(pkt['features'])
-                    
-                    alert_data.append({
-                        "id": pkt['id'],
-                        "time": pkt.get('time', 'N/A'), # Dùng .get để tránh lỗi
-                        "summary": pkt['summary'],
-                        "reason": reason
-                    })
+            store = self.app.packet_store
+            for alert in store.alerts():
+                reason = ""
+                if alert['rule_analysis']: reason = alert['rule_analysis']
+                elif alert['behavior_analysis']: reason = alert['behavior_analysis'].replace("\n", " ").replace("     ", " ")
+                elif alert['prediction'] == -1 and self.app.ai_detector: 
+                    reason = self.app.ai_detector.explain_anomaly(alert['features'])
+                
+                alert_data.append({
+                    "id": alert['id'],
+                    "time": alert['time'],
+                    "summary": alert['summary'],
+                    "reason": reason
+                })
             
             pdf = PDFReport()
             pdf.set_auto_page_break(True, margin=15)
@@ -138,13 +191,26 @@ class StatisticsTab(ttk.Frame):
             summary_content = (
                 f"Tên chương trình: TANetAI (v{self.app.CURRENT_VERSION})\n"
                 f"Tác giả: Tấn Lai Hoàng\n"
-                f"Giao diện quét: {self.app.iface_var.get()}\n\n"
-                f"Tổng số gói tin đã phân tích: {total_packets}\n"
+                f"Giao diện quét: {getattr(self.app, 'scan_source_label', '') or self.app.iface_var.get()}\n\n"
+                f"Tổng số gói tin đã phân tích: {total_packets}\n{retention_note}"
                 f"Tổng số cảnh báo đã phát hiện: {total_alerts}\n\n"
                 f"Phân loại Cảnh báo:\n"
                 f"  - MỨC ĐỘ NGUY HIỂM (Đỏ): {alert_counter.get('Nguy hiểm (Tấn công)', 0)}\n"
                 f"  - Mức độ Bất thường (Vàng): {alert_counter.get('Bất thường (Thống kê)', 0)}"
             )
+            # (MỚI) Bộ đếm mất gói của phiên quét
+            counters = self.app.capture_stats
+            if counters:
+                summary_content += (
+                    f"\n\nBộ đếm Bắt gói:\n"
+                    f"  - Gói tin bị kernel bỏ (pcap stats): {counters['kernel_dropped']}\n"
+                    f"  - Gói tin bị bỏ do bộ đệm đầy: {counters['ring_dropped']}\n"
+                    f"  - Tồn đọng phân tích cao nhất: {counters['max_backlog']} / {counters['ring_capacity']} gói"
+                )
+                if len(counters.get('interfaces', {})) > 1:
+                    summary_content += "\n\nTheo Giao diện:"
+                    for name, iface_stats in counters['interfaces'].items():
+                        summary_content += f"\n  - {name}: {iface_stats['pushed']} gói tin | kernel bỏ {iface_stats['kernel_dropped']} | bộ đệm bỏ {iface_stats['dropped']}"
             pdf.chapter_body(summary_content)
             
             pdf.add_page()
@@ -166,20 +232,18 @@ class StatisticsTab(ttk.Frame):
             print(f"LỖI XUẤT PDF: {e}")
             messagebox.showerror("Lỗi", f"Không thể xuất PDF: {e}")
             self.app.status_var.set(f"Xuất PDF thất bại: {e}")
-            for f in ["pie_chart.png", "ip_chart.png", "port_chart.png"]:
+            for f in ["pie_chart.png", "ip_chart.png", "port_chart.png", "series_chart.png", "distinct_chart.png"]:
                 if os.path.exists(f): os.remove(f)
 
     def clear_charts(self):
-        for widget in self.app.chart_widgets:
-            widget.destroy()
-        self.app.chart_widgets = []
-        self.app.charts = {} 
+        """(CẬP NHẬT) Phiên mới / mở phiên: đưa các biểu đồ về rỗng; Figure và canvas được giữ lại để dùng tiếp."""
+        self.app.charts.invalidate()
+        self.series_range = None
+        if self.app.charts:
+            self.draw_statistics(self.empty_statistics())
         
-    def _create_bar_chart(self, parent_frame, data, title, xlabel, ylabel):
+    def _create_bar_chart(self, parent_frame, data, title, xlabel, ylabel, error=0):
         try:
-            labels = list(data.keys())
-            values = list(data.values())
-            
             fig = Figure(figsize=(5, 3), dpi=100, facecolor=self.app.chart_facecolor)
             ax = fig.add_subplot(111)
             ax.set_facecolor(self.app.chart_facecolor)
@@ -188,17 +252,22 @@ class StatisticsTab(ttk.Frame):
             ax.yaxis.label.set_color(self.app.chart_textcolor)
             ax.title.set_color(self.app.chart_textcolor)
 
-            ax.bar(labels, values, color=self.app.colors_dark['header'])
+            # (CẬP NHẬT) Luôn TOP_N cột ở vị trí cố định: khi đang quét chỉ đổi chiều cao / nhãn (_update_bar_chart)
+            ax.bar(range(TOP_N), [0] * TOP_N, color=self.app.colors_dark['header'])
+            ax.set_xticks(range(TOP_N))
             ax.set_title(title)
             ax.set_xlabel(xlabel)
             ax.set_ylabel(ylabel)
+            # (MỚI) Ghi chú sai số khi số IP / cổng khác nhau vượt số mục theo dõi (số đếm là ước lượng)
+            ax.text(0.99, 0.97, "", transform=ax.transAxes, ha='right', va='top', fontsize=7, color=self.app.chart_textcolor)
+            self._update_bar_chart(fig, data, redraw=False, error=error)
             fig.tight_layout()
 
             canvas = FigureCanvasTkAgg(fig, master=parent_frame)
             canvas.draw()
             widget = canvas.get_tk_widget()
             widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            self.app.chart_widgets.append(widget)
+            self.app.charts.widgets.append(widget)
             return fig
         except Exception as e:
             print(f"Lỗi vẽ biểu đồ cột: {e}")
@@ -206,17 +275,19 @@ class StatisticsTab(ttk.Frame):
 
     def _create_pie_chart(self, parent_frame, data, title):
         try:
-            labels = list(data.keys())
-            values = list(data.values())
+            # (CẬP NHẬT) Mỗi giao thức một miếng cố định (kể cả 0%): khi đang quét chỉ đổi góc / nhãn (_update_pie_chart)
+            values = [data.get(name, 0) for name in PROTO_NAMES]
             total = sum(values)
 
-            legend_labels = [f"{l} ({v/total*100:.1f}%)" for l, v in zip(labels, values)]
+            legend_labels = [f"{l} ({v/total*100 if total else 0:.1f}%)" for l, v in zip(PROTO_NAMES, values)]
 
             fig = Figure(figsize=(6, 4), dpi=100, facecolor=self.app.chart_facecolor)
             ax = fig.add_subplot(111)
             
-            # Tắt autopct
-            wedges, texts = ax.pie(values, startangle=90)
+            # Tắt autopct (phiên rỗng: các miếng 0 độ, được cập nhật khi có dữ liệu)
+            wedges, texts = ax.pie(values if total else [1] * len(values), startangle=90)
+            if not total:
+                self._update_pie_chart(fig, data, redraw=False)
             
             ax.axis('equal')
             ax.set_title(title, color=self.app.chart_textcolor)
@@ -234,32 +305,334 @@ class StatisticsTab(ttk.Frame):
             canvas.draw()
             widget = canvas.get_tk_widget()
             widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            self.app.chart_widgets.append(widget)
+            self.app.charts.widgets.append(widget)
             return fig
         except Exception as e:
             print(f"Lỗi vẽ biểu đồ tròn: {e}")
             return None
 
+    def _create_series_chart(self, parent_frame, data):
+        try:
+            fig = Figure(figsize=(10, 4), dpi=100, facecolor=self.app.chart_facecolor)
+            axes = fig.subplots(len(SERIES_METRICS), 1, sharex=True)
+            for ax, (key, ylabel) in zip(axes, SERIES_METRICS):
+                ax.set_facecolor(self.app.chart_facecolor)
+                ax.tick_params(colors=self.app.chart_textcolor, labelsize=8)
+                ax.set_ylabel(ylabel, fontsize=8, color=self.app.chart_textcolor)
+            axes[-1].xaxis.set_major_formatter(FuncFormatter(_format_clock))
+            self._set_series_lines(fig, data)
+            self._update_series_chart(fig, data, redraw=False)
+            fig.tight_layout()
+            # Phóng to / kéo trên trục thời gian (dùng chung cho cả 3 trục): tính lại đoạn đang xem
+            axes[0].callbacks.connect('xlim_changed', self._on_series_xlim_changed)
+
+            canvas = FigureCanvasTkAgg(fig, master=parent_frame)
+            toolbar = NavigationToolbar2Tk(canvas, parent_frame, pack_toolbar=False)
+            toolbar.update()
+            toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+            canvas.draw()
+            widget = canvas.get_tk_widget()
+            widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.app.charts.widgets.extend((toolbar, widget))
+            return fig
+        except Exception as e:
+            print(f"Lỗi vẽ biểu đồ lưu lượng: {e}")
+            return None
+
+    def _create_distinct_chart(self, parent_frame, data):
+        try:
+            fig = Figure(figsize=(10, 2.6), dpi=100, facecolor=self.app.chart_facecolor)
+            axes = fig.subplots(1, len(DISTINCT_METRICS))
+            for ax, (key_label, value_label) in zip(axes, DISTINCT_METRICS.values()):
+                ax.set_facecolor(self.app.chart_facecolor)
+                ax.tick_params(colors=self.app.chart_textcolor, labelsize=7)
+                # Luôn TOP_N thanh ở vị trí cố định (cập nhật tại chỗ như biểu đồ Top N)
+                ax.barh(range(TOP_N), [0] * TOP_N, color=self.app.colors_dark['header'])
+                ax.set_yticks(range(TOP_N))
+                ax.invert_yaxis()
+                ax.set_title(f"{value_label} / {key_label.lower()}", fontsize=9, color=self.app.chart_textcolor)
+            fig.suptitle("", fontsize=9, color=self.app.chart_textcolor)
+            self._update_distinct_chart(fig, data, redraw=False)
+            fig.tight_layout()
+
+            canvas = FigureCanvasTkAgg(fig, master=parent_frame)
+            canvas.draw()
+            widget = canvas.get_tk_widget()
+            widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.app.charts.widgets.append(widget)
+            return fig
+        except Exception as e:
+            print(f"Lỗi vẽ biểu đồ số lượng khác nhau: {e}")
+            return None
+
+    def _update_distinct_chart(self, fig, data, redraw=True):
+        """(MỚI) Cập nhật tại chỗ độ dài / nhãn các thanh của biểu đồ số lượng khác nhau rồi draw_idle."""
+        fig.texts[0].set_text(data['title'])
+        for ax, name in zip(fig.axes, DISTINCT_METRICS):
+            rows = data[name][:TOP_N]
+            for i, bar in enumerate(ax.patches):
+                bar.set_width(rows[i][1] if i < len(rows) else 0)
+            ax.set_yticklabels([label for label, _ in rows] + [""] * (TOP_N - len(rows)))
+            ax.set_xlim(0, max((n for _, n in rows), default=0) * 1.1 or 1)
+        if redraw:
+            fig.canvas.draw_idle()
+
+    def _distinct_bars(self, counts):
+        """(MỚI) TOP_N máy của mỗi số liệu khác nhau trong phạm vi đang chọn: {số liệu: [(IP, ước lượng)...], 'title': ...}."""
+        data = {name: [(int_to_ipv4(key), n) for key, n in rows] for name, rows in counts.top(self.distinct_scope, TOP_N).items()}
+        if self.distinct_scope == 'window' and counts.window_start is not None:
+            start = counts.window_start
+            data['title'] = f"Cửa sổ {_format_clock(start)} - {_format_clock(start + counts.window_seconds)}"
+        else:
+            data['title'] = "Toàn phiên"
+        return data
+
+    def on_distinct_scope_changed(self, event=None):
+        self.distinct_scope = DISTINCT_SCOPES[self.distinct_scope_var.get()]
+        fig = self.app.charts.get('distinct_chart')
+        if fig and self.app.packet_store:
+            self._update_distinct_chart(fig, self._distinct_bars(self.app.packet_store.distinct_counts()))
+
+    def _series_color(self, label):
+        # Đường theo phán quyết dùng màu cảnh báo của giao diện; đường theo giao thức: màu cố định theo thứ tự PROTO_NAMES
+        if label in PROTO_NAMES:
+            return f"C{PROTO_NAMES.index(label)}"
+        palette = self.app.colors_dark if self.app.current_theme == "dark" else self.app.colors_light
+        name = {text: name for name, text in VERDICT_LABELS.items()}[label]
+        return palette['normal_tree' if name == 'normal' else name]
+
+    def _set_series_lines(self, fig, data):
+        """Tạo các đường (và chú thích) của biểu đồ lưu lượng; khi đổi cách chia nhóm thì thay toàn bộ đường."""
+        for ax, (key, _) in zip(fig.axes, SERIES_METRICS):
+            for line in list(ax.lines):
+                line.remove()
+            for label, x, y in data['series'][key]:
+                ax.plot(x, y, label=label, linewidth=1, color=self._series_color(label))
+            self._series_legend(ax)
+
+    def _series_legend(self, ax):
+        ax.legend(loc="upper left", fontsize=7, ncol=len(ax.lines),
+                  facecolor=self.app.chart_facecolor, labelcolor=self.app.chart_textcolor)
+
+    def _update_series_chart(self, fig, data, redraw=True):
+        """(MỚI) Cập nhật tại chỗ dữ liệu các đường lưu lượng; trục thời gian chỉ tự co giãn khi đang xem toàn phiên."""
+        series = data['series']
+        first, last = None, None
+        self._series_updating = True
+        try:
+            for ax, (key, _) in zip(fig.axes, SERIES_METRICS):
+                top = 0
+                for line, (label, x, y) in zip(ax.lines, series[key]):
+                    line.set_data(x, y)
+                    if len(x):
+                        top = max(top, y.max())
+                        first = x[0] if first is None else min(first, x[0])
+                        last = x[-1] if last is None else max(last, x[-1])
+                ax.set_ylim(0, top * 1.3 or 1)   # Chừa chỗ cho chú thích
+            if self.series_range is None and first is not None:
+                fig.axes[0].set_xlim(first, last + series['bucket'])
+        finally:
+            self._series_updating = False
+        if redraw:
+            fig.canvas.draw_idle()
+
+    def _series_lines(self, series, axis, start=None, end=None):
+        """
+        (MỚI) Các đường của biểu đồ lưu lượng từ một TrafficSeries (đoạn [start, end) hoặc toàn bộ), mỗi đường
+        giảm mẫu LTTB còn tối đa SERIES_MAX_POINTS điểm: chi phí vẽ không tăng theo độ dài phiên.
+        """
+        labels = PROTO_NAMES if axis == 0 else [VERDICT_LABELS[name] for name in VERDICTS]
+        x, packets = series.rates('packets', axis, start, end)
+        _, volume = series.rates('bytes', axis, start, end)
+        _, verdicts = series.rates('packets', 1, start, end)
+        alerts = verdicts[:, [VERDICT_CODES['danger'], VERDICT_CODES['anomaly']]]
+
+        def downsample(y, names):
+            keep = lttb(x, y, SERIES_MAX_POINTS)
+            return [(name, x[keep[:, i]], y[keep[:, i], i]) for i, name in enumerate(names)]
+
+        return {
+            'packets': downsample(packets, labels),
+            'bytes': downsample(volume, labels),
+            'alerts': downsample(alerts, [VERDICT_LABELS['danger'], VERDICT_LABELS['anomaly']]),
+            'bucket': series.bucket,
+        }
+
+    def _on_series_xlim_changed(self, ax):
+        if self._series_updating:
+            return
+        if self._series_zoom_job is not None:
+            self.after_cancel(self._series_zoom_job)
+        self._series_zoom_job = self.after(SERIES_ZOOM_DELAY_MS, self._load_series_range)
+
+    def _load_series_range(self):
+        """
+        (MỚI) Sau khi phóng to / kéo: đoạn đang xem nhỏ hơn độ phân giải của chuỗi toàn phiên thì tính lại
+        với khoảng mịn hơn từ các gói trong kho (traffic_between, dùng chỉ mục thời gian).
+        """
+        self._series_zoom_job = None
+        fig = self.app.charts.get('series_chart')
+        store = self.app.packet_store
+        if not fig or not store:
+            return
+        series = store.traffic_series()
+        span = series.span()
+        if span is None:
+            return
+        start, end = fig.axes[0].get_xlim()
+        if start <= span[0] and end >= span[1]:
+            self.series_range = None
+            data = {'series': self._series_lines(series, self.series_axis)}
+        else:
+            self.series_range = (start, end)
+            bucket = nice_bucket(end - start)
+            if bucket < series.bucket:
+                series = store.traffic_between(start, end, bucket)
+                if store.evicted_count:
+                    self.app.status_var.set("Đoạn phóng to chỉ gồm các gói tin còn lưu trong cửa sổ lưu giữ.")
+            data = {'series': self._series_lines(series, self.series_axis, start, end)}
+        self._update_series_chart(fig, data)
+
+    def reset_series_zoom(self):
+        """(MỚI) Trở lại xem toàn phiên (trục thời gian tự co giãn, cập nhật trực tiếp khi đang quét)."""
+        self.series_range = None
+        fig = self.app.charts.get('series_chart')
+        if fig and self.app.packet_store:
+            self._update_series_chart(fig, {'series': self._series_lines(self.app.packet_store.traffic_series(), self.series_axis)})
+
+    def on_series_group_changed(self, event=None):
+        self.series_axis = SERIES_GROUPS[self.series_group_var.get()]
+        self.series_range = None
+        fig = self.app.charts.get('series_chart')
+        if fig and self.app.packet_store:
+            data = {'series': self._series_lines(self.app.packet_store.traffic_series(), self.series_axis)}
+            self._set_series_lines(fig, data)
+            self._update_series_chart(fig, data)
+
+    def _update_bar_chart(self, fig, data, redraw=True, error=0):
+        """
+        (MỚI) Cập nhật tại chỗ chiều cao / nhãn các cột của biểu đồ Top N rồi vẽ lại khi rảnh (draw_idle).
+        error: sai số tối đa của bản tóm tắt Top-k (số thật của mỗi cột lớn hơn chiều cao không quá error).
+        """
+        ax = fig.axes[0]
+        ax.texts[0].set_text(f"Ước lượng: mỗi cột thiếu tối đa {error:,} gói" if error else "")
+        labels = list(data.keys())[:TOP_N]
+        values = list(data.values())[:TOP_N]
+        for i, bar in enumerate(ax.patches):
+            bar.set_height(values[i] if i < len(values) else 0)
+        ax.set_xticklabels(labels + [""] * (TOP_N - len(labels)))
+        ax.set_xlim(-0.6, max(1, len(labels)) - 0.4)
+        ax.set_ylim(0, max(values, default=0) * 1.1 or 1)
+        if redraw:
+            fig.canvas.draw_idle()
+
+    def _update_pie_chart(self, fig, data, redraw=True):
+        """(MỚI) Cập nhật tại chỗ góc các miếng và nhãn chú thích của biểu đồ giao thức rồi draw_idle."""
+        ax = fig.axes[0]
+        values = [data.get(name, 0) for name in PROTO_NAMES]
+        total = sum(values) or 1
+        angle = 90.0
+        for wedge, value in zip(ax.patches, values):
+            wedge.set_theta1(angle)
+            angle += 360.0 * value / total
+            wedge.set_theta2(angle)
+        legend = ax.get_legend()
+        if legend is not None:
+            for text, name, value in zip(legend.get_texts(), PROTO_NAMES, values):
+                text.set_text(f"{name} ({value/total*100:.1f}%)")
+        if redraw:
+            fig.canvas.draw_idle()
+
+    def prepare_statistics(self, store):
+        """
+        (MỚI) Phần dữ liệu của biểu đồ (đếm, chọn Top 5), không chạm vào widget: chạy được trên luồng nền
+        sau khi dừng quét. Kết quả truyền cho draw_statistics trên luồng giao diện.
+        """
+        key = self.statistics_key(store)
+        ip_counter, port_counter, proto_counter, alert_counter = self._process_statistics(store)
+        return {
+            'key': key,
+            'protos': proto_counter,
+            'top_ips': dict(ip_counter.most_common(TOP_N)),
+            'top_ports': dict(port_counter.most_common(TOP_N)),
+            'errors': store.count_errors(),
+            'alerts': alert_counter,
+            'series': self._series_lines(store.traffic_series(), self.series_axis),
+            'distinct': self._distinct_bars(store.distinct_counts()),
+        }
+
+    def statistics_key(self, store):
+        # Dữ liệu đã tổng hợp còn đúng khi cùng kho, cùng số gói tin, cùng cách chia đường lưu lượng và phạm vi đếm khác nhau
+        return (id(store), store.total_count(), self.series_axis, self.distinct_scope)
+
+    def empty_statistics(self):
+        return {
+            'key': None, 'protos': Counter(), 'top_ips': {}, 'top_ports': {}, 'errors': {'ips': 0, 'ports': 0}, 'alerts': Counter(),
+            'series': self._series_lines(TrafficSeries((len(PROTO_NAMES), len(VERDICTS))), self.series_axis),
+            'distinct': self._distinct_bars(DistinctCounts()),
+        }
+
+    def current_statistics(self):
+        """
+        (MỚI) Dữ liệu thống kê của kho hiện tại: dùng lại bản đã tổng hợp (ChartManager) nếu kho chưa thay đổi,
+        ngược lại tổng hợp và cập nhật biểu đồ (tại chỗ).
+        """
+        store = self.app.packet_store
+        data = self.app.charts.cached(self.statistics_key(store))
+        if data is None:
+            data = self.prepare_statistics(store)
+            self.draw_statistics(data)
+        return data
+
+    def apply_chart_theme(self):
+        """(MỚI) Đổi giao diện sáng / tối: đổi màu các biểu đồ đã có tại chỗ, không tổng hợp lại, không dựng lại Figure."""
+        fig = self.app.charts.get('series_chart')
+        if fig:
+            for ax in fig.axes:
+                for line in ax.lines:
+                    line.set_color(self._series_color(line.get_label()))
+                self._series_legend(ax)
+        self.app.charts.restyle(self.app.chart_facecolor, self.app.chart_textcolor)
+
+    def draw_statistics(self, data):
+        """
+        Vẽ các biểu đồ từ dữ liệu đã chuẩn bị (luồng giao diện). (CẬP NHẬT) Biểu đồ đã có thì chỉ cập nhật
+        dữ liệu của các đối tượng vẽ (không dựng lại Figure / canvas), chi phí cố định mỗi lần làm mới.
+        (CẬP NHẬT) Các Figure được tạo một lần và giữ trong ChartManager (app.charts) cùng dữ liệu vừa vẽ.
+        """
+        charts = self.app.charts
+        charts.cache(data)
+        if not charts.has_all(CHART_NAMES):
+            self.series_range = None
+            if not charts.get('pie_chart'):
+                charts.add('pie_chart', self._create_pie_chart(self.app.stats_pie_frame, data['protos'], "Phân loại Giao thức"))
+            if not charts.get('ip_chart'):
+                charts.add('ip_chart', self._create_bar_chart(self.app.stats_bar_ip_frame, data['top_ips'], "Top 5 IP Hoạt động (Nguồn + Đích)", "Địa chỉ IP", "Số gói tin", data['errors']['ips']))
+            if not charts.get('port_chart'):
+                charts.add('port_chart', self._create_bar_chart(self.app.stats_bar_ports_frame, data['top_ports'], "Top 5 Dịch vụ/Cổng (Đích)", "Cổng / Giao thức", "Số lần", data['errors']['ports']))
+            if not charts.get('series_chart'):
+                charts.add('series_chart', self._create_series_chart(self.app.stats_series_frame, data))
+            if not charts.get('distinct_chart'):
+                charts.add('distinct_chart', self._create_distinct_chart(self.app.stats_distinct_frame, data['distinct']))
+            return
+        self._update_pie_chart(charts.get('pie_chart'), data['protos'])
+        self._update_bar_chart(charts.get('ip_chart'), data['top_ips'], error=data['errors']['ips'])
+        self._update_bar_chart(charts.get('port_chart'), data['top_ports'], error=data['errors']['ports'])
+        self._update_distinct_chart(charts.get('distinct_chart'), data['distinct'])
+        # Đang phóng to một đoạn: giữ nguyên đoạn người dùng đang xem
+        if self.series_range is None:
+            self._update_series_chart(charts.get('series_chart'), data)
+
     def update_statistics_tab(self):
         self.app.status_var.set("Đang tạo báo cáo thống kê...")
-        if not self.app.all_packets_data:
+        if not self.app.packet_store:
             self.app.status_var.set("Tạo báo cáo thất bại: Không có dữ liệu.")
             return
 
-        self.clear_charts()
-        
         # Bắt lỗi nếu _process_statistics gặp vấn đề
         try:
-            ip_counter, port_counter, proto_counter, alert_counter = self._process_statistics()
-            
-            self.app.charts['pie_chart'] = self._create_pie_chart(self.app.stats_pie_frame, proto_counter, "Phân loại Giao thức")
-            
-            top_5_ips = dict(ip_counter.most_common(5))
-            self.app.charts['ip_chart'] = self._create_bar_chart(self.app.stats_bar_ip_frame, top_5_ips, "Top 5 IP Hoạt động (Nguồn + Đích)", "Địa chỉ IP", "Số gói tin")
-            
-            top_5_ports = dict(port_counter.most_common(5))
-            self.app.charts['port_chart'] = self._create_bar_chart(self.app.stats_bar_ports_frame, top_5_ports, "Top 5 Dịch vụ/Cổng (Đích)", "Cổng / Giao thức", "Số lần")
-
+            # (CẬP NHẬT) Kho chưa thay đổi từ lần tổng hợp trước: chỉ vẽ lại từ dữ liệu đã có
+            self.current_statistics()
             self.app.status_var.set("Tạo báo cáo thống kê hoàn tất.")
         except Exception as e:
             print(f"Lỗi tạo thống kê: {e}")
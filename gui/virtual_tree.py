@@ -0,0 +1,216 @@
+# file: gui/virtual_tree.py
+# -*- coding: utf-8 -*-
+
+from tkinter import ttk
+
+
+class RowWindow:
+    """
+    Phần tính toán của danh sách ảo (không phụ thuộc Tk): trên tổng count dòng của kết quả lọc,
+    chỉ các dòng [start, end) là dòng Treeview thật. Cửa sổ gồm các dòng đang nhìn thấy cộng margin dòng
+    ở mỗi phía; chỉ dựng lại khi vị trí cuộn tới gần mép cửa sổ.
+    """
+    def __init__(self, margin=100):
+        self.margin = max(1, int(margin))
+        self.count = 0
+        self.start = 0
+        self.end = 0
+        self.top = 0              # Chỉ số (trong kết quả lọc) của dòng đầu tiên đang nhìn thấy
+        self.visible = 30         # Số dòng nhìn thấy (cập nhật theo chiều cao thật của Treeview)
+
+    def reset(self, count):
+        self.count = max(0, int(count))
+        self.start = self.end = self.top = 0
+
+    def clamp(self, top):
+        # Cho phép vượt quá cuối danh sách: Treeview tự dừng ở dòng cuối và báo lại vị trí thật
+        return max(0, min(int(top), self.count - 1))
+
+    def needs_refill(self, top):
+        """Vị trí top có còn nằm trong cửa sổ hiện tại với khoảng đệm đủ rộng không."""
+        if self.start == self.end:
+            return self.count > 0
+        if top < self.start or (top + self.visible > self.end and self.end < self.count):
+            return True
+        low_ok = self.start == 0 or top - self.start >= self.margin // 2
+        high_ok = self.end == self.count or self.end - (top + self.visible) >= self.margin // 2
+        return not (low_ok and high_ok)
+
+    def window_for(self, top):
+        """Cửa sổ mới [start, end) bao quanh vị trí top."""
+        start = max(0, min(top, self.count - self.visible) - self.margin)
+        end = min(self.count, top + self.visible + self.margin)
+        return start, end
+
+    def fractions(self):
+        """Vị trí cuộn trên toàn bộ kết quả lọc (dạng phân số cho thanh cuộn)."""
+        if not self.count:
+            return 0.0, 1.0
+        return self.top / self.count, min(1.0, (self.top + self.visible) / self.count)
+
+    def target(self, *args):
+        """Lệnh của thanh cuộn ('moveto', f) / ('scroll', n, 'units' | 'pages') -> dòng đầu tiên mới."""
+        if args[0] == 'moveto':
+            return self.clamp(float(args[1]) * self.count)
+        if args[0] == 'scroll':
+            step = int(args[1]) * (max(1, self.visible - 1) if args[2] == 'pages' else 1)
+            return self.clamp(self.top + step)
+        return self.top
+
+
+class VirtualTreeview(ttk.Treeview):
+    """
+    (MỚI) Treeview ảo cho danh sách hàng triệu gói tin: chỉ giữ các dòng đang nhìn thấy (cộng một khoảng đệm)
+    làm dòng Treeview thật, vị trí thanh cuộn được ánh xạ sang chỉ số dòng trong kết quả lọc.
+    Dữ liệu lấy qua fetch(start, end) -> [(iid, values, tags)], chỉ cho các dòng trong cửa sổ.
+    Cột, tag màu, sao chép và chọn dòng dùng như Treeview thường (iid là số thứ tự gói tin);
+    lựa chọn được giữ lại khi cửa sổ dựng lại, kể cả khi dòng đã chọn tạm thời cuộn ra ngoài.
+    """
+    def __init__(self, master=None, margin=100, **kwargs):
+        super().__init__(master, **kwargs)
+        self._window = RowWindow(margin)
+        self._fetch = None
+        self._scrollbar = None
+        self._selected = ()
+        self._pending = None
+        super().configure(yscrollcommand=self._on_tree_scroll)
+        self.bind('<Configure>', lambda e: self._schedule_refill(), add='+')
+
+    def set_scrollbar(self, scrollbar):
+        """Thanh cuộn hiển thị vị trí trên toàn bộ kết quả lọc (thay cho yscrollcommand)."""
+        self._scrollbar = scrollbar
+        self._update_scrollbar()
+
+    def set_source(self, count, fetch, top=0):
+        """Đặt kết quả lọc mới (count dòng) và hiển thị từ dòng top."""
+        self._fetch = fetch
+        self._window.reset(count)
+        self._selected = ()
+        self._refill(self._window.clamp(top))
+        self._update_scrollbar()
+
+    def follow_source(self, count, fetch):
+        """
+        (MỚI) Cập nhật kết quả mới (danh sách trực tiếp) và bám theo cuối danh sách. Chỉ xóa / chèn các dòng
+        khác với lần trước (so theo iid), giữ nguyên lựa chọn của người dùng.
+        """
+        window = self._window
+        self._fetch = fetch
+        window.count = max(0, int(count))
+        top = window.clamp(window.count)
+        start, end = window.window_for(top)
+        items = list(fetch(start, end)) if end > start else []
+        iids = [str(iid) for iid, _, _ in items]
+        wanted = set(iids)
+        children = super().get_children()
+        drop = [iid for iid in children if iid not in wanted]
+        if drop:
+            super().delete(*drop)
+        present = set(children).difference(drop)
+        for index, (iid, values, tags) in enumerate(items):
+            if iids[index] not in present:
+                super().insert('', index, iid=iid, values=values, tags=tags)
+        window.start, window.end, window.top = start, end, top
+        self._native_moveto(top)
+        self._update_scrollbar()
+
+    def at_tail(self):
+        """Đang xem cuối danh sách (người dùng chưa cuộn lên xem dòng cũ)."""
+        window = self._window
+        return window.top + window.visible >= window.count
+
+    def clear(self):
+        self.set_source(0, None)
+
+    def row_count(self):
+        return self._window.count
+
+    def yview(self, *args):
+        # Thanh cuộn điều khiển vị trí trên toàn bộ kết quả lọc, không chỉ trên các dòng thật
+        if not args:
+            return self._window.fractions()
+        self.show_row(self._window.target(*args))
+
+    def yview_moveto(self, fraction):
+        self.yview('moveto', fraction)
+
+    def yview_scroll(self, number, what):
+        self.yview('scroll', number, what)
+
+    def show_row(self, top):
+        """Cuộn để dòng top (chỉ số trong kết quả lọc) nằm ở đầu danh sách."""
+        window = self._window
+        top = window.clamp(top)
+        if window.needs_refill(top):
+            self._refill(top)
+        else:
+            window.top = top
+            self._native_moveto(top)
+        self._update_scrollbar()
+
+    def _native_moveto(self, top):
+        window = self._window
+        span = window.end - window.start
+        if span:
+            super().yview_moveto((top - window.start) / span)
+
+    def _refill(self, top):
+        window = self._window
+        start, end = window.window_for(top) if window.count else (0, 0)
+        current = tuple(super().selection())
+        if current:
+            self._selected = current
+        children = super().get_children()
+        if self._fetch and start < window.end and end > window.start:
+            # Cửa sổ mới chồng lên cửa sổ cũ: chỉ xóa / lấy thêm phần chênh lệch ở hai đầu
+            head = max(0, start - window.start)
+            tail = max(0, window.end - end)
+            drop = children[:head] + children[len(children) - tail:] if tail else children[:head]
+            if drop:
+                super().delete(*drop)
+            if start < window.start:
+                for index, (iid, values, tags) in enumerate(self._fetch(start, window.start)):
+                    super().insert('', index, iid=iid, values=values, tags=tags)
+            if end > window.end:
+                for iid, values, tags in self._fetch(window.end, end):
+                    super().insert('', 'end', iid=iid, values=values, tags=tags)
+        else:
+            if children:
+                super().delete(*children)
+            if self._fetch and end > start:
+                for iid, values, tags in self._fetch(start, end):
+                    super().insert('', 'end', iid=iid, values=values, tags=tags)
+        window.start, window.end, window.top = start, end, top
+        self._native_moveto(top)
+        # Dòng đã chọn cuộn ra khỏi cửa sổ rồi quay lại: chọn lại
+        present = [iid for iid in self._selected if self.exists(iid)]
+        if present and tuple(super().selection()) != tuple(present):
+            super().selection_set(present)
+
+    def _on_tree_scroll(self, first, last):
+        # Cuộn gốc của Treeview (con lăn chuột, phím mũi tên) bên trong cửa sổ: đổi sang vị trí toàn cục
+        window = self._window
+        span = window.end - window.start
+        if span:
+            first, last = float(first), float(last)
+            if last - first < 1.0:
+                window.visible = max(1, round((last - first) * span))
+            window.top = window.start + int(round(first * span))
+            if window.needs_refill(window.top):
+                self._schedule_refill()
+        self._update_scrollbar()
+
+    def _schedule_refill(self):
+        # Dựng lại sau khi Tk xử lý xong sự kiện cuộn hiện tại (tránh gọi lồng trong yscrollcommand)
+        if self._pending is None:
+            self._pending = self.after_idle(self._deferred_refill)
+
+    def _deferred_refill(self):
+        self._pending = None
+        if self._window.needs_refill(self._window.top):
+            self._refill(self._window.top)
+            self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self._scrollbar is not None:
+            self._scrollbar.set(*self._window.fractions())
@@ -0,0 +1,288 @@
+# file: headless.py
+# -*- coding: utf-8 -*-
+"""
+(MỚI) Chế độ không giao diện (daemon / dòng lệnh) cho thiết bị Gateway không có màn hình.
+Không import Tkinter hay matplotlib. Ghi kết quả và cảnh báo ra file JSON Lines có xoay vòng.
+
+Ví dụ:
+    sudo python headless.py --iface eth0 --out-dir /var/log/tanetai
+    sudo python headless.py --iface eth0 --iface eth1 --iface-filter "eth1=not port 22"
+    python headless.py --pcap capture.pcapng --speed 0
+"""
+
+import argparse
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from app_utils import CONFIG_FILE, MODEL_PATH, STATS_PATH
+from network_manager import NetworkManager
+from anomaly_detector import AnomalyDetector
+from behavioral_analyzer import BehavioralAnalyzer
+from detection_pipeline import DetectionPipeline
+from packet_view import PacketView
+from worker_pool import AnalysisWorkerPool
+from capture_buffer import CaptureRingBuffer, MergedCaptureStream, run_analysis_loop
+from session_db import SessionDatabase, new_session_path
+
+DEFAULT_CONFIG = {"training_packets": 3000, "portscan_count": 40, "portscan_window": 10, "hostscan_count": 40, "hostscan_window": 10, "flood_count": 2000, "flood_window": 2, "batch_size": 256, "batch_max_delay_ms": 20, "snaplen": 0, "replay_speed": 0, "analysis_workers": 0, "ring_capacity": 65536, "ring_overflow_policy": "drop_newest", "merge_delay_ms": 50, "session_db": 0, "session_batch_size": 2000, "session_hot_cache": 2000}
+
+
+class RotatingJsonlWriter:
+    """Ghi JSON Lines, xoay vòng file khi vượt max_bytes (giữ lại backup_count file cũ: .1, .2, ...)."""
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, obj):
+        line = json.dumps(obj, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.max_bytes and self._file.tell() + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class HeadlessMonitor:
+    """Nối NetworkManager + AnomalyDetector + BehavioralAnalyzer mà không cần giao diện."""
+    def __init__(self, config, out_dir, max_bytes, backup_count, write_verdicts=True, target_ips=None):
+        self.config = config
+        self.net_manager = NetworkManager()
+        self.stop_event = threading.Event()
+        self.target_ips = set(target_ips or ())
+        self.packet_count = 0
+        self.alert_count = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(out_dir, exist_ok=True)
+        self.verdict_writer = RotatingJsonlWriter(os.path.join(out_dir, "verdicts.jsonl"), max_bytes, backup_count) if write_verdicts else None
+        self.alert_writer = RotatingJsonlWriter(os.path.join(out_dir, "alerts.jsonl"), max_bytes, backup_count)
+        # (MỚI) Kho phiên SQLite (tùy chọn) để truy vấn lại toàn bộ phiên sau này
+        self.session_store = None
+        if config.get('session_db', 0):
+            self.session_store = SessionDatabase(new_session_path(out_dir), batch_size=config.get('session_batch_size', 2000), hot_cache=config.get('session_hot_cache', 2000))
+            print(f"[HEADLESS] Ghi kho phiên: {self.session_store.path}")
+
+        self.worker_pool = None
+        if config.get('analysis_workers', 0) > 0:
+            self.worker_pool = AnalysisWorkerPool(config['analysis_workers'], config, self.on_record, MODEL_PATH, STATS_PATH, target_ips=self.target_ips)
+        # Chế độ đa tiến trình: mô hình được huấn luyện trong bộ tiến trình, giải thích cảnh báo AI bằng chính bộ phát hiện đó
+        if self.worker_pool:
+            self.ai_detector = self.worker_pool.detector
+        else:
+            self.ai_detector = AnomalyDetector(n_packets_to_train=config.get('training_packets', 1000))
+        if self.ai_detector.load_model(MODEL_PATH, STATS_PATH):
+            print("[HEADLESS] Đã tải mô hình AI. Bắt đầu phát hiện.")
+        else:
+            print(f"[HEADLESS] Đang huấn luyện... (Sử dụng {config.get('training_packets', 1000)} gói)")
+        self.pipeline = DetectionPipeline(self.ai_detector, BehavioralAnalyzer.from_config(config), self.on_record, target_ips=self.target_ips, batch_size=config.get('batch_size', 256), max_delay=config.get('batch_max_delay_ms', 20) / 1000.0)
+        self.capture_rings = {}
+        self.capture_stream = None
+
+    def make_packet_callback(self, iface_name):
+        ring = self.capture_rings[iface_name]
+        def callback(packet):
+            ring.put((iface_name, packet)) # Không trả về giá trị: sniff() sẽ in mọi giá trị trả về của prn
+        return callback
+
+    def analyze_packet(self, item):
+        iface_name, packet = item
+        if self.worker_pool:
+            self.worker_pool.submit(packet, iface_name)
+            return
+        self.pipeline.process(PacketView.from_packet(packet), iface_name)
+
+    def on_record(self, packet_data):
+        with self._lock:
+            self.packet_count += 1
+            packet_id = self.packet_count
+            if self.session_store is not None:
+                self.session_store.append(packet_data)
+        tag = packet_data['tag']
+        # (CẬP NHẬT) Tóm tắt dựng từ byte tiêu đề đã giữ lại (không gọi scapy summary() ở đường bắt gói)
+        view = PacketView.from_bytes(packet_data['raw'], packet_data['timestamp'], packet_data['linktype'])
+        verdict = {
+            'id': packet_id,
+            'iface': packet_data['iface'],
+            'timestamp': packet_data['timestamp'],
+            'time': packet_data['time'],
+            'summary': view.summary(),
+            'proto': packet_data['proto_name'],
+            'features': packet_data['features'],
+            'prediction': packet_data['prediction'],
+            'tag': tag,
+        }
+        if self.verdict_writer:
+            self.verdict_writer.write(verdict)
+        if tag in ('danger', 'anomaly'):
+            with self._lock:
+                self.alert_count += 1
+            reason = packet_data['rule_analysis'] or packet_data['behavior_analysis'] or ""
+            if not reason and packet_data['prediction'] == -1:
+                reason = self.ai_detector.explain_anomaly(packet_data['features'])
+            alert = dict(verdict, reason=reason.replace("\n", " ").replace("     ", " "), layers=view.to_layers())
+            self.alert_writer.write(alert)
+
+    def _on_analysis_tick(self):
+        if self.worker_pool: self.worker_pool.flush_pending()
+        else: self.pipeline.flush_if_due()
+
+    def _format_counters(self):
+        parts = []
+        for name, ring in self.capture_rings.items():
+            stats = ring.stats()
+            kernel = self.net_manager.get_kernel_stats(name)
+            parts.append(f"[{name}] Nhận: {stats['pushed']} | Kernel bỏ: {kernel['dropped']} | Bộ đệm bỏ: {stats['dropped']} | Tồn đọng cao nhất: {stats['max_backlog']}/{stats['capacity']}")
+        return " ".join(parts)
+
+    def run_capture_thread(self, iface_name, bpf_filter, errors):
+        try:
+            self.net_manager.start_sniffing(iface_name, self.make_packet_callback(iface_name), self.stop_event, bpf_filter=bpf_filter, snaplen=self.config.get('snaplen', 0))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            self.capture_rings[iface_name].close()
+
+    def _maintenance_loop(self, interval):
+        """Đẩy file xuống đĩa và in trạng thái định kỳ."""
+        last_report = time.time()
+        last_count = 0
+        while not self.stop_event.wait(min(interval, 1.0)):
+            now = time.time()
+            if now - last_report >= interval:
+                pps = (self.packet_count - last_count) / (now - last_report)
+                print(f"[HEADLESS] {datetime.datetime.now():%Y-%m-%d %H:%M:%S} | Gói tin: {self.packet_count} | Cảnh báo: {self.alert_count} | {pps:.0f} gói/giây | {self._format_counters()}")
+                last_report, last_count = now, self.packet_count
+                for writer in (self.verdict_writer, self.alert_writer):
+                    if writer: writer.flush()
+
+    def run(self, ifaces=None, pcap=None, speed=0, report_interval=60, iface_filters=None):
+        """ifaces: danh sách giao diện (mỗi giao diện một luồng bắt gói). iface_filters: {giao diện: BPF riêng}."""
+        names = [os.path.basename(pcap)] if pcap else list(ifaces)
+        # Phát lại file: chờ thay vì bỏ gói khi bộ đệm đầy
+        policy = "block" if pcap else self.config.get('ring_overflow_policy', 'drop_newest')
+        wakeup = threading.Event()
+        self.capture_rings = {name: CaptureRingBuffer(self.config.get('ring_capacity', 65536), policy, wakeup=wakeup) for name in names}
+        self.capture_stream = MergedCaptureStream(self.capture_rings, lambda item: float(item[1].time), max_delay=self.config.get('merge_delay_ms', 50) / 1000.0, wakeup=wakeup)
+        self.net_manager.reset_kernel_stats()
+        if self.worker_pool: self.worker_pool.start()
+        analysis = threading.Thread(target=run_analysis_loop, args=(self.capture_stream, self.analyze_packet, self._on_analysis_tick), kwargs={'batch_size': self.config.get('batch_size', 256), 'tick': self.pipeline.batcher.max_delay}, daemon=True)
+        analysis.start()
+        maintenance = threading.Thread(target=self._maintenance_loop, args=(report_interval,), daemon=True)
+        maintenance.start()
+        replay = None
+        try:
+            if pcap:
+                replay = self.net_manager.replay_pcap(pcap, self.make_packet_callback(names[0]), self.stop_event, speed=speed)
+            else:
+                target_filter = self.net_manager.build_bpf_filter(self.target_ips)
+                errors = []
+                threads = [threading.Thread(target=self.run_capture_thread, args=(name, self.net_manager.combine_bpf_filters(target_filter, (iface_filters or {}).get(name, "")), errors), daemon=True) for name in names]
+                for t in threads: t.start()
+                for t in threads: t.join()
+                if errors and len(errors) == len(threads):
+                    raise errors[0]
+        finally:
+            self.stop_event.set()
+            for ring in self.capture_rings.values(): ring.close()
+            analysis.join()
+            if self.worker_pool: self.worker_pool.stop()
+            else: self.pipeline.flush()
+            if replay is not None: self.net_manager.finish_replay(replay)
+            for writer in (self.verdict_writer, self.alert_writer):
+                if writer: writer.close()
+            if self.session_store is not None: self.session_store.close()
+            if self.ai_detector.is_trained and not os.path.exists(MODEL_PATH):
+                self.ai_detector.save_model(MODEL_PATH, STATS_PATH)
+            print(f"[HEADLESS] Đã dừng. Tổng: {self.packet_count} gói tin, {self.alert_count} cảnh báo. | {self._format_counters()}")
+
+
+def load_config(path):
+    try:
+        with open(path, 'r') as f: config = json.load(f)
+        print(f"Đã tải cấu hình từ {path}")
+    except Exception as e:
+        print(f"Không tìm thấy {path} hoặc file bị lỗi, sử dụng mặc định: {e}")
+        config = {}
+    return dict(DEFAULT_CONFIG, **config)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TANetAI - Gateway Monitor (chế độ không giao diện)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--iface", action="append", help="Giao diện mạng cần giám sát (lặp lại để giám sát nhiều giao diện)")
+    source.add_argument("--pcap", help="Phân tích file pcap/pcapng thay vì bắt gói trực tiếp")
+    source.add_argument("--list-interfaces", action="store_true", help="Liệt kê giao diện mạng rồi thoát")
+    parser.add_argument("--iface-filter", action="append", default=[], metavar="IFACE=BPF", help="Bộ lọc BPF riêng cho một giao diện (có thể lặp lại)")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Đường dẫn config.json")
+    parser.add_argument("--out-dir", default="tanetai_logs", help="Thư mục ghi verdicts.jsonl / alerts.jsonl")
+    parser.add_argument("--max-mb", type=float, default=50, help="Kích thước tối đa mỗi file trước khi xoay vòng (MB)")
+    parser.add_argument("--backups", type=int, default=5, help="Số file cũ giữ lại khi xoay vòng")
+    parser.add_argument("--alerts-only", action="store_true", help="Chỉ ghi cảnh báo, không ghi kết quả của mọi gói tin")
+    parser.add_argument("--target", action="append", default=[], help="IP mục tiêu (có thể lặp lại)")
+    parser.add_argument("--speed", type=float, default=None, help="Hệ số tốc độ phát lại pcap (0 = tối đa)")
+    parser.add_argument("--workers", type=int, default=None, help="Số tiến trình phân tích song song")
+    parser.add_argument("--report-interval", type=float, default=60, help="Chu kỳ in trạng thái (giây)")
+    args = parser.parse_args(argv)
+
+    if args.list_interfaces:
+        for display, name in NetworkManager().list_interfaces().items():
+            print(f"{name:<20} {display}")
+        return 0
+
+    iface_filters = {}
+    for item in args.iface_filter:
+        name, sep, expr = item.partition("=")
+        if not sep:
+            parser.error(f"--iface-filter cần dạng IFACE=BPF: {item!r}")
+        iface_filters[name.strip()] = expr.strip()
+
+    config = load_config(args.config)
+    if args.workers is not None: config['analysis_workers'] = args.workers
+    speed = args.speed if args.speed is not None else config.get('replay_speed', 0)
+
+    monitor = HeadlessMonitor(config, args.out_dir, int(args.max_mb * 1024 * 1024), args.backups, write_verdicts=not args.alerts_only, target_ips=args.target)
+
+    def handle_signal(signum, frame):
+        print("\n[HEADLESS] Nhận tín hiệu dừng...")
+        monitor.stop_event.set()
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        monitor.run(ifaces=args.iface, pcap=args.pcap, speed=speed, report_interval=args.report_interval, iface_filters=iface_filters)
+    except PermissionError as e:
+        print(f"[LỖI] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
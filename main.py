@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import threading
+import multiprocessing
 import queue
 import sys
 import os
@@ -11,23 +12,32 @@ import json
 import ctypes 
 import traceback
 import datetime 
+import time
 
 import matplotlib
 matplotlib.use("TkAgg")
 
-from scapy.all import Ether, IP, TCP, UDP, ICMP, ARP
 
 from app_utils import (
-    resource_path, MODEL_PATH, STATS_PATH, CONFIG_FILE, ICON_FILE, TRANSLATION_MAP
+    resource_path, MODEL_PATH, STATS_PATH, CONFIG_FILE, ICON_FILE, SESSION_DIR, TRANSLATION_MAP
 )
 from network_manager import NetworkManager
 from anomaly_detector import AnomalyDetector
 from behavioral_analyzer import BehavioralAnalyzer
+from packet_view import PacketView
+from detection_pipeline import DetectionPipeline
+from worker_pool import AnalysisWorkerPool
+from packet_store import PacketStore, PROTO_NAMES
+from packet_query import parse_query, QueryError, INDEXED_COLUMNS
+from session_db import SessionDatabase, new_session_path
+from capture_buffer import CaptureRingBuffer, MergedCaptureStream, MessageBatcher, run_analysis_loop
 
 from gui.tab_monitor import MonitorTab
 from gui.tab_statistics import StatisticsTab
 from gui.tab_settings import SettingsTab
 from gui.tab_info import AboutTab, VersionsTab
+from gui.background_job import BackgroundJob
+from gui.chart_manager import ChartManager
 
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
@@ -37,7 +47,7 @@ except Exception:
     except Exception:
         pass
 
-CURRENT_VERSION = "16.2" 
+CURRENT_VERSION = "16.27" 
 
 class ThemeToggle(tk.Canvas):
     def __init__(self, parent, command=None, width=60, height=30, bg_color="#f0f0f0"):
@@ -81,8 +91,9 @@ class ThemeToggle(tk.Canvas):
 
 
 class NetworkScannerApp:
-    def __init__(self, root):
+    def __init__(self, root, is_admin=True):
         self.root = root
+        self.is_admin = is_admin
         self.root.title(f"TANetAI (v{CURRENT_VERSION}) - Gateway Monitor")
         self.root.geometry("1300x800")
         
@@ -94,12 +105,19 @@ class NetworkScannerApp:
             print(f"Không thể tải icon '{ICON_FILE}': {e}")
 
         self.net_manager = NetworkManager()
-        self.ai_detector = None; self.behavior_analyzer = None
-        self.packet_count = 0; self.all_packets_data = [] 
+        self.ai_detector = None; self.behavior_analyzer = None; self.pipeline = None; self.worker_pool = None
+        self.packet_count = 0; self.packet_store = PacketStore() 
         self.sniff_thread = None; self.stop_sniff_event = threading.Event()
         self.message_queue = queue.Queue()
+        self.record_batcher = MessageBatcher(self.message_queue); self.queue_delay = 100
         self.config = {}; self.config_vars = {} 
-        self.target_ips = set()
+        self.target_ips = set(); self.capture_filter = None
+        self.replay_path = None; self.replay_stats = None
+        self.capture_rings = {}; self.capture_stream = None; self.analysis_thread = None; self.capture_stats = None
+        self.capture_ifaces = {}; self.capture_filters = {}; self._pps_state = {}
+        self.session_saved = True
+        self.live_view_job = None; self.live_state = None; self.live_stats_job = None
+        self.post_stop_job = None; self.report_version = 0
         
         self.current_theme = "light"
         self.style = ttk.Style(self.root)
@@ -118,14 +136,15 @@ class NetworkScannerApp:
         self.colors_light = {"bg": "#F0F0F0", "fg": "#000000", "frame_bg": "#FFFFFF", "text_bg": "#FFFFFF", "text_fg": "#000000", "header": "#00008B", "danger": "#FF0000", "anomaly": "#E69500", "normal_tree": "#505050", "button": "#E1E1E1", "disabled_fg": "#A0A0A0"}
         self.colors_dark = {"bg": "#2E2E2E", "fg": "#FFFFFF", "frame_bg": "#3C3C3C", "text_bg": "#1E1E1E", "text_fg": "#FFFFFF", "header": "#87CEFA", "danger": "#FF5252", "anomaly": "#FFD700", "normal_tree": "#C0C0C0", "button": "#505050", "disabled_fg": "#777777"}
         
-        self.chart_widgets = []
-        self.charts = {}
+        self.charts = ChartManager()   # (CẬP NHẬT) Figure / canvas của Tab Thống kê, dùng lại suốt phiên làm việc
 
         self.load_config()
         self.create_widgets()
         self.setup_global_copy_paste()
         self.populate_interfaces() 
         self.apply_theme() 
+        if not self.is_admin: self.set_offline_only()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.after(100, self.process_queue)
         
     def create_widgets(self):
@@ -160,6 +179,10 @@ class NetworkScannerApp:
         self.theme_switch = ThemeToggle(self.bottom_bar, command=self.toggle_theme)
         self.theme_switch.pack(side=tk.RIGHT, padx=(10, 0))
 
+        # (MỚI) Tiến độ và nút hủy của phần xử lý nền sau khi dừng quét (chỉ hiện khi đang chạy)
+        self.job_cancel_button = ttk.Button(self.bottom_bar, text="Hủy", command=self.on_cancel_post_processing, style="App.TButton")
+        self.job_progress = ttk.Progressbar(self.bottom_bar, length=160, maximum=1.0, mode='determinate')
+
     def show_device_scanner(self):
         selected_iface_text = self.iface_var.get()
         if not selected_iface_text:
@@ -253,12 +276,47 @@ class NetworkScannerApp:
         if count == 0:
             msg = "Bạn chưa chọn thiết bị nào.\nChương trình sẽ giám sát TOÀN BỘ lưu lượng (Mặc định)."
         else:
-            msg = f"Đã chọn {count} thiết bị mục tiêu.\nChương trình sẽ CHỈ hiển thị gói tin liên quan đến các IP này."
+            msg = f"Đã chọn {count} thiết bị mục tiêu.\nChương trình sẽ CHỈ bắt gói tin liên quan đến các IP này (lọc ngay trong kernel)."
         
         messagebox.showinfo("Cấu hình Giám sát", msg)
         self.scan_window.destroy()
         self.status_var.set(f"Sẵn sàng. Mục tiêu: {count if count > 0 else 'Toàn bộ'}")
 
+    def show_interface_selector(self):
+        """(MỚI) Chọn nhiều giao diện để giám sát cùng lúc (ví dụ WAN + LAN), mỗi giao diện có bộ lọc BPF riêng."""
+        self.iface_window = tk.Toplevel(self.root)
+        self.iface_window.title("Giám sát nhiều giao diện")
+        self.iface_window.geometry("620x400")
+        try:
+            self.iface_window.iconbitmap(ICON_FILE)
+        except: pass
+
+        ttk.Label(self.iface_window, text="Chọn giao diện và bộ lọc BPF riêng (tùy chọn, ví dụ: tcp port 443):", padding=10).pack(fill='x')
+        list_frame = ttk.Frame(self.iface_window, padding=10)
+        list_frame.pack(fill='both', expand=True)
+
+        self.iface_checkboxes = []
+        for display_name, name in self.interfaces.items():
+            row = ttk.Frame(list_frame)
+            row.pack(fill='x', pady=2)
+            var = tk.BooleanVar(value=name in self.capture_ifaces)
+            ttk.Checkbutton(row, text=display_name, variable=var, width=40).pack(side='left')
+            filter_var = tk.StringVar(value=self.capture_ifaces.get(name, ""))
+            ttk.Entry(row, textvariable=filter_var, width=30).pack(side='left', fill='x', expand=True, padx=5)
+            self.iface_checkboxes.append((name, var, filter_var))
+
+        ttk.Button(self.iface_window, text="Áp dụng", command=self.apply_interface_selection).pack(side='right', padx=10, pady=10)
+
+    def apply_interface_selection(self):
+        self.capture_ifaces = {name: filter_var.get().strip() for name, var, filter_var in self.iface_checkboxes if var.get()}
+        self.iface_window.destroy()
+        if self.capture_ifaces:
+            self.iface_combo.config(state='disabled')
+            self.status_var.set(f"Sẵn sàng. Giám sát {len(self.capture_ifaces)} giao diện: {', '.join(self.capture_ifaces)}")
+        else:
+            self.iface_combo.config(state='readonly')
+            self.status_var.set("Sẵn sàng. Giám sát một giao diện (chọn trong danh sách).")
+
     def setup_global_copy_paste(self):
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Sao chép", command=self.copy_selection_global)
@@ -309,9 +367,11 @@ class NetworkScannerApp:
     def on_tab_changed(self, event):
         selected_tab_index = self.notebook.index(self.notebook.select())
         if selected_tab_index == 1:
-            if not (self.sniff_thread and self.sniff_thread.is_alive()) and self.all_packets_data and not self.chart_widgets:
+            if self.sniff_thread and self.sniff_thread.is_alive():
+                self.start_live_statistics()
+            elif not (self.sniff_thread and self.sniff_thread.is_alive()) and self.packet_store and self.post_stop_job is None and self.charts.cached(self.statistics_tab.statistics_key(self.packet_store)) is None:
                 self.statistics_tab.update_statistics_tab()
-            elif not self.all_packets_data:
+            elif not self.packet_store:
                 self.status_var.set("Chuyển sang Tab Thống kê. Hãy quét để có dữ liệu.")
                 self.statistics_tab.clear_charts()
                 
@@ -332,7 +392,7 @@ class NetworkScannerApp:
             print(f"Đã tải cấu hình từ {CONFIG_FILE}")
         except Exception as e:
             print(f"Không tìm thấy {CONFIG_FILE} hoặc file bị lỗi, sử dụng mặc định: {e}")
-            self.config = {"training_packets": 3000, "portscan_count": 40, "portscan_window": 10, "hostscan_count": 40, "hostscan_window": 10, "flood_count": 2000, "flood_window": 2}
+            self.config = {"training_packets": 3000, "portscan_count": 40, "portscan_window": 10, "hostscan_count": 40, "hostscan_window": 10, "flood_count": 2000, "flood_window": 2, "batch_size": 256, "batch_max_delay_ms": 20, "snaplen": 0, "replay_speed": 0, "analysis_workers": 0, "ring_capacity": 65536, "ring_overflow_policy": "drop_newest", "merge_delay_ms": 50, "session_db": 0, "session_batch_size": 2000, "session_hot_cache": 2000, "retention_mode": 0, "retention_packets": 100000, "retention_minutes": 10, "retention_context": 5, "live_view": 1, "live_view_fps": 4, "live_view_rows": 500, "live_alert_only_pps": 2000, "queue_batch_size": 512, "queue_budget_ms": 20, "queue_poll_ms": 100, "live_stats_ms": 1000, "top_capacity": 4096, "distinct_window_s": 60, "distinct_keys": 1024}
             self.save_config(show_message=False)
 
     def save_config(self, show_message=True):
@@ -349,8 +409,9 @@ class NetworkScannerApp:
         else: self.current_theme = "light"
         self.apply_theme()
         
-        if self.all_packets_data and hasattr(self, 'statistics_tab'):
-            self.statistics_tab.update_statistics_tab()
+        # (CẬP NHẬT) Chỉ đổi màu các biểu đồ đã có, không tổng hợp lại dữ liệu, không dựng lại Figure
+        if hasattr(self, 'statistics_tab'):
+            self.statistics_tab.apply_chart_theme()
 
     def apply_theme(self):
         colors = self.colors_dark if self.current_theme == "dark" else self.colors_light
@@ -398,16 +459,6 @@ class NetworkScannerApp:
         if hasattr(self, 'about_tab_instance'):
             self.about_tab_instance.update_theme_colors(colors["bg"], colors["fg"])
 
-    def parse_packet_to_dict(self, packet):
-        layers = {}
-        if packet.haslayer(Ether): layers['Ether'] = {"dst": packet[Ether].dst, "src": packet[Ether].src, "type": packet[Ether].type}
-        if packet.haslayer(ARP): layers['ARP'] = {"op": packet[ARP].op, "psrc": packet[ARP].psrc, "pdst": packet[ARP].pdst}
-        if packet.haslayer(IP): layers['IP'] = {"version": packet[IP].version, "ihl": packet[IP].ihl, "ttl": packet[IP].ttl, "proto": packet[IP].proto, "src": packet[IP].src, "dst": packet[IP].dst}
-        if packet.haslayer(TCP): layers['TCP'] = {"sport": packet[TCP].sport, "dport": packet[TCP].dport, "seq": packet[TCP].seq, "ack": packet[TCP].ack, "flags": str(packet[TCP].flags), "window": packet[TCP].window}
-        if packet.haslayer(UDP): layers['UDP'] = {"sport": packet[UDP].sport, "dport": packet[UDP].dport, "len": packet[UDP].len}
-        if packet.haslayer(ICMP): layers['ICMP'] = {"type": packet[ICMP].type, "code": packet[ICMP].code, "id": packet[ICMP].id}
-        return layers
-
     def parse_tcp_flags(self, flag_str):
         flags_map = {'F': 'FIN (Kết thúc)', 'S': 'SYN (Yêu cầu)', 'R': 'RST (Reset)', 'P': 'PSH (Đẩy dữ liệu)', 'A': 'ACK (Xác nhận)', 'U': 'URG (Khẩn)', 'E': 'ECE', 'C': 'CWR'}
         parts = [flags_map.get(f, f) for f in flag_str]
@@ -419,6 +470,15 @@ class NetworkScannerApp:
         self.details_text.insert(tk.END, message + "\n", (tag,))
         self.details_text.config(state='disabled')
         
+    def show_details(self, lines):
+        """(MỚI) Thay nội dung khung chi tiết bằng nhiều dòng (message, tag) trong MỘT lần cập nhật widget."""
+        args = []
+        for message, tag in lines: args += [message + "\n", (tag,)]
+        self.details_text.config(state='normal')
+        self.details_text.delete('1.0', tk.END)
+        if args: self.details_text.insert(tk.END, *args)
+        self.details_text.config(state='disabled')
+
     def populate_interfaces(self):
         self.interfaces = self.net_manager.list_interfaces()
         if not self.interfaces:
@@ -429,6 +489,13 @@ class NetworkScannerApp:
         self.iface_combo.current(0)
         self.status_var.set(f"Đã tải {len(self.interfaces)} giao diện. Sẵn sàng.")
 
+    def set_offline_only(self):
+        """(MỚI) Không có quyền Admin: chỉ cho phép phân tích file pcap."""
+        self.start_button.config(state='disabled')
+        self.scan_lan_button.config(state='disabled')
+        self.multi_iface_button.config(state='disabled')
+        self.status_var.set("Không có quyền Admin: chỉ có thể phân tích file pcap (nút 'Mở file pcap').")
+
     def clear_model(self):
         try:
             if os.path.exists(MODEL_PATH): os.remove(MODEL_PATH)
@@ -436,22 +503,155 @@ class NetworkScannerApp:
             self.status_var.set("Đã xóa mô hình. Sẽ huấn luyện lại ở lần quét tới.")
         except Exception as e: self.status_var.set(f"Lỗi khi xóa mô hình: {e}")
 
-    def start_scan(self):
+    def open_pcap_file(self):
+        """(MỚI) Chọn file pcap/pcapng để phân tích ngoại tuyến (không cần quyền Admin)."""
+        file_path = filedialog.askopenfilename(
+            title="Mở file bắt gói tin",
+            filetypes=[("Capture Files", "*.pcap *.pcapng *.cap"), ("All Files", "*.*")]
+        )
+        if file_path:
+            self.start_scan(pcap_path=file_path)
+
+    def save_session(self):
+        """(MỚI) Lưu phiên hiện tại (pcap + file phụ nhị phân) để mở lại sau mà không phát hiện lại."""
+        store = self.packet_store
+        if not store:
+            messagebox.showerror("Lỗi", "Không có dữ liệu để lưu. Hãy chạy một phiên quét trước.")
+            return
+        if isinstance(store, SessionDatabase):
+            messagebox.showinfo("Lưu phiên", f"Phiên đang được ghi trực tiếp vào:\n{store.path}\n\nDùng 'Mở phiên' để mở lại file này.")
+            self.session_saved = True
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pcap",
+            filetypes=[("Phiên TANetAI (pcap + file phụ)", "*.pcap")],
+            title="Lưu phiên",
+            initialfile=f"TANetAI_Session_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pcap"
+        )
+        if not file_path: return
+        try:
+            self.status_var.set("Đang lưu phiên...")
+            self.root.update_idletasks()
+            store.save(file_path, meta={'source': self.scan_source_label, 'app_version': self.CURRENT_VERSION, 'capture_stats': self.capture_stats})
+            self.session_saved = True
+            self.status_var.set(f"Đã lưu phiên ({len(store)} gói tin): {file_path}")
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không thể lưu phiên:\n{e}")
+            self.status_var.set("Lưu phiên thất bại.")
+
+    def open_session(self):
+        """(MỚI) Mở lại phiên đã lưu (pcap + file phụ, hoặc file SQLite) để xem ngay, không chạy lại phát hiện."""
+        file_path = filedialog.askopenfilename(
+            title="Mở phiên đã lưu",
+            filetypes=[("Phiên TANetAI", "*.pcap *.db"), ("All Files", "*.*")]
+        )
+        if not file_path: return
+        try:
+            if file_path.endswith(".db"):
+                store = SessionDatabase.open(file_path, hot_cache=self.config.get('session_hot_cache', 2000), top_capacity=self.config.get('top_capacity', 4096), distinct_window=self.config.get('distinct_window_s', 60), distinct_keys=self.config.get('distinct_keys', 1024))
+            else:
+                store = PacketStore.load(file_path, top_capacity=self.config.get('top_capacity', 4096), distinct_keys=self.config.get('distinct_keys', 1024))
+        except FileNotFoundError:
+            messagebox.showerror("Lỗi", "Không tìm thấy file phụ của phiên (.npy / .json) cạnh file pcap.\nDùng 'Mở file pcap' để phân tích lại file này.")
+            return
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không thể mở phiên:\n{e}")
+            return
+        
+        self.cancel_post_processing(wait=2.0)
+        self.packet_store.close()
+        self.packet_store = store
+        self.packet_count = store.total_count()
+        self.session_saved = True
+        meta = getattr(store, 'meta', {})
+        self.scan_source_label = meta.get('source') or os.path.basename(file_path)
+        self.capture_stats = meta.get('capture_stats'); self.replay_stats = None
+        # Giải thích cảnh báo AI cần thống kê huấn luyện của mô hình đã lưu
+        if self.ai_detector is None:
+            self.ai_detector = AnomalyDetector(n_packets_to_train=self.config.get('training_packets', 1000))
+            self.ai_detector.load_model(MODEL_PATH, STATS_PATH)
         try:
-            selected_display_name = self.iface_var.get()
-            if not selected_display_name: 
-                self.status_var.set("Lỗi: Vui lòng chọn một giao diện.")
-                return
+            self.statistics_tab.clear_charts()
+        except Exception as e:
+            print(f"Lỗi xóa biểu đồ (bỏ qua): {e}")
+        self.save_session_button.config(state='normal')
+        # (CẬP NHẬT) Trang đầu danh sách hiển thị ngay sau select(); chỉ mục cột được dựng khi truy vấn lọc lần đầu,
+        # thống kê được tổng hợp sau đó trên luồng nền
+        self.update_report_list()
+        self.start_post_processing(finished=f"Đã mở phiên {os.path.basename(file_path)}: {len(store)} gói tin. Sẵn sàng.", report=False)
+
+    def on_close(self):
+        """(MỚI) Hỏi lưu phiên trước khi thoát (phiên trong RAM sẽ mất khi đóng chương trình)."""
+        if self.sniff_thread and self.sniff_thread.is_alive():
+            self.stop_sniff_event.set()
+        if isinstance(self.packet_store, PacketStore) and self.packet_store and not self.session_saved:
+            answer = messagebox.askyesnocancel("Thoát", f"Phiên hiện tại ({len(self.packet_store)} gói tin) chưa được lưu.\nLưu trước khi thoát?")
+            if answer is None: return
+            if answer: self.save_session()
+        self.cancel_post_processing(wait=2.0)
+        self.packet_store.close()
+        self.root.destroy()
 
-            self.selected_iface_name = self.interfaces[selected_display_name]
+    def start_scan(self, pcap_path=None):
+        try:
+            self.cancel_post_processing(wait=2.0)
+            self.replay_path = pcap_path; self.replay_stats = None
+            if pcap_path:
+                self.selected_iface_names = [os.path.basename(pcap_path)]
+            elif self.capture_ifaces:
+                # (MỚI) Nhiều giao diện cùng lúc
+                self.selected_iface_names = list(self.capture_ifaces)
+            else:
+                selected_display_name = self.iface_var.get()
+                if not selected_display_name: 
+                    self.status_var.set("Lỗi: Vui lòng chọn một giao diện.")
+                    return
+                self.selected_iface_names = [self.interfaces[selected_display_name]]
+            self.scan_source_label = ", ".join(self.selected_iface_names)
             self.load_config() 
             
-            self.ai_detector = AnomalyDetector(n_packets_to_train=self.config.get('training_packets', 1000))
-            self.behavior_analyzer = BehavioralAnalyzer(portscan_count=self.config.get('portscan_count', 20), portscan_window=self.config.get('portscan_window', 10), hostscan_count=self.config.get('hostscan_count', 20), hostscan_window=self.config.get('hostscan_window', 10), flood_count=self.config.get('flood_count', 500), flood_window=self.config.get('flood_window', 2))
+            # (MỚI) Chế độ đa tiến trình: phân tích song song theo địa chỉ nguồn
+            self.worker_pool = None
+            n_workers = self.config.get('analysis_workers', 0)
+            if n_workers > 0:
+                self.worker_pool = AnalysisWorkerPool(n_workers, self.config, self.on_packet_record, MODEL_PATH, STATS_PATH, target_ips=self.target_ips)
+            # Mô hình được huấn luyện trong tiến trình chính của bộ tiến trình phân tích: dùng chung bộ phát hiện đó
+            # để giải thích cảnh báo AI và lưu mô hình
+            if self.worker_pool:
+                self.ai_detector = self.worker_pool.detector
+            else:
+                self.ai_detector = AnomalyDetector(n_packets_to_train=self.config.get('training_packets', 1000))
+            self.behavior_analyzer = BehavioralAnalyzer.from_config(self.config)
+            # (MỚI) Quy trình phát hiện dùng chung; AI dự đoán theo lô cho nhiều gói tin
+            self.pipeline = DetectionPipeline(self.ai_detector, self.behavior_analyzer, self.on_packet_record, target_ips=self.target_ips, batch_size=self.config.get('batch_size', 256), max_delay=self.config.get('batch_max_delay_ms', 20) / 1000.0)
             
-            self.stop_sniff_event.clear(); self.packet_count = 0; self.all_packets_data = [] 
+            self.stop_sniff_event.clear(); self.packet_count = 0; self.session_saved = False
+            # (MỚI) Bản ghi kết quả được gửi về giao diện theo lô thay vì từng gói tin
+            self.record_batcher = MessageBatcher(self.message_queue, max_items=self.config.get('queue_batch_size', 512), max_delay=self.pipeline.batcher.max_delay)
+            # (MỚI) Phiên dài: lưu vào SQLite trên đĩa (bộ nhớ không tăng theo thời gian); mặc định giữ trong RAM
+            self.packet_store.close()
+            if self.config.get('session_db', 0):
+                self.packet_store = SessionDatabase(new_session_path(SESSION_DIR), batch_size=self.config.get('session_batch_size', 2000), hot_cache=self.config.get('session_hot_cache', 2000), top_capacity=self.config.get('top_capacity', 4096), distinct_window=self.config.get('distinct_window_s', 60), distinct_keys=self.config.get('distinct_keys', 1024))
+            elif self.config.get('retention_mode', 0):
+                # (MỚI) Giám sát liên tục trong RAM: gói bình thường chỉ giữ trong cửa sổ, cảnh báo + ngữ cảnh giữ mãi
+                self.packet_store = PacketStore(window_packets=self.config.get('retention_packets', 100000), window_seconds=self.config.get('retention_minutes', 10) * 60, context_packets=self.config.get('retention_context', 5), top_capacity=self.config.get('top_capacity', 4096), distinct_window=self.config.get('distinct_window_s', 60), distinct_keys=self.config.get('distinct_keys', 1024))
+            else:
+                self.packet_store = PacketStore(top_capacity=self.config.get('top_capacity', 4096), distinct_window=self.config.get('distinct_window_s', 60), distinct_keys=self.config.get('distinct_keys', 1024))
+            # (MỚI) Bộ đệm vòng giữa luồng bắt gói và luồng phân tích.
+            # Phát lại file: chờ thay vì bỏ gói (nguồn ngoại tuyến không được mất dữ liệu)
+            policy = "block" if pcap_path else self.config.get('ring_overflow_policy', 'drop_newest')
+            # (MỚI) Mỗi giao diện một bộ đệm riêng; luồng phân tích gộp lại theo thứ tự thời điểm bắt gói
+            wakeup = threading.Event()
+            self.capture_rings = {name: CaptureRingBuffer(self.config.get('ring_capacity', 65536), policy, wakeup=wakeup) for name in self.selected_iface_names}
+            self.capture_stream = MergedCaptureStream(self.capture_rings, lambda item: float(item[1].time), max_delay=self.config.get('merge_delay_ms', 50) / 1000.0, wakeup=wakeup)
+            self.capture_stats = None; self._pps_state = {}
+            self.net_manager.reset_kernel_stats()
+            # (MỚI) Đẩy bộ lọc IP mục tiêu xuống kernel (BPF) để gói không liên quan không vào Python
+            self.capture_filter = self.net_manager.build_bpf_filter(self.target_ips)
+            # (MỚI) Bộ lọc riêng của từng giao diện được ghép với bộ lọc mục tiêu
+            self.capture_filters = {name: self.net_manager.combine_bpf_filters(self.capture_filter, self.capture_ifaces.get(name, "")) for name in self.selected_iface_names}
             
-            for i in self.report_tree.get_children(): self.report_tree.delete(i)
+            self.report_tree.clear()
             
             try:
                 self.statistics_tab.clear_charts()
@@ -459,8 +659,12 @@ class NetworkScannerApp:
                 print(f"Lỗi xóa biểu đồ (bỏ qua): {e}")
 
             self.start_button.config(state='disabled')
+            self.open_pcap_button.config(state='disabled')
+            self.save_session_button.config(state='disabled')
+            self.open_session_button.config(state='disabled')
             self.stop_button.config(state='normal')
             self.iface_combo.config(state='disabled')
+            self.multi_iface_button.config(state='disabled')
             self.retrain_button.config(state='disabled')
             self.theme_switch.unbind("<Button-1>") 
             
@@ -470,7 +674,7 @@ class NetworkScannerApp:
             self.filter_normal_check.config(state='disabled')
             self.monitor_tab_instance.disable_danger_check()
             
-            self.notebook.tab(1, state="disabled") 
+            # (CẬP NHẬT) Tab Thống kê vẫn dùng được khi đang quét (biểu đồ cập nhật trực tiếp)
             self.notebook.tab(2, state="disabled") 
             
             self.export_pdf_button.config(state='disabled')
@@ -481,8 +685,11 @@ class NetworkScannerApp:
             else:
                 self.status_var.set(f"Đang huấn luyện... (Sử dụng {self.config.get('training_packets', 1000)} gói)")
             
+            if self.worker_pool: self.worker_pool.start()
             self.sniff_thread = threading.Thread(target=self.run_scanner_thread, daemon=True)
             self.sniff_thread.start()
+            self.start_live_view()
+            self.start_live_statistics()
 
         except Exception as e:
             error_msg = f"Lỗi khi khởi động quét:\n{str(e)}\n{traceback.format_exc()}"
@@ -491,60 +698,106 @@ class NetworkScannerApp:
             self.on_scan_stopped()
 
     def run_scanner_thread(self):
+        # (MỚI) Luồng phân tích riêng: luồng bắt gói chỉ đẩy gói tin vào bộ đệm vòng
+        self.analysis_thread = threading.Thread(target=self.run_analysis_thread, daemon=True)
+        self.analysis_thread.start()
+        replay = None
         try:
-            self.net_manager.start_sniffing(self.selected_iface_name, self.packet_callback, self.stop_sniff_event)
+            if self.replay_path:
+                # (MỚI) Chế độ phân tích ngoại tuyến từ file pcap
+                name = self.selected_iface_names[0]
+                replay = self.net_manager.replay_pcap(self.replay_path, self.make_packet_callback(name), self.stop_sniff_event, speed=self.config.get('replay_speed', 0))
+            else:
+                # (MỚI) Mỗi giao diện một luồng bắt gói; lỗi của một giao diện không dừng các giao diện khác
+                errors = []
+                threads = [threading.Thread(target=self.run_capture_thread, args=(name, errors), daemon=True) for name in self.selected_iface_names]
+                for t in threads: t.start()
+                for t in threads: t.join()
+                if errors and len(errors) == len(threads):
+                    self.message_queue.put(("ERROR", errors[0]))
         except PermissionError as e: self.message_queue.put(("ERROR", str(e)))
         except Exception as e: self.message_queue.put(("ERROR", f"Lỗi không xác định: {e}"))
-        finally: self.message_queue.put(("STOPPED", None))
-
-    def packet_callback(self, packet):
-        # (MỚI) Lấy thời gian
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        
-        features = self.ai_detector._extract_features(packet)
-        prediction = self.ai_detector.process_packet(packet)
-        behavior_analysis = self.behavior_analyzer.process_packet(packet)
-        parsed_layers = self.parse_packet_to_dict(packet)
-        tag = 'normal'; rule_analysis = "" 
-        proto_name = "Other"
-        if packet.haslayer(TCP): proto_name = "TCP"
-        elif packet.haslayer(UDP): proto_name = "UDP"
-        elif packet.haslayer(ICMP): proto_name = "ICMP"
-        elif packet.haslayer(ARP): proto_name = "ARP"
-        if prediction == -1: tag = 'anomaly' 
-        if behavior_analysis: tag = 'anomaly'
-        if packet.haslayer(TCP) and packet[TCP].flags.R: rule_analysis = "LỖI PHẦN MỀM: Gói tin TCP Reset (RST) - Kết nối bị từ chối."; tag = 'anomaly'
-        elif packet.haslayer(ICMP):
-            icmp_type = packet[ICMP].type
-            if icmp_type == 3: rule_analysis = "LỖI MẠNG: ICMP Destination Unreachable." 
-            elif icmp_type == 11: rule_analysis = "LỖI MẠNG: ICMP Time Exceeded." 
-            elif icmp_type == 5: rule_analysis = "CẢNH BÁO MẠNG: ICMP Redirect." 
-
-        # (CẬP NHẬT) Logic gán Tag
-        if behavior_analysis or rule_analysis:
-            tag = 'danger'
-        elif prediction == -1:
-            tag = 'anomaly'
-
-        # (CẬP NHẬT) Logic Lọc IP Mục tiêu
-        if self.target_ips:
-            src = parsed_layers.get('IP', {}).get('src', '') or parsed_layers.get('ARP', {}).get('psrc', '')
-            dst = parsed_layers.get('IP', {}).get('dst', '') or parsed_layers.get('ARP', {}).get('pdst', '')
-            if src not in self.target_ips and dst not in self.target_ips:
-                return # Bỏ qua nếu không phải mục tiêu
-
-        packet_data = {
-            'summary': packet.summary(), 
-            'parsed_layers': parsed_layers, 
-            'features': features, 
-            'prediction': prediction, 
-            'tag': tag, 
-            'rule_analysis': rule_analysis, 
-            'behavior_analysis': behavior_analysis, 
-            'proto_name': proto_name,
-            'time': timestamp # Lưu thời gian
+        finally:
+            self.stop_sniff_event.set()
+            # Phân tích nốt các gói tin còn trong bộ đệm rồi mới báo dừng
+            for ring in self.capture_rings.values(): ring.close()
+            self.analysis_thread.join()
+            if self.worker_pool: self.worker_pool.stop()
+            elif self.pipeline: self.pipeline.flush()
+            self.record_batcher.flush()
+            # Tốc độ phát lại tính tới khi phân tích xong, không phải khi đọc xong file
+            if replay is not None: self.message_queue.put(("REPLAY_DONE", self.net_manager.finish_replay(replay)))
+            self.capture_stats = self.get_capture_counters()
+            self.message_queue.put(("STOPPED", None))
+
+    def run_capture_thread(self, iface_name, errors):
+        try:
+            self.net_manager.start_sniffing(iface_name, self.make_packet_callback(iface_name), self.stop_sniff_event, bpf_filter=self.capture_filters.get(iface_name), snaplen=self.config.get('snaplen', 0))
+        except Exception as e:
+            errors.append(f"{iface_name}: {e}")
+        finally:
+            # Giao diện này dừng: không để bộ gộp chờ gói tin của nó nữa
+            self.capture_rings[iface_name].close()
+
+    def run_analysis_thread(self):
+        run_analysis_loop(self.capture_stream, self.analyze_packet, self._on_analysis_tick, batch_size=self.config.get('batch_size', 256), tick=self.pipeline.batcher.max_delay)
+
+    def _on_analysis_tick(self):
+        # Xả lô AI khi lưu lượng thưa (không chờ đủ batch_size)
+        if self.worker_pool: self.worker_pool.flush_pending()
+        else: self.pipeline.flush_if_due()
+        self.record_batcher.flush_if_due()
+
+    def make_packet_callback(self, iface_name):
+        # (CẬP NHẬT) Luồng bắt gói không phân tích: chỉ đẩy vào bộ đệm vòng của giao diện (bỏ gói khi đầy, tùy chính sách)
+        ring = self.capture_rings[iface_name]
+        def callback(packet):
+            ring.put((iface_name, packet)) # Không trả về giá trị: sniff() sẽ in mọi giá trị trả về của prn
+        return callback
+
+    def analyze_packet(self, item):
+        iface_name, packet = item
+        if self.worker_pool:
+            # (MỚI) Chỉ chia gói tin cho tiến trình phân tích, không phân tích tại luồng bắt gói
+            self.worker_pool.submit(packet, iface_name)
+            return
+        # (MỚI) Giải mã gói tin MỘT lần; mọi tầng phân tích dùng chung PacketView
+        view = PacketView.from_packet(packet)
+        self.pipeline.process(view, iface_name)
+
+    def on_packet_record(self, packet_data):
+        self.record_batcher.add(packet_data)
+
+    def get_capture_counters(self):
+        """
+        (MỚI) Bộ đếm mất gói: kernel bỏ (pcap stats), bộ đệm vòng bỏ, tồn đọng phân tích.
+        (MỚI) Kèm bộ đếm theo từng giao diện (gói nhận, gói bỏ, gói/giây).
+        """
+        now = time.monotonic()
+        interfaces = {}
+        for name, ring in self.capture_rings.items():
+            stats = ring.stats()
+            kernel = self.net_manager.get_kernel_stats(name)
+            last_time, last_pushed = self._pps_state.get(name, (now, stats['pushed']))
+            elapsed = now - last_time
+            pps = (stats['pushed'] - last_pushed) / elapsed if elapsed > 0 else 0.0
+            if elapsed >= 1.0 or name not in self._pps_state:
+                self._pps_state[name] = (now, stats['pushed'])
+            interfaces[name] = dict(stats, kernel_dropped=kernel['dropped'], pps=pps)
+        return {
+            'kernel_dropped': sum(i['kernel_dropped'] for i in interfaces.values()),
+            'ring_dropped': sum(i['dropped'] for i in interfaces.values()),
+            'backlog': self.capture_stream.backlog if self.capture_stream else 0,
+            'max_backlog': max((i['max_backlog'] for i in interfaces.values()), default=0),
+            'ring_capacity': max((i['capacity'] for i in interfaces.values()), default=0),
+            'interfaces': interfaces,
         }
-        self.message_queue.put(("PACKET", packet_data))
+
+    def format_capture_counters(self, counters):
+        text = f"Kernel bỏ: {counters['kernel_dropped']} | Bộ đệm bỏ: {counters['ring_dropped']} | Tồn đọng: {counters['backlog']}/{counters['ring_capacity']}"
+        if len(counters['interfaces']) > 1:
+            text += " | " + ", ".join(f"{name}: {i['pps']:.0f} gói/s" for name, i in counters['interfaces'].items())
+        return text
 
     def _check_protocol_filter(self, proto_name):
         if proto_name == 'TCP' and not self.filter_tcp_var.get(): return False
@@ -555,29 +808,115 @@ class NetworkScannerApp:
         return True 
 
     def process_queue(self):
+        """
+        (CẬP NHẬT) Xả hàng đợi trong một ngân sách thời gian cố định mỗi lượt (queue_budget_ms) rồi trả quyền
+        cho vòng lặp Tk (vẽ lại, nút bấm). Gói tin đến theo lô ("PACKETS", [bản ghi...]).
+        Chu kỳ kiểm tra thích ứng theo tồn đọng: còn thông điệp thì gọi lại gần như ngay, rảnh thì giãn dần tới queue_poll_ms.
+        """
+        deadline = time.perf_counter() + self.config.get('queue_budget_ms', 20) / 1000.0
+        received = 0
         try:
-            while not self.message_queue.empty():
-                msg_type, data = self.message_queue.get()
+            while time.perf_counter() < deadline:
+                try:
+                    msg_type, data = self.message_queue.get_nowait()
+                except queue.Empty:
+                    break
                 if msg_type == "STOPPED": self.on_scan_stopped(); continue
                 if msg_type == "ERROR": self.status_var.set(f"Lỗi nghiêm trọng: {data}"); self.on_scan_stopped(); continue
+                if msg_type == "REPLAY_DONE": self.replay_stats = data; continue
                 
-                if msg_type == "PACKET":
-                    self.packet_count += 1
-                    packet_data = data
-                    packet_data['id'] = self.packet_count 
-                    self.all_packets_data.append(packet_data)
+                if msg_type == "PACKETS":
+                    # (CẬP NHẬT) Lưu vào kho dạng cột (NumPy) thay vì giữ nguyên dict của từng gói tin
+                    append = self.packet_store.append
+                    for record in data:
+                        self.packet_count = append(record)
+                    received += len(data)
                     
-                    if self.packet_count % 50 == 0: 
-                        if self.ai_detector and not self.ai_detector.is_trained:
-                            train_target = self.config.get('training_packets', 1000)
-                            self.status_var.set(f"Đang huấn luyện... ({self.packet_count}/{train_target})")
-                            if self.ai_detector.just_trained:
-                                self.status_var.set("Hoàn tất huấn luyện! Bắt đầu phát hiện.")
-                                self.ai_detector.just_trained = False
-                        else:
-                             self.status_var.set(f"Đang quét... Đã phát hiện {self.packet_count} gói tin.")
+            if received and self.sniff_thread and self.sniff_thread.is_alive():
+                if self.ai_detector and not self.ai_detector.is_trained and not self.worker_pool:
+                    train_target = self.config.get('training_packets', 1000)
+                    self.status_var.set(f"Đang huấn luyện... ({self.packet_count}/{train_target})")
+                    if self.ai_detector.just_trained:
+                        self.status_var.set("Hoàn tất huấn luyện! Bắt đầu phát hiện.")
+                        self.ai_detector.just_trained = False
+                else:
+                     self.status_var.set(f"Đang quét... Đã phát hiện {self.packet_count} gói tin. | {self.format_capture_counters(self.get_capture_counters())}{self.live_view_status()}")
         finally:
-            self.root.after(100, self.process_queue)
+            if not self.message_queue.empty(): self.queue_delay = 1
+            elif received: self.queue_delay = 10
+            else: self.queue_delay = min(self.config.get('queue_poll_ms', 100), self.queue_delay * 2)
+            self.root.after(self.queue_delay, self.process_queue)
+
+    def start_live_view(self):
+        """
+        (MỚI) Danh sách gói tin trực tiếp khi đang quét: cập nhật gộp theo lô với số khung hình/giây giới hạn,
+        chỉ hiện live_view_rows dòng mới nhất và bám theo cuối danh sách. Khi tốc độ gói vượt live_alert_only_pps,
+        tự chuyển sang chỉ hiện cảnh báo (Nguy hiểm / Bất thường) để giao diện không bị treo.
+        """
+        if self.live_view_job is not None:
+            self.root.after_cancel(self.live_view_job)
+            self.live_view_job = None
+        self.live_state = None
+        if not self.config.get('live_view', 1): return
+        self.live_state = {'time': time.monotonic(), 'count': 0, 'rate': 0.0, 'shown': 0, 'alert_only': False, 'paused': False}
+        self.live_view_job = self.root.after(0, self.refresh_live_view)
+
+    def refresh_live_view(self):
+        self.live_view_job = None
+        state = self.live_state
+        if state is None or not (self.sniff_thread and self.sniff_thread.is_alive()): return
+        fps = max(1, self.config.get('live_view_fps', 4))
+        self.live_view_job = self.root.after(int(1000 / fps), self.refresh_live_view)
+
+        # Tốc độ gói tin (trung bình trượt) để quyết định chế độ hiển thị
+        now = time.monotonic()
+        elapsed = now - state['time']
+        if elapsed > 0:
+            state['rate'] = 0.5 * state['rate'] + 0.5 * (self.packet_count - state['count']) / elapsed
+        state['time'], state['count'] = now, self.packet_count
+        threshold = self.config.get('live_alert_only_pps', 2000)
+        alert_only = state['alert_only']
+        if threshold and state['rate'] > threshold: alert_only = True
+        elif alert_only and state['rate'] < threshold * 0.8: alert_only = False   # Trễ 20% tránh bật/tắt liên tục
+
+        # Người dùng cuộn lên xem dòng cũ: tạm dừng bám đuôi cho tới khi cuộn lại xuống cuối
+        state['paused'] = not self.report_tree.at_tail()
+        if state['paused']: return
+        # Gộp: không có gói mới và không đổi chế độ thì không vẽ lại
+        if self.packet_count == state['shown'] and alert_only == state['alert_only']: return
+        state['shown'], state['alert_only'] = self.packet_count, alert_only
+
+        store = self.packet_store
+        rows = store.tail(self.config.get('live_view_rows', 500), verdicts=('danger', 'anomaly') if alert_only else None)
+        self.report_tree.follow_source(len(rows), lambda start, end: self.report_items(store, rows[start:end]))
+
+    def live_view_status(self):
+        state = self.live_state
+        if not state: return ""
+        if state['paused']: return " | Danh sách trực tiếp: tạm dừng (cuộn xuống cuối để tiếp tục)"
+        if state['alert_only']: return f" | Lưu lượng cao ({state['rate']:.0f} gói/s): danh sách trực tiếp chỉ hiện cảnh báo"
+        return ""
+
+    def start_live_statistics(self):
+        """
+        (MỚI) Thống kê trực tiếp khi đang quét: bộ đếm được kho gói tin cộng dồn khi thêm gói, biểu đồ được cập nhật
+        tại chỗ mỗi live_stats_ms (chỉ khi Tab Thống kê đang mở), chi phí mỗi lần làm mới không tăng theo số gói.
+        """
+        if self.live_stats_job is not None:
+            self.root.after_cancel(self.live_stats_job)
+            self.live_stats_job = None
+        if self.config.get('live_stats_ms', 1000) > 0:
+            self.live_stats_job = self.root.after(0, self.refresh_live_statistics)
+
+    def refresh_live_statistics(self):
+        self.live_stats_job = None
+        if not (self.sniff_thread and self.sniff_thread.is_alive()): return
+        self.live_stats_job = self.root.after(max(100, self.config.get('live_stats_ms', 1000)), self.refresh_live_statistics)
+        if self.packet_store and self.notebook.index(self.notebook.select()) == 1:
+            try:
+                self.statistics_tab.draw_statistics(self.statistics_tab.prepare_statistics(self.packet_store))
+            except Exception as e:
+                print(f"Lỗi cập nhật thống kê trực tiếp: {e}")
 
     def stop_scan(self):
         if self.sniff_thread and self.sniff_thread.is_alive():
@@ -595,14 +934,25 @@ class NetworkScannerApp:
 
     def on_scan_stopped(self):
         self.status_var.set(f"Đã dừng. Đang xử lý {self.packet_count} gói tin...")
+        if self.live_view_job is not None:
+            self.root.after_cancel(self.live_view_job)
+            self.live_view_job = None
+        self.live_state = None
+        if self.live_stats_job is not None:
+            self.root.after_cancel(self.live_stats_job)
+            self.live_stats_job = None
         
         if self.ai_detector and not os.path.exists(MODEL_PATH):
             if self.ai_detector.is_trained:
                 self.ai_detector.save_model(MODEL_PATH, STATS_PATH)
         
-        self.start_button.config(state='normal')
+        if self.is_admin: self.start_button.config(state='normal')
+        self.open_pcap_button.config(state='normal')
+        self.save_session_button.config(state='normal' if self.packet_store else 'disabled')
+        self.open_session_button.config(state='normal')
         self.stop_button.config(state='disabled')
-        self.iface_combo.config(state='readonly')
+        self.iface_combo.config(state='disabled' if self.capture_ifaces else 'readonly')
+        self.multi_iface_button.config(state='normal' if self.is_admin else 'disabled')
         self.retrain_button.config(state='normal')
         self.theme_switch.bind("<Button-1>", self.theme_switch.toggle)
         
@@ -619,100 +969,190 @@ class NetworkScannerApp:
         
         if self.sniff_thread: self.sniff_thread.join(timeout=1.0)
         self.sniff_thread = None
+        self.packet_store.trim()
         
-        if self.all_packets_data:
-            self.status_var.set("Đang tải dữ liệu vào danh sách...")
-            self.update_report_list() 
-            self.status_var.set("Đang tạo biểu đồ thống kê...")
-            self.statistics_tab.update_statistics_tab() 
-            self.status_var.set(f"Hoàn tất! Đã phân tích {self.packet_count} gói tin. Sẵn sàng.")
+        if self.packet_store:
+            # (CẬP NHẬT) Lọc, tổng hợp và chuẩn bị biểu đồ trên luồng nền, cửa sổ vẫn phản hồi
+            self.start_post_processing()
         else:
             self.status_var.set("Đã dừng. Không có dữ liệu để báo cáo.")
 
+    def start_post_processing(self, finished=None, report=True):
+        """
+        (MỚI) Phần xử lý sau khi dừng quét chạy trên luồng nền (BackgroundJob): lập chỉ mục cột cho truy vấn lọc,
+        lọc danh sách giám sát, đếm và chọn dữ liệu biểu đồ. Chỉ việc cập nhật widget cuối cùng chạy trên luồng Tk.
+        Có thanh tiến độ và nút Hủy; lọc thủ công trong lúc chờ được ưu tiên hơn kết quả nền.
+        finished: nội dung thanh trạng thái khi xong (mặc định: tóm tắt phiên quét).
+        report: False khi danh sách đã được lọc (mở lại phiên): chỉ tổng hợp thống kê, không lập chỉ mục.
+        """
+        self.cancel_post_processing()
+        store = self.packet_store
+        verdicts, protos, search_term = self.report_filter()
+        try:
+            query = parse_query(search_term) if search_term else None
+        except QueryError:
+            query = None
+        version = self.report_version
+        prepare_statistics = self.statistics_tab.prepare_statistics
+
+        def work(job):
+            rows = elapsed = None
+            if report:
+                if isinstance(store, PacketStore):
+                    for i, name in enumerate(INDEXED_COLUMNS):
+                        job.progress(0.4 * i / len(INDEXED_COLUMNS), "Đang lập chỉ mục cho truy vấn lọc...")
+                        store.column_index(name)
+                job.progress(0.4, "Đang lọc danh sách gói tin...")
+                started = time.perf_counter()
+                rows = store.select(verdicts=verdicts, protos=protos, query=query)
+                elapsed = (time.perf_counter() - started) * 1000
+            job.progress(0.6 if report else 0.0, "Đang tổng hợp thống kê...")
+            stats = prepare_statistics(store)
+            job.progress(1.0, "Đang vẽ biểu đồ thống kê...")
+            return rows, elapsed, stats
+
+        def done(result):
+            rows, elapsed, stats = result
+            self.post_stop_job = None
+            self.hide_job_progress()
+            if rows is not None and self.report_version == version:
+                self.show_report_rows(store, rows, elapsed)
+            try:
+                self.statistics_tab.draw_statistics(stats)
+            except Exception as e:
+                print(f"Lỗi tạo thống kê: {e}")
+            self.status_var.set(finished or self.finished_status())
+
+        def failed(error):
+            self.post_stop_job = None
+            self.hide_job_progress()
+            self.status_var.set(f"Lỗi xử lý dữ liệu sau khi dừng: {error}")
+
+        self.job_progress['value'] = 0.0
+        self.job_cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.job_progress.pack(side=tk.RIGHT, padx=5)
+        self.post_stop_job = BackgroundJob(self.root, work, done, on_progress=self.on_job_progress, on_error=failed).start()
+
+    def on_job_progress(self, fraction, text):
+        self.job_progress['value'] = fraction
+        self.status_var.set(f"{text} ({fraction:.0%})")
+
+    def hide_job_progress(self):
+        self.job_progress.pack_forget()
+        self.job_cancel_button.pack_forget()
+
+    def cancel_post_processing(self, wait=0.0):
+        """Hủy phần xử lý nền (nếu đang chạy); wait: chờ luồng nền dừng trước khi đóng / thay kho gói tin."""
+        job, self.post_stop_job = self.post_stop_job, None
+        if job is None:
+            return False
+        job.cancel(wait)
+        self.hide_job_progress()
+        return True
+
+    def on_cancel_post_processing(self):
+        if self.cancel_post_processing():
+            self.status_var.set("Đã hủy xử lý dữ liệu. Nhấn Enter trong ô tìm kiếm để tải danh sách, mở Tab Thống kê để tạo biểu đồ.")
+
+    def finished_status(self):
+        counters = f" | {self.format_capture_counters(self.capture_stats)}" if self.capture_stats else ""
+        if self.replay_stats:
+            return f"Hoàn tất phát lại! Đã phân tích {self.packet_count} gói tin ({self.replay_stats['pps']:.0f} gói/giây). Sẵn sàng.{counters}"
+        return f"Hoàn tất! Đã phân tích {self.packet_count} gói tin. Sẵn sàng.{counters}"
+
     def update_report_list_if_stopped(self):
         if not (self.sniff_thread and self.sniff_thread.is_alive()):
             self.update_report_list()
 
+    def report_filter(self):
+        """(MỚI) Bộ lọc hiện tại của danh sách giám sát: (phán quyết, giao thức, chuỗi tìm kiếm / truy vấn)."""
+        verdicts = []
+        if self.filter_danger_var.get(): verdicts.append('danger')
+        if self.filter_anomaly_var.get(): verdicts.append('anomaly')
+        if self.filter_normal_var.get(): verdicts.append('normal')
+        protos = [p for p in PROTO_NAMES if self._check_protocol_filter(p)]
+        return verdicts, protos, self.search_var.get().strip()
+
     def update_report_list(self):
-        self.log_details("", clear=True) 
-        for i in self.report_tree.get_children():
-            self.report_tree.delete(i)
-        search_term = self.search_var.get().lower()
-        
-        show_danger = self.filter_danger_var.get()
-        show_anomaly = self.filter_anomaly_var.get()
-        show_normal = self.filter_normal_var.get()
+        verdicts, protos, search_term = self.report_filter()
+        # (MỚI) Chuỗi lọc là truy vấn (ip==... && dport in ... && tag==... && time>...) hoặc tìm kiếm tự do như trước
+        try:
+            query = parse_query(search_term) if search_term else None
+        except QueryError as e:
+            self.log_details("", clear=True)
+            self.status_var.set(f"Lỗi truy vấn lọc: {e}")
+            return
         
-        count = 0
-        for pkt in self.all_packets_data:
-            tag = pkt['tag']
-            
-            if tag == 'danger' and not show_danger: continue
-            if tag == 'anomaly' and not show_anomaly: continue
-            if tag == 'normal' and not show_normal: continue
-            
-            if search_term and search_term not in pkt['summary'].lower():
-                continue
-            if not self._check_protocol_filter(pkt.get('proto_name', 'Other')):
-                continue
-            
+        # (CẬP NHẬT) Lọc trong kho gói tin qua chỉ mục cột (NumPy) hoặc chỉ mục SQLite
+        store = self.packet_store
+        started = time.perf_counter()
+        rows = store.select(verdicts=verdicts, protos=protos, query=query)
+        self.show_report_rows(store, rows, (time.perf_counter() - started) * 1000)
+
+    def show_report_rows(self, store, rows, elapsed):
+        """Hiển thị kết quả lọc (rows) trong danh sách giám sát; elapsed: thời gian lọc (ms)."""
+        self.report_version += 1
+        self.log_details("", clear=True) 
+        # (CẬP NHẬT) Danh sách ảo: chỉ dựng các dòng đang nhìn thấy, không chèn một dòng Treeview cho mỗi gói tin
+        self.report_tree.set_source(len(rows), lambda start, end: self.report_items(store, rows[start:end]))
+        evicted = f" ({store.evicted_count} gói bình thường ngoài cửa sổ lưu giữ đã được giải phóng)" if store.evicted_count else ""
+        self.status_var.set(f"Đã lọc ({elapsed:.0f} ms). Hiển thị {len(rows)} / {len(store)} gói tin.{evicted}")
+
+    def report_items(self, store, rows):
+        """(iid, values, tags) của các dòng kết quả lọc cho danh sách ảo."""
+        items = []
+        for packet_id, time_str, summary, tag in store.display_rows(rows):
             status_text = "Bình thường"
             if tag == 'danger': status_text = "NGUY HIỂM"
             elif tag == 'anomaly': status_text = "Bất thường"
-            
-            self.report_tree.insert(
-                '', 'end', 
-                values=(pkt['id'], pkt['time'], pkt['summary'], status_text),
-                tags=(pkt['tag'],)
-            )
-            count += 1
-        self.status_var.set(f"Đã lọc. Hiển thị {count} / {len(self.all_packets_data)} gói tin.")
+            items.append((packet_id, (packet_id, time_str, summary, status_text), (tag,)))
+        return items
 
     def on_packet_select(self, event):
         selected_items = self.report_tree.selection()
         if not selected_items: return
-        selected_item = selected_items[0]
-        item_values = self.report_tree.item(selected_item, 'values')
-        if not item_values: return 
-        packet_id = int(item_values[0])
-        packet_data = None
-        for pkt in self.all_packets_data:
-            if pkt['id'] == packet_id:
-                packet_data = pkt
-                break
-        if packet_data:
-            self.log_details("", clear=True)
-            self.log_details(f"--- CHI TIẾT GÓI TIN (ID: {packet_id}) ---", "header")
-            self.log_details(f"Thời gian: {packet_data['time']}\n", "normal")
+        # (CẬP NHẬT) iid của dòng chính là số thứ tự gói tin: không cần đọc lại giá trị của dòng
+        packet_id = int(selected_items[0])
+        row = self.packet_store.row_of(packet_id)
+        if row is not None:
+            # Dựng lại bản ghi từ kho; các tầng chỉ được giải mã từ byte tiêu đề khi chọn gói tin
+            packet_data = self.packet_store.get(row)
+            lines = []
+            lines.append((f"--- CHI TIẾT GÓI TIN (ID: {packet_id}) ---", "header"))
+            lines.append((f"Thời gian: {packet_data['time']}", "normal"))
+            lines.append((f"Giao diện: {packet_data.get('iface') or 'N/A'}\n", "normal"))
             
             parsed_data = packet_data['parsed_layers']
             for layer_name, fields in parsed_data.items():
                 layer_display = TRANSLATION_MAP.get(layer_name, layer_name)
-                self.log_details(f"\n--- {layer_display} ---", "header")
+                lines.append((f"\n--- {layer_display} ---", "header"))
                 for key, value in fields.items():
                     key_display = TRANSLATION_MAP.get(key, key)
                     value_display = str(value)
                     if key == 'proto': value_display = TRANSLATION_MAP.get(value, str(value))
                     elif key == 'flags': value_display = self.parse_tcp_flags(value)
                     elif layer_name == 'ICMP' and key == 'code': value_display = TRANSLATION_MAP.get((fields['type'], value), str(value))
-                    self.log_details(f"{key_display:<30}\t: {value_display}", "normal")
+                    lines.append((f"{key_display:<30}\t: {value_display}", "normal"))
             
             tag = packet_data['tag']
             if packet_data['rule_analysis']:
-                self.log_details("\n--- PHÂN TÍCH QUY TẮC (Rule-Based) ---", "analysis_header")
-                self.log_details(packet_data['rule_analysis'], "danger") 
+                lines.append(("\n--- PHÂN TÍCH QUY TẮC (Rule-Based) ---", "analysis_header"))
+                lines.append((packet_data['rule_analysis'], "danger"))
             if packet_data['behavior_analysis']:
-                self.log_details("\n--- PHÂN TÍCH HÀNH VI (AI) ---", "analysis_header")
-                self.log_details(packet_data['behavior_analysis'], "danger")
+                lines.append(("\n--- PHÂN TÍCH HÀNH VI (AI) ---", "analysis_header"))
+                lines.append((packet_data['behavior_analysis'], "danger"))
             if packet_data['prediction'] == -1:
-                self.log_details("\n--- PHÂN TÍCH THỐNG KÊ (AI) ---", "analysis_header")
+                lines.append(("\n--- PHÂN TÍCH THỐNG KÊ (AI) ---", "analysis_header"))
                 explanation = self.ai_detector.explain_anomaly(packet_data['features'])
-                self.log_details(f"LÝ DO SUY ĐOÁN: {explanation}", tag) 
+                lines.append((f"LÝ DO SUY ĐOÁN: {explanation}", tag))
             elif tag == 'normal':
-                self.log_details("\n--- PHÂN TÍCH THỐNG KÊ (AI) ---", "analysis_header")
-                self.log_details("AI không phát hiện bất thường về mặt thống kê.", "normal")
+                lines.append(("\n--- PHÂN TÍCH THỐNG KÊ (AI) ---", "analysis_header"))
+                lines.append(("AI không phát hiện bất thường về mặt thống kê.", "normal"))
+            self.show_details(lines)
 
 if __name__ == "__main__":
+    # (MỚI) Cần cho tiến trình phân tích con khi đóng gói .exe (PyInstaller, Windows)
+    multiprocessing.freeze_support()
     is_admin = False
     try:
         if sys.platform == 'win32':
@@ -723,10 +1163,6 @@ if __name__ == "__main__":
     except Exception as e: print(f"Không thể kiểm tra quyền admin: {e}")
 
     root = tk.Tk()
-    if not is_admin:
-        root.title("Lỗi Quyền Truy Cập"); root.geometry("500x100")
-        error_label = ttk.Label(root, text="LỖI: Vui lòng chạy với quyền Quản trị viên (Admin) hoặc sudo.", foreground="red", padding="20")
-        error_label.pack()
-    else:
-        app = NetworkScannerApp(root)
+    # (CẬP NHẬT) Không có quyền Admin vẫn mở được chương trình ở chế độ phân tích file pcap
+    app = NetworkScannerApp(root, is_admin=bool(is_admin))
     root.mainloop()
\ No newline at end of file
@@ -3,13 +3,32 @@
 
 import psutil
 # (CẬP NHẬT) Import thêm srp (send/receive packet), Ether, ARP để quét mạng
-from scapy.all import sniff, conf, srp, Ether, ARP
+from scapy.all import AsyncSniffer, conf, srp, Ether, ARP, RawPcapReader, MTU
 import sys
+import time
+import socket
+import struct
+import ctypes
+import ipaddress
+import threading
+
+from packet_view import RawFrame
+
+# Hằng số Linux cho việc gắn bộ lọc BPF vào socket
+SO_ATTACH_FILTER = 26
+DLT_EN10MB = 1
+# Hằng số Linux để đọc bộ đếm gói tin bị kernel bỏ (struct tpacket_stats)
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
 
 class NetworkManager:
     def __init__(self):
         # Cấu hình Scapy để bật chế độ 'Promiscuous' (Nghe lén toàn bộ)
         conf.sniff_promisc = True
+        # (MỚI) Socket đang bắt gói và bộ đếm của kernel (gói nhận / gói bị bỏ), theo từng giao diện
+        self._capture_sockets = {}
+        self._kernel_stats = {}
+        self._stats_lock = threading.Lock()
 
     def list_interfaces(self):
         """
@@ -36,29 +55,258 @@ class NetworkManager:
             print(f"[LỖI] Không thể liệt kê giao diện: {e}")
         return interfaces
 
-    def start_sniffing(self, iface_name, packet_callback, stop_event):
+    def combine_bpf_filters(self, *exprs):
+        """(MỚI) Ghép các biểu thức BPF bằng 'and' (bỏ qua biểu thức rỗng). Trả về None nếu không còn gì."""
+        exprs = [e.strip() for e in exprs if e and e.strip()]
+        if not exprs:
+            return None
+        if len(exprs) == 1:
+            return exprs[0]
+        return " and ".join(f"({e})" for e in exprs)
+
+    def build_bpf_filter(self, target_ips):
+        """
+        (MỚI) Biên dịch danh sách IP mục tiêu thành biểu thức BPF cho kernel.
+        Khớp cả gói IP (src/dst) và gói ARP (psrc/pdst). Trả về None nếu không có mục tiêu.
+        """
+        hosts = []
+        for ip in sorted(target_ips or []):
+            try:
+                hosts.append(f"host {ipaddress.IPv4Address(ip)}")
+            except ValueError:
+                print(f"[MẠNG] Bỏ qua IP mục tiêu không hợp lệ: {ip}")
+        if not hosts:
+            return None
+        host_expr = " or ".join(hosts)
+        return f"(ip and ({host_expr})) or (arp and ({host_expr}))"
+
+    def _compile_bpf(self, filter_expr, snaplen, linktype=DLT_EN10MB):
+        """
+        (MỚI) Biên dịch biểu thức BPF với snaplen tùy chọn.
+        Mọi lệnh 'ret' trong chương trình BPF sẽ trả về snaplen, nên kernel chỉ sao chép phần tiêu đề.
+        """
+        from scapy.libs.winpcapy import pcap_open_dead, pcap_compile, pcap_close
+        from scapy.libs.structures import bpf_program
+
+        bpf = bpf_program()
+        pcap = pcap_open_dead(linktype, snaplen)
+        try:
+            if pcap_compile(pcap, ctypes.byref(bpf), ctypes.create_string_buffer(filter_expr.encode("utf8")), 1, -1) == -1:
+                raise ValueError(f"Biểu thức BPF không hợp lệ: {filter_expr!r}")
+        finally:
+            pcap_close(pcap)
+        return bpf
+
+    def _attach_snaplen_filter(self, sock, filter_expr, snaplen):
+        """(MỚI) Gắn chương trình BPF có snaplen vào socket đã mở (Linux hoặc libpcap/Npcap)."""
+        from scapy.libs.winpcapy import pcap_freecode
+
+        pcap_fd = getattr(sock, "pcap_fd", None)
+        linktype = pcap_fd.datalink() if pcap_fd is not None else DLT_EN10MB
+        bpf = self._compile_bpf(filter_expr, snaplen, linktype)
+        try:
+            if pcap_fd is not None:
+                # Npcap / libpcap: driver dùng giá trị trả về của bộ lọc làm độ dài bắt gói
+                from scapy.libs.winpcapy import pcap_setfilter
+                if pcap_setfilter(pcap_fd.pcap, ctypes.byref(bpf)) < 0:
+                    raise OSError("pcap_setfilter thất bại")
+            else:
+                # Linux AF_PACKET: kernel cắt gói tin theo giá trị trả về của socket filter
+                from scapy.libs.structures import sock_fprog
+                fprog = sock_fprog(bpf.bf_len, bpf.bf_insns)
+                sock.ins.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+        finally:
+            pcap_freecode(ctypes.byref(bpf))
+
+    def open_capture_socket(self, iface_name, bpf_filter=None, snaplen=0):
+        """
+        (MỚI) Mở socket bắt gói với bộ lọc BPF trong kernel.
+        snaplen > 0: chỉ bắt phần tiêu đề (N byte đầu) của mỗi gói tin.
+        Nếu không biên dịch được bộ lọc (thiếu libpcap), quay về bắt toàn bộ và lọc trong Python.
+        """
+        if snaplen:
+            sock = conf.L2listen(iface=iface_name)
+            try:
+                self._attach_snaplen_filter(sock, bpf_filter or "", snaplen)
+                print(f"[MẠNG] Bộ lọc kernel: {bpf_filter or '(tất cả)'} | snaplen={snaplen}")
+            except Exception as e:
+                print(f"[MẠNG] Không thể gắn bộ lọc snaplen ({e}). Bắt toàn bộ gói tin.")
+                if bpf_filter:
+                    try:
+                        sock.close()
+                    except Exception:
+                        pass
+                    return self.open_capture_socket(iface_name, bpf_filter, snaplen=0)
+            return sock
+
+        if bpf_filter:
+            try:
+                sock = conf.L2listen(iface=iface_name, filter=bpf_filter)
+                print(f"[MẠNG] Bộ lọc kernel: {bpf_filter}")
+                return sock
+            except PermissionError:
+                raise
+            except Exception as e:
+                print(f"[MẠNG] Không thể gắn bộ lọc BPF ({e}). Sẽ lọc mục tiêu trong Python.")
+        return conf.L2listen(iface=iface_name)
+
+    def _poll_kernel_stats(self, iface_name, sock):
+        """Đọc bộ đếm của kernel/driver cho socket đang bắt gói (gọi khi đang giữ _stats_lock)."""
+        stats = self._kernel_stats.setdefault(iface_name, {'received': 0, 'dropped': 0})
+        try:
+            pcap_fd = getattr(sock, "pcap_fd", None)
+            if pcap_fd is not None:
+                # libpcap / Npcap: bộ đếm cộng dồn từ lúc mở
+                from scapy.libs.winpcapy import pcap_stats, pcap_stat
+                stat = pcap_stat()
+                if pcap_stats(pcap_fd.pcap, ctypes.byref(stat)) == 0:
+                    stats['received'] = stat.ps_recv
+                    stats['dropped'] = stat.ps_drop + stat.ps_ifdrop
+            elif hasattr(sock, "ins"):
+                # Linux AF_PACKET: bộ đếm tự reset sau mỗi lần đọc, nên cộng dồn lại
+                packets, drops = struct.unpack("II", sock.ins.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+                stats['received'] += packets
+                stats['dropped'] += drops
+        except Exception:
+            pass # Nền tảng không hỗ trợ: giữ nguyên bộ đếm
+
+    def reset_kernel_stats(self):
+        """Xóa bộ đếm kernel khi bắt đầu phiên quét mới."""
+        with self._stats_lock:
+            self._kernel_stats = {}
+
+    def get_kernel_stats(self, iface_name=None):
+        """
+        (MỚI) Trả về dict {'received', 'dropped'}: số gói kernel đã nhận / đã bỏ (bộ đệm kernel đầy)
+        trong phiên bắt gói hiện tại (hoặc phiên gần nhất). iface_name=None: tổng mọi giao diện.
+        Có thể gọi từ bất kỳ luồng nào.
+        """
+        with self._stats_lock:
+            for name, sock in self._capture_sockets.items():
+                self._poll_kernel_stats(name, sock)
+            if iface_name is not None:
+                return dict(self._kernel_stats.get(iface_name, {'received': 0, 'dropped': 0}))
+            return {
+                'received': sum(s['received'] for s in self._kernel_stats.values()),
+                'dropped': sum(s['dropped'] for s in self._kernel_stats.values()),
+            }
+
+    @staticmethod
+    def skip_dissection(sock):
+        """
+        (MỚI) Socket trả về RawFrame (byte gốc + thời điểm bắt gói) thay vì dựng gói tin scapy cho từng khung.
+        Luồng bắt gói không tốn thời gian giải mã; PacketView giải mã tiêu đề một lần ở luồng phân tích.
+        """
+        recv_raw = sock.recv_raw
+        def recv(x=MTU, **kwargs):
+            cls, val, ts = recv_raw(x)
+            if not val or not cls:
+                return None
+            return RawFrame(val, float(ts) if ts else time.time(), cls.__name__)
+        sock.recv = recv
+        return sock
+
+    @staticmethod
+    def read_frames(reader):
+        """(MỚI) Đọc file pcap/pcapng (RawPcapReader) thành RawFrame, không giải mã bằng scapy."""
+        layers = conf.l2types.num2layer
+        for data, meta in reader:
+            if hasattr(meta, 'tsresol'):
+                # pcapng: kiểu tầng liên kết và độ phân giải thời gian theo từng giao diện
+                linktype = meta.linktype
+                ts = ((meta.tshigh << 32) + meta.tslow) / meta.tsresol if meta.tshigh is not None else 0.0
+            else:
+                linktype = reader.linktype
+                ts = meta.sec + meta.usec * (1e-9 if getattr(reader, 'nano', False) else 1e-6)
+            cls = layers.get(linktype)
+            yield RawFrame(data, ts, cls.__name__ if cls else "Raw")
+
+    def start_sniffing(self, iface_name, packet_callback, stop_event, bpf_filter=None, snaplen=0):
         """
         Bắt đầu quét (sniff) trên một giao diện cụ thể.
         Dừng lại khi stop_event (một đối tượng threading.Event) được set.
+        (MỚI) bpf_filter: biểu thức lọc chạy trong kernel. snaplen: chỉ bắt phần tiêu đề.
+        (MỚI) Có thể gọi đồng thời trên nhiều giao diện (mỗi giao diện một luồng).
         """
         print(f"\n[MẠNG] Gateway Monitor đang chạy trên: {iface_name}...")
+        sock = None
+        with self._stats_lock:
+            self._kernel_stats[iface_name] = {'received': 0, 'dropped': 0}
         try:
+            sock = self.skip_dissection(self.open_capture_socket(iface_name, bpf_filter, snaplen))
+            with self._stats_lock:
+                self._capture_sockets[iface_name] = sock
             # store=False: Không lưu gói tin vào bộ nhớ (tiết kiệm RAM)
             # prn=packet_callback: Gọi hàm này cho mỗi gói tin
-            # stop_filter: Kiểm tra sự kiện này sau mỗi gói tin
-            sniff(
-                iface=iface_name,
-                prn=packet_callback,
-                store=False,
-                stop_filter=lambda x: stop_event.is_set()
-            )
+            sniffer = AsyncSniffer(opened_socket=sock, prn=packet_callback, store=False)
+            sniffer.start()
+            # (CẬP NHẬT) Chờ yêu cầu dừng; stop() đánh thức cả giao diện đang im lặng
+            # (stop_filter cũ chỉ được kiểm tra khi có gói tin kế tiếp)
+            while not stop_event.wait(0.5):
+                if not sniffer.thread.is_alive():
+                    break
+            if sniffer.thread.is_alive():
+                sniffer.stop()
+            else:
+                sniffer.join() # Báo lại lỗi (nếu có) của luồng bắt gói
         except PermissionError:
             print("\n[LỖI] Không có quyền. Hãy chạy với Admin/Sudo!")
             raise PermissionError("Không có quyền quét. Vui lòng chạy với quyền Admin/sudo.")
         except Exception as e:
             print(f"\n[LỖI] Quá trình quét dừng lại: {e}")
+        finally:
+            if sock is not None:
+                # Đọc bộ đếm lần cuối trước khi đóng socket
+                with self._stats_lock:
+                    self._poll_kernel_stats(iface_name, sock)
+                    self._capture_sockets.pop(iface_name, None)
+                try:
+                    sock.close()
+                except Exception:
+                    pass
         
-        print("[MẠNG] Đã dừng lắng nghe.")
+        print(f"[MẠNG] Đã dừng lắng nghe: {iface_name}.")
+
+    def replay_pcap(self, file_path, packet_callback, stop_event, speed=0):
+        """
+        (MỚI) Phát lại file pcap/pcapng qua cùng đường xử lý với quét trực tiếp (không cần quyền Admin).
+        speed <= 0: nhanh nhất có thể. speed > 0: hệ số tốc độ so với thời gian thật (1 = đúng nhịp gốc).
+        Trả về dict thống kê của phần đọc file: {'packets', 'seconds', 'pps', 'started'}; gói tin có thể vẫn còn
+        trong bộ đệm vòng chờ phân tích, tốc độ phân tích tính bằng finish_replay() sau khi đã xả hết.
+        """
+        print(f"\n[MẠNG] Phát lại file: {file_path} (tốc độ: {'tối đa' if speed <= 0 else f'x{speed}'})...")
+        count = 0
+        start = time.perf_counter()
+        first_ts = None
+        # (CẬP NHẬT) Đọc byte thô: không dựng gói tin scapy cho từng khung
+        with RawPcapReader(file_path) as reader:
+            for packet in self.read_frames(reader):
+                if stop_event.is_set():
+                    break
+                if speed > 0:
+                    ts = float(packet.time)
+                    if first_ts is None:
+                        first_ts = ts
+                    # Chờ cho đến thời điểm gói tin này xuất hiện (đã chia theo hệ số tốc độ)
+                    delay = (ts - first_ts) / speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        stop_event.wait(delay)
+                packet_callback(packet)
+                count += 1
+        elapsed = time.perf_counter() - start
+        pps = count / elapsed if elapsed > 0 else 0.0
+        print(f"[MẠNG] Đã đọc xong file: {count} gói tin trong {elapsed:.2f} giây ({pps:.0f} gói/giây).")
+        return {'packets': count, 'seconds': elapsed, 'pps': pps, 'started': start}
+
+    def finish_replay(self, stats):
+        """
+        (MỚI) Thống kê phát lại tính tới lúc phân tích xong (gọi sau khi luồng phân tích / tiến trình con đã xử lý
+        hết bộ đệm vòng). stats: kết quả của replay_pcap. Trả về {'packets', 'seconds', 'pps'}.
+        """
+        elapsed = time.perf_counter() - stats['started']
+        pps = stats['packets'] / elapsed if elapsed > 0 else 0.0
+        print(f"[MẠNG] Phát lại hoàn tất: {stats['packets']} gói tin được phân tích trong {elapsed:.2f} giây ({pps:.0f} gói/giây).")
+        return {'packets': stats['packets'], 'seconds': elapsed, 'pps': pps}
 
     def scan_network(self, ip_range, iface_name):
         """
@@ -0,0 +1,410 @@
+# file: packet_query.py
+# -*- coding: utf-8 -*-
+
+import datetime
+import re
+import socket
+import struct
+
+import numpy as np
+
+from packet_store import VERDICTS, PROTO_NAMES, VERDICT_CODES, PROTO_CODES
+
+
+# (MỚI) Ngôn ngữ truy vấn nhỏ cho danh sách gói tin, ví dụ:
+#     ip==10.0.0.5 && dport in 22,3389 && tag==danger && time>12:00:00
+# Trường: ip (nguồn hoặc đích), src, dst, port (nguồn hoặc đích), sport, dport, proto, tag, time, len, iface.
+# Toán tử: == != > >= < <= in (danh sách cách nhau bởi dấu phẩy); ghép bằng && / || (hoặc and / or) và dấu ngoặc.
+# IP nhận dạng CIDR (10.0.0.0/24); tag nhận danger / anomaly / normal / alert (= danger + anomaly);
+# time nhận HH:MM[:SS[.ffffff]] (theo ngày của gói đầu tiên trong phiên) hoặc "YYYY-mm-dd HH:MM:SS".
+# Chuỗi không phải truy vấn (hoặc một từ / chuỗi trong ngoặc kép không kèm trường) là tìm kiếm tự do như trước.
+
+# Trường truy vấn -> cột (trường có hai cột: khớp khi một trong hai cột khớp)
+QUERY_FIELDS = {
+    'ip': ('src', 'dst'), 'src': ('src',), 'dst': ('dst',),
+    'port': ('sport', 'dport'), 'sport': ('sport',), 'dport': ('dport',),
+    'proto': ('proto',), 'tag': ('verdict',), 'time': ('ts',), 'len': ('length',), 'iface': ('iface_ref',),
+}
+# Cột được lập chỉ mục sẵn trên luồng nền sau khi dừng quét (IP, cổng, thời gian: điều kiện chọn lọc thường gặp)
+INDEXED_COLUMNS = ('src', 'dst', 'sport', 'dport', 'ts')
+COMPARE_OPS = ('==', '!=', '>', '>=', '<', '<=', 'in')
+UINT32_MAX = 0xFFFFFFFF
+
+_TOKEN = re.compile(r"""\s*(?:(&&|\|\||==|!=|>=|<=|[()<>,])|"([^"]*)"|'([^']*)'|([^\s&|()=!<>,"']+))""")
+_LOOKS_LIKE_QUERY = re.compile(r"^\s*\(*\s*(%s)\s*(==|!=|>=|<=|>|<|in\b)" % "|".join(QUERY_FIELDS), re.IGNORECASE)
+
+
+class QueryError(ValueError):
+    """Lỗi cú pháp hoặc giá trị không hợp lệ trong truy vấn."""
+
+
+def _parse_ipv4(text):
+    try:
+        return struct.unpack("!I", socket.inet_aton(text))[0]
+    except OSError:
+        raise QueryError(f"Địa chỉ IPv4 không hợp lệ: {text}")
+
+
+def _ip_interval(text):
+    """'10.0.0.5' -> (a, a); '10.0.0.0/24' -> (đầu dải, cuối dải)."""
+    if '/' in text:
+        addr, _, bits = text.partition('/')
+        if not bits.isdigit() or int(bits) > 32:
+            raise QueryError(f"Độ dài tiền tố không hợp lệ: {text}")
+        mask = (UINT32_MAX << (32 - int(bits))) & UINT32_MAX
+        low = _parse_ipv4(addr) & mask
+        return low, low | (~mask & UINT32_MAX)
+    value = _parse_ipv4(text)
+    return value, value
+
+
+def _parse_int(text, field, limit):
+    if not text.isdigit() or int(text) > limit:
+        raise QueryError(f"Giá trị không hợp lệ cho {field}: {text}")
+    return int(text)
+
+
+def _parse_time(text, reference):
+    """
+    Thời điểm -> (epoch bắt đầu, độ dài của đơn vị nhỏ nhất được ghi) để 'time==12:00:05' khớp cả giây đó.
+    HH:MM[:SS[.f]] lấy theo ngày (giờ địa phương) của thời điểm tham chiếu (gói đầu tiên trong phiên).
+    """
+    text = text.strip()
+    try:
+        if re.fullmatch(r"\d{1,2}:\d{2}(:\d{2}(\.\d{1,6})?)?", text):
+            parts = text.split(':')
+            base = datetime.datetime.fromtimestamp(reference) if reference else datetime.datetime.now()
+            second = float(parts[2]) if len(parts) > 2 else 0.0
+            moment = base.replace(hour=int(parts[0]), minute=int(parts[1]), second=int(second), microsecond=int(round((second % 1) * 1e6)))
+            step = 60.0 if len(parts) == 2 else (1.0 if '.' not in text else 10.0 ** -len(text.rpartition('.')[2]))
+            return moment.timestamp(), step
+        moment = datetime.datetime.fromisoformat(text)
+        return moment.timestamp(), (1.0 if moment.microsecond == 0 else 1e-6)
+    except ValueError:
+        raise QueryError(f"Thời gian không hợp lệ: {text} (dùng HH:MM:SS hoặc \"YYYY-mm-dd HH:MM:SS\")")
+
+
+def _union(parts):
+    """Hợp các mảng dòng đã sắp xếp (không dùng np.unique: chậm với mảng lớn)."""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return np.empty(0, dtype=np.int64)
+    if len(parts) == 1:
+        return parts[0]
+    rows = np.sort(np.concatenate(parts))
+    return rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+
+
+class Condition:
+    """Một phép so sánh trường - giá trị, chuẩn hóa thành các đoạn đóng [lo, hi] trên cột."""
+    def __init__(self, field, op, values):
+        self.field = field
+        self.op = op
+        self.values = values
+        self.columns = QUERY_FIELDS[field]
+        self.negate = op == '!='
+        if op in ('>', '>=', '<', '<=') and field in ('ip', 'src', 'dst', 'proto', 'tag', 'iface'):
+            raise QueryError(f"Trường {field} chỉ hỗ trợ ==, != và in")
+        if op != 'in' and len(values) != 1:
+            raise QueryError(f"Toán tử {op} chỉ nhận một giá trị")
+        # Kiểm tra giá trị ngay khi phân tích (lỗi hiện ra trước khi truy vấn)
+        if field != 'time' and field != 'iface':
+            self._intervals = self._static_intervals()
+
+    def _static_intervals(self):
+        field = self.field
+        if field in ('ip', 'src', 'dst'):
+            return [_ip_interval(v) for v in self.values]
+        if field == 'proto':
+            codes = []
+            for v in self.values:
+                if v.upper() not in PROTO_CODES:
+                    raise QueryError(f"Giao thức không hợp lệ: {v} (hợp lệ: {', '.join(PROTO_NAMES)})")
+                codes.append(PROTO_CODES[v.upper()])
+            return [(c, c) for c in codes]
+        if field == 'tag':
+            codes = []
+            for v in self.values:
+                v = v.lower()
+                if v == 'alert':
+                    codes += [VERDICT_CODES['danger'], VERDICT_CODES['anomaly']]
+                elif v in VERDICT_CODES:
+                    codes.append(VERDICT_CODES[v])
+                else:
+                    raise QueryError(f"Phán quyết không hợp lệ: {v} (hợp lệ: {', '.join(VERDICTS)}, alert)")
+            return [(c, c) for c in codes]
+        if field == 'len':
+            return self._ranges([_parse_int(v, field, UINT32_MAX) for v in self.values], 1, 0, UINT32_MAX)
+        # Cổng 0 = gói không có cổng TCP/UDP (ICMP, ARP...): không bao giờ khớp điều kiện cổng
+        return self._ranges([_parse_int(v, field, 0xFFFF) for v in self.values], 1, 1, 0xFFFF)
+
+    def _ranges(self, points, step, low, high, ends=None):
+        """
+        Đổi toán tử so sánh thành đoạn đóng; step là đơn vị nhỏ nhất của cột (1 cho số nguyên).
+        ends: cận trên của từng điểm khi so sánh bằng (mặc định chính điểm đó).
+        """
+        op = self.op
+        if op in ('==', '!=', 'in'):
+            ranges = list(zip(points, ends or points))
+        else:
+            p = points[0]
+            if op == '>':
+                ranges = [(p + step if step else np.nextafter(p, np.inf), high)]
+            elif op == '>=':
+                ranges = [(p, high)]
+            elif op == '<':
+                ranges = [(low, p - step if step else np.nextafter(p, -np.inf))]
+            else:
+                ranges = [(low, p)]
+        return [(max(lo, low), hi) for lo, hi in ranges if max(lo, low) <= hi]
+
+    def intervals(self, source):
+        """Các đoạn [lo, hi] trên cột (time cần thời điểm tham chiếu của phiên, iface cần bảng chuỗi của kho)."""
+        if self.field == 'time':
+            parsed = [_parse_time(v, source.reference_time()) for v in self.values]
+            points = [start for start, _ in parsed]
+            # Nửa mở [start, start + step): số thực lớn nhất nhỏ hơn start + step (ở độ lớn epoch, start + step - ULP(step)
+            # bị làm tròn về start + step, nên phải lùi một ULP của chính giá trị epoch)
+            ends = [np.nextafter(start + step, -np.inf) for start, step in parsed]
+            return self._ranges(points, 0, -np.inf, np.inf, ends=ends)
+        if self.field == 'iface':
+            refs = source.string_refs([v.lower() for v in self.values])
+            return [(r, r) for r in refs]
+        return self._intervals
+
+    # --- Đánh giá trên kho dạng cột (PacketStore) ---
+    def estimate(self, source):
+        count = 0
+        for column in self.columns:
+            index = source.column_index(column)
+            count += sum(index.count(lo, hi) for lo, hi in self.intervals(source)) + (len(source) - index.size)
+        return len(source) - count if self.negate else count
+
+    def rows(self, source):
+        parts = []
+        intervals = self.intervals(source)
+        for column in self.columns:
+            index = source.column_index(column)
+            parts += [index.rows(lo, hi) for lo, hi in intervals]
+            # Các dòng thêm sau lần dựng chỉ mục gần nhất: kiểm tra trực tiếp
+            tail = source.column(column)[index.size:]
+            parts.append(index.size + np.flatnonzero(self._match(tail, intervals)))
+        rows = _union(parts)
+        if self.negate:
+            return np.setdiff1d(np.arange(len(source)), rows, assume_unique=True)
+        return rows
+
+    @staticmethod
+    def _match(values, intervals):
+        mask = np.zeros(len(values), dtype=bool)
+        for lo, hi in intervals:
+            mask |= (values >= lo) & (values <= hi)
+        return mask
+
+    def test(self, source, rows):
+        intervals = self.intervals(source)
+        mask = np.zeros(len(rows), dtype=bool)
+        for column in self.columns:
+            mask |= self._match(source.column(column)[rows], intervals)
+        return ~mask if self.negate else mask
+
+    # --- Dịch sang SQL (SessionDatabase) ---
+    def sql(self, source):
+        clauses, params = [], []
+        # Kho phiên SQLite: cột iface là chuỗi, các cột còn lại cùng tên và đều có chỉ mục B-tree (trừ proto / length)
+        if self.field == 'iface':
+            values = [v.lower() for v in self.values]
+            clauses.append(f"lower(iface) IN ({', '.join('?' * len(values))})")
+            params += values
+        else:
+            for column in self.columns:
+                for lo, hi in self.intervals(source):
+                    clauses.append(f"{column} BETWEEN ? AND ?")
+                    params += [float(lo) if column == 'ts' else int(lo), float(hi) if column == 'ts' else int(hi)]
+        sql = f"({' OR '.join(clauses)})" if clauses else "0"
+        return (f"NOT {sql}", params) if self.negate else (sql, params)
+
+
+class Range(Condition):
+    """Các điều kiện >, >=, <, <= trên cùng một trường gộp thành một đoạn (time>=A && time<B chỉ tra chỉ mục một lần)."""
+    def __init__(self, conditions):
+        first = conditions[0]
+        self.field, self.op, self.values, self.columns, self.negate = first.field, 'range', [], first.columns, False
+        self.conditions = conditions
+
+    def intervals(self, source):
+        bounds = [condition.intervals(source) for condition in self.conditions]
+        if not all(bounds):
+            return []
+        lo, hi = max(b[0][0] for b in bounds), min(b[0][1] for b in bounds)
+        return [(lo, hi)] if lo <= hi else []
+
+
+class FreeText:
+    """Tìm kiếm tự do (như trước): IP chứa chuỗi, cổng, tên giao thức, giao diện / lý do phát hiện."""
+    def __init__(self, text):
+        self.text = text
+
+    def estimate(self, source):
+        return len(source)
+
+    def rows(self, source):
+        return np.flatnonzero(source.search_mask(self.text))
+
+    def test(self, source, rows):
+        return source.search_mask(self.text)[rows]
+
+    def sql(self, source):
+        return source.search_clause(self.text)
+
+
+class And:
+    def __init__(self, terms):
+        ranges = {}
+        for term in terms:
+            if type(term) is Condition and term.op in ('>', '>=', '<', '<='):
+                ranges.setdefault(term.field, []).append(term)
+        merged = {field: group for field, group in ranges.items() if len(group) > 1}
+        self.terms = [term for term in terms if not any(term is c for group in merged.values() for c in group)]
+        self.terms += [Range(group) for group in merged.values()]
+
+    def estimate(self, source):
+        return min(term.estimate(source) for term in self.terms)
+
+    def rows(self, source):
+        # Bắt đầu từ điều kiện chọn lọc nhất (tra chỉ mục), các điều kiện còn lại chỉ kiểm tra trên các dòng ứng viên
+        terms = sorted(self.terms, key=lambda term: term.estimate(source))
+        rows = terms[0].rows(source)
+        for term in terms[1:]:
+            if not len(rows):
+                break
+            rows = rows[term.test(source, rows)]
+        return rows
+
+    def test(self, source, rows):
+        mask = np.ones(len(rows), dtype=bool)
+        for term in self.terms:
+            mask &= term.test(source, rows)
+        return mask
+
+    def sql(self, source):
+        parts = [term.sql(source) for term in self.terms]
+        return "(" + " AND ".join(sql for sql, _ in parts) + ")", [p for _, params in parts for p in params]
+
+
+class Or(And):
+    def __init__(self, terms):
+        self.terms = terms
+
+    def estimate(self, source):
+        return sum(term.estimate(source) for term in self.terms)
+
+    def rows(self, source):
+        return _union([term.rows(source) for term in self.terms])
+
+    def test(self, source, rows):
+        mask = np.zeros(len(rows), dtype=bool)
+        for term in self.terms:
+            mask |= term.test(source, rows)
+        return mask
+
+    def sql(self, source):
+        parts = [term.sql(source) for term in self.terms]
+        return "(" + " OR ".join(sql for sql, _ in parts) + ")", [p for _, params in parts for p in params]
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if not match or match.end() == pos:
+                raise QueryError(f"Ký tự không hợp lệ tại vị trí {pos + 1}: {text[pos:pos + 10]}")
+            symbol, dquoted, squoted, word = match.groups()
+            if symbol is not None:
+                self.tokens.append(('op', symbol))
+            elif word is not None:
+                lowered = word.lower()
+                self.tokens.append(('op', {'and': '&&', 'or': '||'}[lowered]) if lowered in ('and', 'or') else ('word', word))
+            else:
+                self.tokens.append(('str', dquoted if dquoted is not None else squoted))
+            pos = match.end()
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] is not None:
+            raise QueryError(f"Thừa ký hiệu: {self.peek()[1]}")
+        return node
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.peek() == ('op', '||'):
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Or(terms)
+
+    def parse_and(self):
+        terms = [self.parse_term()]
+        while self.peek() == ('op', '&&'):
+            self.take()
+            terms.append(self.parse_term())
+        return terms[0] if len(terms) == 1 else And(terms)
+
+    def parse_term(self):
+        kind, text = self.peek()
+        if (kind, text) == ('op', '('):
+            self.take()
+            node = self.parse_or()
+            if self.take() != ('op', ')'):
+                raise QueryError("Thiếu dấu ')'")
+            return node
+        if kind == 'word' and text.lower() in QUERY_FIELDS:
+            op_kind, op = self.peek(1)
+            if (op_kind == 'op' and op in COMPARE_OPS) or (op_kind == 'word' and op.lower() == 'in'):
+                self.take(); self.take()
+                return Condition(text.lower(), op.lower(), self.parse_values())
+        if kind in ('word', 'str'):
+            # Tìm kiếm tự do: các từ liên tiếp (hoặc chuỗi trong ngoặc kép) tới toán tử ghép tiếp theo
+            words = []
+            while self.peek()[0] in ('word', 'str'):
+                words.append(self.take()[1])
+            return FreeText(" ".join(words).lower())
+        raise QueryError(f"Thiếu điều kiện trước: {text}" if text else "Truy vấn chưa hoàn chỉnh")
+
+    def parse_values(self):
+        values = []
+        while True:
+            kind, text = self.take()
+            if kind not in ('word', 'str'):
+                raise QueryError("Thiếu giá trị sau toán tử")
+            values.append(text)
+            if self.peek() != ('op', ','):
+                return values
+            self.take()
+
+
+def parse_query(text):
+    """
+    Phân tích chuỗi lọc. Chuỗi không giống truy vấn (không bắt đầu bằng 'trường toán_tử' và không có && / ||)
+    được giữ nguyên là tìm kiếm tự do. Lỗi cú pháp: QueryError.
+    """
+    text = text.strip()
+    if not _LOOKS_LIKE_QUERY.match(text) and '&&' not in text and '||' not in text:
+        # Chuỗi trong ngoặc kép / đơn: bỏ một cặp ngoặc như khi đứng sau && / ||
+        if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+            text = text[1:-1]
+        return FreeText(text.lower())
+    return _Parser(text).parse()
+
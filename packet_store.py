@@ -0,0 +1,688 @@
+# file: packet_store.py
+# -*- coding: utf-8 -*-
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from detection_pipeline import format_event_time
+from packet_view import PacketView, int_to_ipv4, ipv4_to_int
+from sketches import DISTINCT_MAX_KEYS, DISTINCT_WINDOW_SECONDS, HEAVY_HITTER_CAPACITY, DistinctCounts, HeavyHitters
+from time_series import TrafficSeries
+
+# Mã hóa các giá trị phân loại thành số nguyên nhỏ
+VERDICTS = ('normal', 'anomaly', 'danger')
+PROTO_NAMES = ('TCP', 'UDP', 'ICMP', 'ARP', 'Other')
+VERDICT_CODES = {name: i for i, name in enumerate(VERDICTS)}
+PROTO_CODES = {name: i for i, name in enumerate(PROTO_NAMES)}
+NO_REF = -1
+# Số chuỗi tóm tắt giữ trong bộ nhớ đệm LRU (các dòng đang được hiển thị / xem gần đây)
+SUMMARY_CACHE_SIZE = 4096
+# (MỚI) Chỉ mục cột được dựng lại khi số dòng thêm sau lần dựng trước vượt mức này (hoặc 1/4 số dòng đã lập chỉ mục);
+# các dòng mới hơn được kiểm tra trực tiếp khi truy vấn
+INDEX_TAIL_ROWS = 65536
+
+# (MỚI) Định dạng phiên đã lưu: <tên>.pcap + file phụ <tên>.pcap.npy (các cột) + <tên>.pcap.json (bảng chuỗi)
+SESSION_FORMAT = "TANetAI-session"
+SESSION_VERSION = 1
+SIDECAR_SUFFIX = ".npy"
+META_SUFFIX = ".json"
+# Mã kiểu tầng liên kết (DLT) của file pcap theo tên lớp scapy
+LINKTYPE_DLT = {'Ether': 1, 'CookedLinux': 113, 'IP': 228, 'CookedLinuxV2': 276, 'Loopback': 0, 'LoopbackOpenBSD': 108,
+                'IPv46': 101, 'IPv6': 229, 'RadioTap': 127, 'PPI': 192, 'PrismHeader': 119, 'Dot11': 105}
+_PCAP_HEADER = struct.Struct("<IHHiIII")
+_PCAP_RECORD = struct.Struct("<IIII")
+
+# Các cột cố định (NumPy), mỗi gói tin một dòng
+COLUMNS = (
+    ('id', np.uint32),          # Số thứ tự gói tin (hiển thị)
+    ('ts', np.float64),         # Thời điểm bắt gói (epoch, giây, micro giây)
+    ('src', np.uint32),         # IPv4 nguồn (hoặc ARP psrc)
+    ('dst', np.uint32),         # IPv4 đích (hoặc ARP pdst)
+    ('sport', np.uint16),       # Cổng TCP/UDP (kể cả bên trong IPv6)
+    ('dport', np.uint16),
+    ('ip_proto', np.uint8),     # Số giao thức IPv4 (6, 17, 1...)
+    ('proto', np.uint8),        # Mã PROTO_NAMES
+    ('ip_version', np.uint8),   # 4 hoặc 0 (không có tiêu đề IPv4)
+    ('length', np.uint32),
+    ('verdict', np.uint8),      # Mã VERDICTS
+    ('prediction', np.int8),    # 1 / -1 (AI), 0 (đang huấn luyện)
+    ('rule_ref', np.int32),     # Chỉ số chuỗi trong bảng phụ (NO_REF = không có)
+    ('behavior_ref', np.int32),
+    ('iface_ref', np.int32),
+    ('linktype_ref', np.int32),
+    ('raw_off', np.int64),      # Vị trí byte tiêu đề trong vùng nhớ raw
+    ('raw_len', np.uint16),
+)
+
+
+def _port_key(label):
+    # '443/TCP' -> khóa Top cổng (mã giao thức * 65536 + cổng)
+    port, name = label.split('/')
+    return PROTO_CODES[name] * 65536 + int(port)
+
+
+def ip_counter(sketch, limit=None):
+    """(MỚI) Counter {IPv4: số lần} của các khóa nhiều nhất trong bản tóm tắt Top IP."""
+    return Counter({int_to_ipv4(key): n for key, n in sketch.top(limit)})
+
+
+def port_counter(sketch, limit=None):
+    """(MỚI) Counter {'443/TCP': số lần} của các khóa nhiều nhất trong bản tóm tắt Top cổng."""
+    return Counter({f"{key & 0xFFFF}/{PROTO_NAMES[key >> 16]}": n for key, n in sketch.top(limit)})
+
+
+def _load_heavy_hitters(data, capacity, parse):
+    # File phiên cũ lưu Counter đầy đủ {nhãn: số lần}; file mới lưu bản tóm tắt (HeavyHitters.to_dict)
+    if 'keys' in data:
+        return HeavyHitters.from_dict(data, capacity)
+    sketch = HeavyHitters(capacity)
+    sketch.add_counts([parse(label) for label in data], list(data.values()))
+    return sketch
+
+
+def search_terms(text):
+    """
+    Tách chuỗi tìm kiếm thành các điều kiện trên trường có cấu trúc:
+    (chuỗi thường hóa, cổng nếu là số hợp lệ, mã giao thức nếu là tên giao thức).
+    """
+    text = text.strip().lower()
+    port = int(text) if text.isdigit() and int(text) <= 0xFFFF else None
+    return text, port, PROTO_CODES.get(text.upper())
+
+
+def matching_ips(values, text):
+    """Các địa chỉ IPv4 (dạng số) trong values mà dạng chuỗi chứa text (mỗi địa chỉ chỉ định dạng một lần)."""
+    return [int(v) for v in values if v and text in int_to_ipv4(v)]
+
+
+class SummaryCache:
+    """Bộ nhớ đệm LRU có giới hạn cho chuỗi tóm tắt dựng lại từ byte tiêu đề (khóa: dòng hoặc id)."""
+    def __init__(self, size=SUMMARY_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+
+    def get(self, key, view_of):
+        """Tóm tắt của key; nếu chưa có thì dựng từ view_of(key).summary()."""
+        text = self._items.get(key)
+        if text is None:
+            text = view_of(key).summary()
+            self._items[key] = text
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(key)
+        return text
+
+    def values(self):
+        return self._items.values()
+
+
+class SortedIndex:
+    """
+    (MỚI) Chỉ mục của một cột: hoán vị sắp xếp ổn định (argsort) cùng các giá trị đã sắp xếp.
+    Các dòng cùng giá trị nằm liền nhau (tương đương danh sách đảo ngược giá trị -> dòng, như cho IP và cổng);
+    tra một giá trị hoặc một dải (CIDR, khoảng cổng, khoảng thời gian) bằng tìm nhị phân.
+    size: số dòng đầu tiên của cột đã được lập chỉ mục.
+    """
+    def __init__(self, values):
+        self.size = len(values)
+        self.order = np.argsort(values, kind='stable')
+        self.sorted = values[self.order]
+
+    def _bounds(self, lo, hi):
+        # Khóa cùng kiểu với cột: tránh NumPy chuyển kiểu cả mảng đã sắp xếp ở mỗi lần tìm
+        key = self.sorted.dtype.type
+        return int(self.sorted.searchsorted(key(lo), side='left')), int(self.sorted.searchsorted(key(hi), side='right'))
+
+    def count(self, lo, hi):
+        start, end = self._bounds(lo, hi)
+        return max(0, end - start)
+
+    def rows(self, lo, hi):
+        """Các dòng có giá trị trong [lo, hi], theo thứ tự dòng."""
+        start, end = self._bounds(lo, hi)
+        return np.sort(self.order[start:end]) if end > start else np.empty(0, dtype=np.int64)
+
+
+class PacketStore:
+    """
+    (MỚI) Kho gói tin dạng cột, chỉ thêm vào (append-only), thay cho danh sách dict.
+    Trường số nằm trong các mảng NumPy tăng dần dung lượng; byte tiêu đề nằm trong bảng phụ;
+    chuỗi lặp lại (lý do phát hiện, giao diện) được gộp (intern) một lần.
+    Chi tiết các tầng và (CẬP NHẬT) chuỗi tóm tắt được dựng lại từ byte tiêu đề khi cần,
+    tóm tắt của các dòng xem gần đây nằm trong bộ nhớ đệm LRU có giới hạn.
+
+    (MỚI) Cửa sổ lưu giữ cho giám sát liên tục: gói bình thường chỉ được giữ trong window_packets gói
+    và window_seconds giây gần nhất (0 = không giới hạn theo tiêu chí đó); mọi gói danger / anomaly cùng
+    context_packets gói trước và sau nó được giữ mãi. Gói bị loại được cộng dồn vào bộ đếm thống kê
+    trước khi giải phóng, nên các bộ đếm và tổng số gói vẫn tính trên toàn phiên.
+
+    (MỚI) Top IP / cổng của toàn phiên là bản tóm tắt Top-k (sketches.HeavyHitters) tối đa top_capacity mục,
+    nên bộ nhớ không tăng theo số IP nguồn giả mạo / cổng bị quét; sai số của các số đếm xem count_errors().
+    (MỚI) Số IP nguồn / cổng / máy đối tác khác nhau theo từng máy (HyperLogLog, sketches.DistinctCounts) cho toàn phiên
+    và cửa sổ distinct_window giây gần nhất, tối đa distinct_keys máy mỗi bảng.
+    """
+    def __init__(self, capacity=4096, window_packets=0, window_seconds=0, context_packets=0, top_capacity=HEAVY_HITTER_CAPACITY,
+                 distinct_window=DISTINCT_WINDOW_SECONDS, distinct_keys=DISTINCT_MAX_KEYS):
+        self._capacity = max(16, int(capacity))
+        self._cols = {name: np.zeros(self._capacity, dtype=dtype) for name, dtype in COLUMNS}
+        self._size = 0
+        self._next_id = 1
+        self.window_packets = int(window_packets)
+        self.window_seconds = float(window_seconds)
+        self.context_packets = int(context_packets)
+        self.top_capacity = int(top_capacity)
+        # Bộ đếm của các gói đã bị loại khỏi cửa sổ lưu giữ
+        self.evicted_count = 0
+        self._evicted_verdicts = np.zeros(len(VERDICTS), dtype=np.int64)
+        self._evicted_protos = np.zeros(len(PROTO_NAMES), dtype=np.int64)
+        self._evicted_ips = HeavyHitters(self.top_capacity)
+        self._evicted_ports = HeavyHitters(self.top_capacity)
+        # (MỚI) Bộ đếm thống kê cộng dồn của toàn phiên; _counted: số dòng đầu đã được cộng vào
+        # Khóa: sau khi dừng quét, luồng nền (tổng hợp thống kê) và luồng giao diện (xuất PDF, đổi biểu đồ) cùng đếm
+        self._count_lock = threading.Lock()
+        self._counted = 0
+        self._verdict_totals = np.zeros(len(VERDICTS), dtype=np.int64)
+        self._proto_totals = np.zeros(len(PROTO_NAMES), dtype=np.int64)
+        self._ip_totals = HeavyHitters(self.top_capacity)
+        self._port_totals = HeavyHitters(self.top_capacity)
+        # (MỚI) Chuỗi thời gian lưu lượng (gói / byte theo khoảng, giao thức x phán quyết), cộng dồn cùng bộ đếm
+        self._series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)))
+        self._distinct = DistinctCounts(distinct_window, distinct_keys)
+        self._summary_cache = SummaryCache()   # Dòng -> tóm tắt (LRU)
+        self._indexes = {}              # (MỚI) Cột -> SortedIndex, dựng khi truy vấn lọc cần đến
+        self._raw = bytearray()         # Bảng phụ: byte tiêu đề nối liên tiếp
+        self._strings = []              # Bảng phụ: chuỗi đã gộp
+        self._string_refs = {}
+        self.meta = {}                  # Thông tin phiên (khi mở lại từ file)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def _intern(self, text):
+        if not text:
+            return NO_REF
+        ref = self._string_refs.get(text)
+        if ref is None:
+            ref = len(self._strings)
+            self._strings.append(text)
+            self._string_refs[text] = ref
+        return ref
+
+    def string(self, ref):
+        return self._strings[ref] if ref != NO_REF else ""
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, arr in self._cols.items():
+            grown = np.zeros(self._capacity, dtype=arr.dtype)
+            grown[:self._size] = arr[:self._size]
+            self._cols[name] = grown
+
+    @property
+    def retention(self):
+        return bool(self.window_packets or self.window_seconds)
+
+    def append(self, record):
+        """Thêm một bản ghi kết quả của DetectionPipeline. Trả về số thứ tự (id) của gói tin."""
+        if self._size == self._capacity:
+            # Cửa sổ lưu giữ: loại gói bình thường cũ trước; chỉ nới dung lượng khi vẫn còn gần đầy
+            if self.retention:
+                self._evict()
+            if self._size > self._capacity * 3 // 4:
+                self._grow()
+        row = self._size
+        cols = self._cols
+        packet_id = self._next_id
+        self._next_id += 1
+
+        cols['id'][row] = packet_id
+        cols['ts'][row] = record['timestamp']
+        cols['length'][row] = record['features'][0]
+        cols['ip_proto'][row] = record['features'][1]
+        cols['sport'][row] = record['sport']
+        cols['dport'][row] = record['dport']
+        cols['proto'][row] = PROTO_CODES.get(record['proto_name'], PROTO_CODES['Other'])
+        cols['ip_version'][row] = record['ip_version']
+        cols['src'][row] = ipv4_to_int(record['src'])
+        cols['dst'][row] = ipv4_to_int(record['dst'])
+        cols['verdict'][row] = VERDICT_CODES[record['tag']]
+        cols['prediction'][row] = record['prediction'] or 0
+        cols['rule_ref'][row] = self._intern(record['rule_analysis'])
+        cols['behavior_ref'][row] = self._intern(record['behavior_analysis'])
+        cols['iface_ref'][row] = self._intern(record.get('iface'))
+        cols['linktype_ref'][row] = self._intern(record['linktype'])
+        cols['raw_off'][row] = len(self._raw)
+        cols['raw_len'][row] = len(record['raw'])
+        self._raw += record['raw']
+        self._size += 1
+        return packet_id
+
+    def _retained_mask(self):
+        """Dòng được giữ: trong cửa sổ (số gói và thời gian), là cảnh báo, hoặc cách một cảnh báo <= context_packets gói."""
+        n = self._size
+        cols = self._cols
+        keep = np.ones(n, dtype=bool)
+        if self.window_packets:
+            keep[:max(0, n - self.window_packets)] = False
+        if self.window_seconds:
+            keep &= cols['ts'][:n] >= cols['ts'][n - 1] - self.window_seconds
+        alerts = cols['verdict'][:n] != VERDICT_CODES['normal']
+        keep |= alerts
+        alert_ids = cols['id'][:n][alerts].astype(np.int64)
+        if self.context_packets and len(alert_ids):
+            # Khoảng cách theo số thứ tự gói tin tới cảnh báo gần nhất (trước hoặc sau)
+            ids = cols['id'][:n].astype(np.int64)
+            pos = np.searchsorted(alert_ids, ids)
+            after = alert_ids[np.minimum(pos, len(alert_ids) - 1)] - ids
+            before = ids - alert_ids[np.maximum(pos - 1, 0)]
+            near = ((after >= 0) & (after <= self.context_packets)) | ((before >= 0) & (before <= self.context_packets))
+            keep |= near
+        return keep
+
+    def _evict(self):
+        """Cộng dồn các dòng ngoài cửa sổ lưu giữ vào bộ đếm thống kê rồi nén các cột và vùng byte tiêu đề."""
+        keep = self._retained_mask()
+        evicted = np.flatnonzero(~keep)
+        if not len(evicted):
+            return
+        self._sync_counts()
+        cols = self._cols
+        self.evicted_count += len(evicted)
+        self._evicted_verdicts += np.bincount(cols['verdict'][evicted], minlength=len(VERDICTS))
+        self._evicted_protos += np.bincount(cols['proto'][evicted], minlength=len(PROTO_NAMES))
+        self._evicted_ips.update(self._ip_keys(evicted))
+        self._evicted_ports.update(self._port_keys(evicted))
+
+        rows = np.flatnonzero(keep)
+        raw_len = cols['raw_len'][rows].astype(np.int64)
+        raw_off = cols['raw_off'][rows]
+        # Byte tiêu đề của các dòng giữ lại: chép theo từng đoạn dòng liên tiếp (cửa sổ gần nhất + các cụm cảnh báo)
+        raw = bytearray()
+        if len(rows):
+            breaks = np.flatnonzero(np.diff(rows) != 1)
+            starts = np.concatenate(([0], breaks + 1))
+            ends = np.concatenate((breaks, [len(rows) - 1]))
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                raw += self._raw[int(raw_off[s]):int(raw_off[e] + raw_len[e])]
+        for name, arr in cols.items():
+            arr[:len(rows)] = arr[rows]
+        cols['raw_off'][:len(rows)] = np.cumsum(raw_len) - raw_len
+        self._raw = raw
+        self._size = self._counted = len(rows)
+        # Chỉ số dòng đã thay đổi: bỏ bộ nhớ đệm tóm tắt và các chỉ mục theo dòng
+        self._summary_cache = SummaryCache(self._summary_cache.size)
+        self._indexes = {}
+
+    def trim(self):
+        """Áp dụng cửa sổ lưu giữ ngay (ví dụ khi dừng quét) thay vì chờ kho đầy."""
+        if self.retention and self._size:
+            self._evict()
+
+    def column(self, name):
+        """Mảng (chỉ đọc) của một cột cho các dòng đã lưu."""
+        arr = self._cols[name][:self._size]
+        arr.flags.writeable = False
+        return arr
+
+    def column_index(self, name):
+        """
+        (MỚI) Chỉ mục sắp xếp của một cột cho truy vấn lọc. Dựng lần đầu khi cần; các dòng thêm sau được
+        truy vấn kiểm tra trực tiếp cho tới khi đủ nhiều để dựng lại (thêm gói tin không phải cập nhật chỉ mục).
+        """
+        index = self._indexes.get(name)
+        if index is None or self._size - index.size > max(INDEX_TAIL_ROWS, index.size // 4):
+            index = self._indexes[name] = SortedIndex(self.column(name))
+        return index
+
+    def reference_time(self):
+        """Thời điểm của gói đầu tiên còn lưu (ngày tham chiếu cho điều kiện time=HH:MM:SS)."""
+        return float(self._cols['ts'][0]) if self._size else None
+
+    def string_refs(self, values):
+        """Chỉ số các chuỗi đã gộp bằng một trong các giá trị (không phân biệt hoa thường)."""
+        return [ref for ref, text in enumerate(self._strings) if text.lower() in values]
+
+    def row_of(self, packet_id):
+        """
+        Số thứ tự gói tin -> chỉ số dòng (None nếu không có).
+        Cột id luôn tăng dần: O(1) khi id liên tục (tính thẳng độ lệch), nếu không thì tìm nhị phân O(log n).
+        """
+        if not self._size:
+            return None
+        packet_id = int(packet_id)
+        ids = self._cols['id']
+        row = packet_id - int(ids[0])
+        if 0 <= row < self._size and ids[row] == packet_id:
+            return row
+        row = int(np.searchsorted(ids[:self._size], packet_id))
+        return row if row < self._size and ids[row] == packet_id else None
+
+    def raw(self, row):
+        off = int(self._cols['raw_off'][row])
+        return bytes(self._raw[off:off + int(self._cols['raw_len'][row])])
+
+    def view(self, row):
+        """Giải mã lại PacketView từ byte tiêu đề đã lưu."""
+        return PacketView.from_bytes(self.raw(row), float(self._cols['ts'][row]), self.string(int(self._cols['linktype_ref'][row])))
+
+    def summary(self, row):
+        """Chuỗi tóm tắt của dòng, dựng từ byte tiêu đề khi cần (LRU SUMMARY_CACHE_SIZE dòng)."""
+        return self._summary_cache.get(int(row), self.view)
+
+    def tag(self, row):
+        return VERDICTS[self._cols['verdict'][row]]
+
+    def time_str(self, row):
+        return format_event_time(float(self._cols['ts'][row]))
+
+    def features(self, row):
+        """Đặc trưng AI của dòng (giống PacketView.features(): không có IPv4 thì chỉ có độ dài)."""
+        cols = self._cols
+        if cols['ip_version'][row] != 4:
+            return [int(cols['length'][row]), 0, 0, 0]
+        return [int(cols['length'][row]), int(cols['ip_proto'][row]), int(cols['sport'][row]), int(cols['dport'][row])]
+
+    def get(self, row):
+        """Dựng lại bản ghi dạng dict (cùng khóa với bản ghi cũ) cho một dòng."""
+        cols = self._cols
+        return {
+            'id': int(cols['id'][row]),
+            'summary': self.summary(row),
+            'parsed_layers': self.view(row).to_layers(),
+            'features': self.features(row),
+            'rule_analysis': self.string(int(cols['rule_ref'][row])),
+            'behavior_analysis': self.string(int(cols['behavior_ref'][row])),
+            'proto_name': PROTO_NAMES[cols['proto'][row]],
+            'iface': self.string(int(cols['iface_ref'][row])) or None,
+            'timestamp': float(cols['ts'][row]),
+            'time': self.time_str(row),
+            'prediction': int(cols['prediction'][row]) or None,
+            'tag': self.tag(row),
+        }
+
+    def select(self, verdicts=None, protos=None, search=None, query=None):
+        """
+        Lọc dòng theo mã phán quyết / giao thức và chuỗi tìm kiếm (vector hóa trên các cột).
+        (MỚI) query: truy vấn đã phân tích (packet_query.parse_query), tra qua chỉ mục cột; các bộ lọc
+        phán quyết / giao thức chỉ kiểm tra trên các dòng khớp truy vấn.
+        Trả về mảng chỉ số dòng theo thứ tự thêm vào.
+        """
+        if query is not None:
+            rows = query.rows(self)
+            if verdicts is not None and len(set(verdicts)) < len(VERDICTS):
+                rows = rows[np.isin(self._cols['verdict'][rows], [VERDICT_CODES[v] for v in verdicts])]
+            if protos is not None and len(set(protos)) < len(PROTO_NAMES):
+                rows = rows[np.isin(self._cols['proto'][rows], [PROTO_CODES[p] for p in protos])]
+            return rows
+        mask = np.ones(self._size, dtype=bool)
+        if verdicts is not None:
+            mask &= np.isin(self.column('verdict'), [VERDICT_CODES[v] for v in verdicts])
+        if protos is not None:
+            mask &= np.isin(self.column('proto'), [PROTO_CODES[p] for p in protos])
+        if search and search.strip():
+            mask &= self.search_mask(search)
+        return np.flatnonzero(mask)
+
+    def tail(self, limit, verdicts=None):
+        """
+        (MỚI) Tối đa limit dòng mới nhất (cho danh sách trực tiếp khi đang quét), tùy chọn chỉ các phán quyết cho trước.
+        Lọc theo phán quyết thì duyệt ngược từ cuối theo từng khối, không quét cả kho khi cảnh báo gần đây đã đủ.
+        """
+        if verdicts is None:
+            return np.arange(max(0, self._size - limit), self._size)
+        codes = [VERDICT_CODES[v] for v in verdicts]
+        found, count = [], 0
+        end, block = self._size, max(4096, limit * 8)
+        while end > 0 and count < limit:
+            start = max(0, end - block)
+            rows = start + np.flatnonzero(np.isin(self._cols['verdict'][start:end], codes))
+            found.append(rows)
+            count += len(rows)
+            end, block = start, block * 2
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found[::-1])[-limit:]
+
+    def search_mask(self, search):
+        """
+        (MỚI) Tìm trên các trường có cấu trúc, không cần chuỗi tóm tắt dựng sẵn:
+        IP nguồn/đích chứa chuỗi, cổng TCP/UDP bằng số, tên giao thức, giao diện / lý do phát hiện chứa chuỗi.
+        """
+        text, port, proto = search_terms(search)
+        src, dst = self.column('src'), self.column('dst')
+        ips = matching_ips(np.union1d(src, dst), text)
+        mask = np.isin(src, ips) | np.isin(dst, ips)
+        if port is not None:
+            l4 = np.isin(self.column('proto'), (PROTO_CODES['TCP'], PROTO_CODES['UDP']))
+            mask |= l4 & ((self.column('sport') == port) | (self.column('dport') == port))
+        if proto is not None:
+            mask |= self.column('proto') == proto
+        refs = [ref for ref, value in enumerate(self._strings) if text in value.lower()]
+        if refs:
+            for name in ('rule_ref', 'behavior_ref', 'iface_ref'):
+                mask |= np.isin(self.column(name), refs)
+        return mask
+
+    def display_rows(self, rows):
+        """(id, thời gian, tóm tắt, phán quyết) cho danh sách giám sát."""
+        ids = self.column('id')
+        verdicts = self.column('verdict')
+        for row in rows:
+            yield int(ids[row]), self.time_str(row), self.summary(row), VERDICTS[verdicts[row]]
+
+    def alerts(self):
+        """Các dòng cảnh báo (danger / anomaly) dạng dict gọn cho báo cáo PDF."""
+        cols = self._cols
+        for row in self.select(verdicts=('danger', 'anomaly')):
+            yield {
+                'id': int(cols['id'][row]),
+                'time': self.time_str(row),
+                'summary': self.summary(row),
+                'rule_analysis': self.string(int(cols['rule_ref'][row])),
+                'behavior_analysis': self.string(int(cols['behavior_ref'][row])),
+                'prediction': int(cols['prediction'][row]) or None,
+                'features': self.features(row),
+            }
+
+    def flush(self):
+        """Kho trong bộ nhớ: không có gì cần ghi (cùng giao diện với SessionDatabase)."""
+
+    def close(self):
+        # Phiên mở từ file: giải phóng vùng ánh xạ bộ nhớ của file pcap
+        if isinstance(self._raw, mmap.mmap):
+            self._raw.close()
+
+    def save(self, path, meta=None):
+        """
+        (MỚI) Lưu phiên để mở lại sau mà không phải phát hiện lại:
+          <path>       : file pcap chứa byte tiêu đề đã giữ của từng gói (mở được bằng Wireshark)
+          <path>.npy   : file phụ nhị phân, mọi cột (phán quyết, thời điểm, tham chiếu chuỗi...); raw_off trỏ vào file pcap
+          <path>.json  : bảng chuỗi (lý do phát hiện, giao diện) và thông tin phiên (meta)
+        File pcap chỉ có một kiểu tầng liên kết (của gói đầu tiên); kiểu của từng gói vẫn nằm trong file phụ.
+        """
+        n = self._size
+        linktype = self.string(int(self._cols['linktype_ref'][0])) if n else 'Ether'
+        raw_len = self.column('raw_len').astype(np.int64)
+        table = np.empty(n, dtype=list(COLUMNS))
+        for name, _ in COLUMNS:
+            table[name] = self.column(name)
+        # Vị trí dữ liệu của gói i trong file pcap: sau tiêu đề file và tiêu đề bản ghi của gói i
+        table['raw_off'] = _PCAP_HEADER.size + np.cumsum(_PCAP_RECORD.size + raw_len) - raw_len
+
+        ts = self.column('ts')
+        seconds = ts.astype(np.uint32)
+        micros = np.round((ts - seconds) * 1e6).astype(np.uint32)
+        lengths = self.column('length')
+        with open(path, 'wb') as f:
+            f.write(_PCAP_HEADER.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_DLT.get(linktype, 1)))
+            chunk = bytearray()
+            for row in range(n):
+                off = int(self._cols['raw_off'][row])
+                length = int(raw_len[row])
+                chunk += _PCAP_RECORD.pack(int(seconds[row]), min(int(micros[row]), 999999), length, max(length, int(lengths[row])))
+                chunk += self._raw[off:off + length]
+                if len(chunk) >= 1 << 20:
+                    f.write(chunk)
+                    chunk = bytearray()
+            f.write(chunk)
+        np.save(path + SIDECAR_SUFFIX, table, allow_pickle=False)
+        # Số liệu khác nhau của toàn phiên (gồm cả gói đã bị loại); cộng lại các dòng trong file khi mở không đổi kết quả
+        distinct = self.distinct_counts().to_dict()
+        # Bộ đếm của các gói đã bị loại khỏi cửa sổ lưu giữ (tổng số liệu thống kê khi mở lại)
+        evicted = {
+            'count': self.evicted_count,
+            'verdicts': self._evicted_verdicts.tolist(),
+            'protos': self._evicted_protos.tolist(),
+            'ips': self._evicted_ips.to_dict(),
+            'ports': self._evicted_ports.to_dict(),
+        }
+        with open(path + META_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump({'format': SESSION_FORMAT, 'version': SESSION_VERSION, 'rows': n, 'strings': self._strings, 'evicted': evicted, 'distinct': distinct, 'session': meta or {}}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, top_capacity=HEAVY_HITTER_CAPACITY, distinct_keys=DISTINCT_MAX_KEYS):
+        """
+        (MỚI) Mở lại phiên đã lưu bằng save(): các cột được ánh xạ bộ nhớ (np.load mmap_mode='r'),
+        byte tiêu đề đọc thẳng từ file pcap qua mmap. Không đọc cả file vào RAM, không chạy lại phát hiện.
+        Kho mở lại chỉ để xem (không thêm dòng). Thông tin phiên nằm trong store.meta.
+        """
+        with open(path + META_SUFFIX, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != SESSION_FORMAT or meta.get('version') != SESSION_VERSION:
+            raise ValueError(f"Không phải file phiên TANetAI hợp lệ: {path + META_SUFFIX}")
+        table = np.load(path + SIDECAR_SUFFIX, mmap_mode='r', allow_pickle=False)
+        if len(table) != meta['rows']:
+            raise ValueError(f"File phụ không khớp ({len(table)} / {meta['rows']} dòng): {path + SIDECAR_SUFFIX}")
+        store = cls(top_capacity=top_capacity, distinct_keys=distinct_keys)
+        store._cols = {name: table[name] for name, _ in COLUMNS}
+        store._size = store._capacity = len(table)
+        store._strings = list(meta['strings'])
+        store._string_refs = {text: ref for ref, text in enumerate(store._strings)}
+        if os.path.getsize(path):
+            with open(path, 'rb') as f:
+                store._raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(table):
+            store._next_id = int(table['id'][-1]) + 1
+        evicted = meta.get('evicted')
+        if evicted:
+            store.evicted_count = evicted['count']
+            store._evicted_verdicts = np.array(evicted['verdicts'], dtype=np.int64)
+            store._evicted_protos = np.array(evicted['protos'], dtype=np.int64)
+            store._evicted_ips = _load_heavy_hitters(evicted['ips'], top_capacity, ipv4_to_int)
+            store._evicted_ports = _load_heavy_hitters(evicted['ports'], top_capacity, _port_key)
+            # Các dòng trong file được cộng vào bộ đếm khi thống kê lần đầu
+            store._verdict_totals += store._evicted_verdicts
+            store._proto_totals += store._evicted_protos
+            store._ip_totals.merge(store._evicted_ips)
+            store._port_totals.merge(store._evicted_ports)
+        if meta.get('distinct'):
+            store._distinct = DistinctCounts.from_dict(meta['distinct'], distinct_keys)
+        store.meta = meta.get('session', {})
+        return store
+
+    def total_count(self):
+        """Tổng số gói tin của phiên, kể cả các gói đã bị loại khỏi cửa sổ lưu giữ."""
+        return self._size + self.evicted_count
+
+    def _sync_counts(self):
+        """
+        (MỚI) Cộng các dòng thêm sau lần đếm trước vào bộ đếm thống kê (vector hóa trên phần mới),
+        nên thống kê trực tiếp khi đang quét có chi phí theo số gói mới, không theo kích thước kho.
+        """
+        with self._count_lock:
+            if self._counted >= self._size:
+                return
+            rows = slice(self._counted, self._size)
+            self._verdict_totals += np.bincount(self._cols['verdict'][rows], minlength=len(VERDICTS))
+            self._proto_totals += np.bincount(self._cols['proto'][rows], minlength=len(PROTO_NAMES))
+            self._ip_totals.update(self._ip_keys(rows))
+            self._port_totals.update(self._port_keys(rows))
+            cols = self._cols
+            self._series.add(cols['ts'][rows], cols['proto'][rows], cols['verdict'][rows], cols['length'][rows])
+            ipv4 = cols['ip_version'][rows] == 4
+            proto = cols['proto'][rows][ipv4]
+            dport = np.where((proto == PROTO_CODES['TCP']) | (proto == PROTO_CODES['UDP']), cols['dport'][rows][ipv4], 0)
+            self._distinct.add(cols['ts'][rows][ipv4], cols['src'][rows][ipv4], cols['dst'][rows][ipv4], dport)
+            self._counted = self._size
+
+    # (CẬP NHẬT) Các bộ đếm cộng dồn trên toàn phiên, gồm cả các gói đã bị loại khỏi cửa sổ lưu giữ
+    def verdict_counts(self):
+        self._sync_counts()
+        return self._verdict_totals.copy()
+
+    def proto_counts(self):
+        self._sync_counts()
+        return Counter({PROTO_NAMES[i]: int(c) for i, c in enumerate(self._proto_totals) if c})
+
+    def _ip_keys(self, rows=slice(None)):
+        """Khóa Top IP của các dòng: địa chỉ IPv4 nguồn và đích (số nguyên)."""
+        ipv4 = self.column('ip_version')[rows] == 4
+        return np.concatenate((self.column('src')[rows][ipv4], self.column('dst')[rows][ipv4]))
+
+    def _port_keys(self, rows=slice(None)):
+        """Khóa Top cổng của các dòng TCP/UDP: mã giao thức * 65536 + cổng đích."""
+        proto = self.column('proto')[rows].astype(np.int64)
+        dport = self.column('dport')[rows].astype(np.int64)
+        keep = (proto == PROTO_CODES['TCP']) | (proto == PROTO_CODES['UDP'])
+        return proto[keep] * 65536 + dport[keep]
+
+    def ip_counts(self, limit=None):
+        """(CẬP NHẬT) Số lần của các IPv4 nguồn + đích nhiều nhất (limit mục, None: mọi mục đang theo dõi)."""
+        self._sync_counts()
+        return ip_counter(self._ip_totals, limit)
+
+    def port_counts(self, limit=None):
+        """(CẬP NHẬT) Số lần của các cổng đích TCP/UDP nhiều nhất, dạng '443/TCP'."""
+        self._sync_counts()
+        return port_counter(self._port_totals, limit)
+
+    def count_errors(self):
+        """(MỚI) Sai số tối đa (số gói) của ip_counts / port_counts: 0 khi số IP / cổng khác nhau chưa vượt top_capacity."""
+        self._sync_counts()
+        return {'ips': self._ip_totals.error, 'ports': self._port_totals.error}
+
+    def distinct_counts(self):
+        """(MỚI) Số liệu khác nhau (HyperLogLog) của toàn phiên và cửa sổ gần nhất (DistinctCounts). Chỉ đọc."""
+        self._sync_counts()
+        return self._distinct
+
+    def traffic_series(self):
+        """(MỚI) Chuỗi thời gian lưu lượng của toàn phiên (kể cả gói đã bị loại khỏi cửa sổ lưu giữ). Chỉ đọc."""
+        self._sync_counts()
+        return self._series
+
+    def traffic_between(self, start, end, bucket):
+        """
+        (MỚI) Chuỗi thời gian chi tiết (khoảng rộng bucket giây) cho đoạn [start, end), tính lại từ các gói còn lưu
+        qua chỉ mục cột thời gian: chi phí theo số gói trong đoạn, dùng khi phóng to biểu đồ lưu lượng.
+        """
+        index = self.column_index('ts')
+        ts = self.column('ts')
+        tail = ts[index.size:]
+        rows = np.concatenate((index.rows(start, end), index.size + np.flatnonzero((tail >= start) & (tail < end))))
+        rows = rows[ts[rows] < end]
+        series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)), bucket=bucket, max_buckets=np.ceil((end - start) / bucket) + 2,
+                               start=np.floor(start / bucket) * bucket)
+        cols = self._cols
+        series.add(ts[rows], cols['proto'][rows], cols['verdict'][rows], cols['length'][rows])
+        return series
+
+    def nbytes(self):
+        """Ước lượng bộ nhớ đang dùng (byte) cho các dòng đã lưu, gồm cả bảng phụ."""
+        per_row = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        total = per_row * self._size + len(self._raw)
+        total += sum(sys.getsizeof(s) for s in self._summary_cache.values())
+        total += sum(sys.getsizeof(s) for s in self._strings)
+        total += sum(sketch.nbytes() for sketch in (self._evicted_ips, self._evicted_ports, self._ip_totals, self._port_totals, self._distinct))
+        return total
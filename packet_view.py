@@ -0,0 +1,377 @@
+# file: packet_view.py
+# -*- coding: utf-8 -*-
+
+import struct
+import socket
+
+# Cấu trúc tiêu đề (network byte order)
+_ETH = struct.Struct("!6s6sH")
+_VLAN = struct.Struct("!HH")
+_SLL = struct.Struct("!HHH8sH")
+_SLL2 = struct.Struct("!H2xI2xBB8s")
+_RADIO_LEN = struct.Struct("<2xH")
+_ARP = struct.Struct("!HHBBH6s4s6s4s")
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_TCP = struct.Struct("!HHIIBBH")
+_UDP = struct.Struct("!HHH")
+_ICMP = struct.Struct("!BB2xHH")
+_IPV6_NH = struct.Struct("!6xB")
+IPV6_HEADER_LEN = 40
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_IPV6 = 0x86DD
+VLAN_TYPES = (0x8100, 0x88A8)
+
+# (MỚI) Kiểu tầng liên kết (tên lớp scapy, như socket bắt gói và trình đọc pcap đặt) không có tầng 2 / có tiêu đề riêng
+RAW_IP_LINKTYPES = ("IP", "IPv46", "IPv6")
+LOOPBACK_LINKTYPES = ("Loopback", "LoopbackOpenBSD")   # 4 byte họ địa chỉ trước gói IP
+PRISM_HEADER_LEN = 144
+_LLC_SNAP = b"\xaa\xaa\x03"
+IP_SEARCH_LIMIT = 64    # Kiểu tầng liên kết lạ: tìm tiêu đề IPv4 trong ngần này byte đầu
+_unknown_linktypes = set()
+
+# Thứ tự cờ TCP giống scapy (str(packet[TCP].flags))
+TCP_FLAG_LETTERS = "FSRPAUECN"
+TCP_FIN, TCP_SYN, TCP_RST = 0x01, 0x02, 0x04
+
+# Các loại ICMP có trường id (Echo, Timestamp, Info, Address Mask)
+_ICMP_TYPES_WITH_ID = (0, 8, 13, 14, 15, 16, 17, 18)
+# Tên loại ICMP trong tóm tắt (giống scapy)
+ICMP_TYPE_NAMES = {0: "echo-reply", 3: "dest-unreach", 4: "source-quench", 5: "redirect", 8: "echo-request", 11: "time-exceeded", 12: "parameter-problem", 13: "timestamp-request", 14: "timestamp-reply"}
+
+
+def _mac(b):
+    return b.hex(":")
+
+
+def ipv4_to_int(addr):
+    """Địa chỉ IPv4 dạng chuỗi -> số nguyên 32 bit (0 nếu không phải IPv4: IPv6, MAC, None)."""
+    try:
+        return struct.unpack("!I", socket.inet_aton(addr))[0]
+    except (OSError, TypeError):
+        return 0
+
+
+def int_to_ipv4(value):
+    return socket.inet_ntoa(struct.pack("!I", int(value)))
+
+
+class RawFrame:
+    """
+    (MỚI) Khung bắt được CHƯA qua scapy: chỉ giữ byte gốc, thời điểm bắt gói và kiểu tầng liên kết.
+    Socket bắt gói và trình đọc pcap trả về RawFrame thay vì dựng cây lớp scapy cho từng gói tin.
+    Có cùng các thuộc tính original / time mà đường xử lý dùng trên gói tin scapy.
+    """
+    __slots__ = ("original", "time", "linktype", "sniffed_on")
+
+    def __init__(self, original, time, linktype="Ether"):
+        self.original = original
+        self.time = time
+        self.linktype = linktype
+        self.sniffed_on = None      # sniff() gán tên giao diện cho mọi gói nhận được
+
+    @classmethod
+    def from_packet(cls, packet):
+        """Gói tin scapy (hoặc RawFrame) -> RawFrame, dùng lại byte gốc nếu có."""
+        if isinstance(packet, cls):
+            return packet
+        raw = getattr(packet, "original", None) or bytes(packet)
+        return cls(raw, float(getattr(packet, "time", 0.0)), packet.__class__.__name__)
+
+    def __len__(self):
+        return len(self.original)
+
+    def __bytes__(self):
+        return self.original
+
+
+class PacketView:
+    """
+    (MỚI) Khung nhìn gọn nhẹ của một gói tin, giải mã MỘT lần từ byte thô.
+    Giải mã Ethernet (kể cả VLAN), ARP, IPv4, TCP, UDP, ICMP bằng struct/memoryview.
+    Mọi tầng phân tích (AI Thống kê, AI Hành vi, Quy tắc, Chi tiết) dùng chung đối tượng này.
+    """
+    __slots__ = (
+        "raw", "linktype", "time", "length", "l4", "l3_offset",
+        "eth_dst", "eth_src", "eth_type",
+        "arp_op", "arp_psrc", "arp_pdst",
+        "ip_version", "ip_ihl", "ip_ttl", "ip_len", "proto", "src", "dst",
+        "sport", "dport", "tcp_seq", "tcp_ack", "tcp_flags", "tcp_window", "udp_len",
+        "icmp_type", "icmp_code", "icmp_id",
+    )
+
+    def __init__(self):
+        self.raw = b""
+        self.linktype = "Ether"
+        self.time = 0.0
+        self.length = 0
+        self.l4 = "Other"           # TCP / UDP / ICMP / ARP / Other
+        self.l3_offset = 0          # Vị trí tiêu đề tầng 3 trong byte thô
+        self.eth_dst = self.eth_src = None
+        self.eth_type = 0
+        self.arp_op = 0
+        self.arp_psrc = self.arp_pdst = None
+        self.ip_version = self.ip_ihl = self.ip_ttl = self.ip_len = 0
+        self.proto = 0
+        self.src = self.dst = None
+        self.sport = self.dport = 0
+        self.tcp_seq = self.tcp_ack = self.tcp_flags = self.tcp_window = 0
+        self.udp_len = 0
+        self.icmp_type = self.icmp_code = 0
+        self.icmp_id = None
+
+    # ------------------------------------------------------------------
+    # Khởi tạo
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_bytes(cls, raw, timestamp=0.0, linktype="Ether"):
+        """
+        Giải mã từ byte thô. linktype: 'Ether', 'CookedLinux' hoặc 'IP' (không có tầng 2).
+        (MỚI) Cả 'CookedLinuxV2', loopback ('Loopback', 'LoopbackOpenBSD'), IP thô ('IPv46', 'IPv6') và 802.11
+        ('RadioTap', 'PPI', 'PrismHeader', 'Dot11'). Kiểu lạ: tìm tiêu đề IPv4 hợp lệ ở đầu gói (báo một lần mỗi kiểu).
+        """
+        view = cls()
+        view.raw = raw
+        view.linktype = linktype
+        view.time = float(timestamp)
+        view.length = len(raw)
+        buf = memoryview(raw)
+        try:
+            if linktype == "Ether":
+                view._decode_ether(buf)
+            elif linktype == "CookedLinux":
+                if len(buf) >= _SLL.size:
+                    eth_type = _SLL.unpack_from(buf, 0)[4]
+                    view.eth_type = eth_type
+                    view._decode_l3(buf, _SLL.size, eth_type)
+            elif linktype == "CookedLinuxV2":
+                if len(buf) >= _SLL2.size:
+                    eth_type = _SLL2.unpack_from(buf, 0)[0]
+                    view.eth_type = eth_type
+                    view._decode_l3(buf, _SLL2.size, eth_type)
+            elif linktype in RAW_IP_LINKTYPES:
+                view._decode_raw_ip(buf, 0)
+            elif linktype in LOOPBACK_LINKTYPES:
+                view._decode_raw_ip(buf, 4)
+            elif linktype in ("RadioTap", "PPI"):
+                # Độ dài tiêu đề vô tuyến (little-endian) ở byte 2-3, sau đó là khung 802.11
+                view._decode_dot11(buf, _RADIO_LEN.unpack_from(buf, 0)[0])
+            elif linktype == "PrismHeader":
+                view._decode_dot11(buf, PRISM_HEADER_LEN)
+            elif linktype == "Dot11":
+                view._decode_dot11(buf, 0)
+            else:
+                if linktype not in _unknown_linktypes:
+                    _unknown_linktypes.add(linktype)
+                    print(f"[GÓI TIN] Kiểu tầng liên kết chưa hỗ trợ: {linktype}. Tìm tiêu đề IPv4 trong {IP_SEARCH_LIMIT} byte đầu.")
+                view._find_ipv4(buf)
+        except struct.error:
+            # Gói tin bị cắt cụt (snaplen): giữ lại những gì đã giải mã được
+            pass
+        return view
+
+    @classmethod
+    def from_packet(cls, packet):
+        """Tạo từ gói tin scapy hoặc RawFrame, dùng lại byte gốc nếu có (không build lại gói tin)."""
+        frame = RawFrame.from_packet(packet)
+        return cls.from_bytes(frame.original, frame.time, frame.linktype)
+
+    # ------------------------------------------------------------------
+    # Giải mã từng tầng
+    # ------------------------------------------------------------------
+    def _decode_ether(self, buf):
+        dst, src, eth_type = _ETH.unpack_from(buf, 0)
+        self.eth_dst = _mac(dst)
+        self.eth_src = _mac(src)
+        self.eth_type = eth_type
+        offset = _ETH.size
+        while eth_type in VLAN_TYPES:
+            eth_type = _VLAN.unpack_from(buf, offset)[1]
+            offset += _VLAN.size
+        self._decode_l3(buf, offset, eth_type)
+
+    def _decode_l3(self, buf, offset, eth_type):
+        self.l3_offset = offset
+        if eth_type == ETH_P_IP:
+            self._decode_ipv4(buf, offset)
+        elif eth_type == ETH_P_ARP:
+            self._decode_arp(buf, offset)
+        elif eth_type == ETH_P_IPV6:
+            # IPv6 chưa được phân tích ở tầng IP, nhưng vẫn nhận diện TCP/UDP bên trong
+            next_header = _IPV6_NH.unpack_from(buf, offset)[0]
+            self._decode_l4(buf, offset + IPV6_HEADER_LEN, next_header)
+
+    def _decode_raw_ip(self, buf, offset):
+        # Gói IP không có tầng 2: phiên bản IP lấy từ 4 bit đầu
+        if len(buf) > offset:
+            version = buf[offset] >> 4
+            if version in (4, 6):
+                self.eth_type = ETH_P_IP if version == 4 else ETH_P_IPV6
+                self._decode_l3(buf, offset, self.eth_type)
+
+    def _decode_dot11(self, buf, offset):
+        # Chỉ khung dữ liệu 802.11 không mã hóa có LLC/SNAP mới mang gói IP / ARP
+        fc_type, fc_flags = buf[offset], buf[offset + 1]
+        if (fc_type >> 2) & 0x03 != 2 or fc_flags & 0x40:
+            return
+        header = 24
+        if fc_flags & 0x03 == 0x03:
+            header += 6             # Khung 4 địa chỉ (WDS)
+        if fc_type & 0x80:
+            header += 2             # QoS
+            if fc_flags & 0x80:
+                header += 4         # HT Control
+        llc = offset + header
+        if bytes(buf[llc:llc + 3]) == _LLC_SNAP:
+            eth_type = struct.unpack_from("!H", buf, llc + 6)[0]
+            self.eth_type = eth_type
+            self._decode_l3(buf, llc + 8, eth_type)
+
+    def _find_ipv4(self, buf):
+        # Vị trí đầu tiên có tiêu đề IPv4 với tổng kiểm tra đúng
+        for offset in range(0, min(IP_SEARCH_LIMIT, len(buf) - 20) + 1):
+            ver_ihl = buf[offset]
+            header_len = (ver_ihl & 0x0F) * 4
+            if ver_ihl >> 4 != 4 or header_len < 20 or offset + header_len > len(buf):
+                continue
+            total = sum(struct.unpack_from(f"!{header_len // 2}H", buf, offset))
+            while total >> 16:
+                total = (total & 0xFFFF) + (total >> 16)
+            if total == 0xFFFF:
+                self.eth_type = ETH_P_IP
+                self._decode_l3(buf, offset, ETH_P_IP)
+                return
+
+    def _decode_arp(self, buf, offset):
+        _, _, hwlen, plen, op, _, psrc, _, pdst = _ARP.unpack_from(buf, offset)
+        self.l4 = "ARP"
+        self.arp_op = op
+        if hwlen == 6 and plen == 4:
+            self.arp_psrc = socket.inet_ntoa(psrc)
+            self.arp_pdst = socket.inet_ntoa(pdst)
+
+    def _decode_ipv4(self, buf, offset):
+        ver_ihl, _, total_len, _, frag, ttl, proto, _, src, dst = _IPV4.unpack_from(buf, offset)
+        self.ip_version = ver_ihl >> 4
+        if self.ip_version != 4:
+            return
+        self.ip_ihl = ver_ihl & 0x0F
+        self.ip_ttl = ttl
+        self.ip_len = total_len
+        self.proto = proto
+        self.src = socket.inet_ntoa(src)
+        self.dst = socket.inet_ntoa(dst)
+        # Độ dài thật của gói tin kể cả khi chỉ bắt phần tiêu đề (snaplen)
+        if total_len:
+            self.length = max(self.length, offset + total_len)
+
+        if frag & 0x1FFF:
+            return  # Mảnh sau của gói bị phân mảnh: không có tiêu đề tầng 4
+        self._decode_l4(buf, offset + self.ip_ihl * 4, proto)
+
+    def _decode_l4(self, buf, l4_offset, proto):
+        if proto == 6:
+            sport, dport, seq, ack, _, flags, window = _TCP.unpack_from(buf, l4_offset)
+            self.l4 = "TCP"
+            self.sport, self.dport = sport, dport
+            self.tcp_seq, self.tcp_ack = seq, ack
+            self.tcp_flags = flags | ((buf[l4_offset + 12] & 0x01) << 8)
+            self.tcp_window = window
+        elif proto == 17:
+            sport, dport, udp_len = _UDP.unpack_from(buf, l4_offset)
+            self.l4 = "UDP"
+            self.sport, self.dport = sport, dport
+            self.udp_len = udp_len
+        elif proto == 1:
+            icmp_type, code, icmp_id, _ = _ICMP.unpack_from(buf, l4_offset)
+            self.l4 = "ICMP"
+            self.icmp_type, self.icmp_code = icmp_type, code
+            self.icmp_id = icmp_id if icmp_type in _ICMP_TYPES_WITH_ID else None
+
+    # ------------------------------------------------------------------
+    # Truy vấn dùng chung cho các tầng phân tích
+    # ------------------------------------------------------------------
+    @property
+    def has_ip(self):
+        return self.src is not None
+
+    @property
+    def proto_name(self):
+        return self.l4
+
+    @property
+    def tcp_flags_str(self):
+        """Chuỗi cờ TCP theo định dạng scapy (ví dụ 'SA', 'PA')."""
+        return "".join(letter for i, letter in enumerate(TCP_FLAG_LETTERS) if self.tcp_flags & (1 << i))
+
+    @property
+    def host_src(self):
+        """Địa chỉ nguồn (IP hoặc ARP psrc)."""
+        return self.src if self.src is not None else self.arp_psrc
+
+    @property
+    def host_dst(self):
+        """Địa chỉ đích (IP hoặc ARP pdst)."""
+        return self.dst if self.dst is not None else self.arp_pdst
+
+    def features(self):
+        """Đặc trưng cho AI: [Độ dài gói tin, Giao thức, Cổng nguồn, Cổng đích]."""
+        if not self.has_ip:
+            return [self.length, 0, 0, 0]
+        return [self.length, self.proto, self.sport, self.dport]
+
+    def summary(self):
+        """
+        (MỚI) Chuỗi tóm tắt một dòng dựng từ các trường đã giải mã (thay cho packet.summary() của scapy),
+        ví dụ 'Ether / IP / TCP 10.0.0.1:51000 > 10.0.0.9:443 PA'.
+        """
+        parts = [] if self.linktype in RAW_IP_LINKTYPES else [self.linktype]
+        if self.l4 == "ARP":
+            parts.append("ARP")
+            if self.arp_op == 1:
+                return " / ".join(parts) + f" who has {self.arp_pdst} says {self.arp_psrc}"
+            if self.arp_op == 2:
+                return " / ".join(parts) + f" is at {self.eth_src} says {self.arp_psrc}"
+            return " / ".join(parts) + f" op {self.arp_op} {self.arp_psrc} > {self.arp_pdst}"
+
+        if self.has_ip:
+            parts.append("IP")
+            src, dst = self.src, self.dst
+        elif self.eth_type == ETH_P_IPV6:
+            parts.append("IPv6")
+            src, dst = self._ipv6_addresses()
+        else:
+            return " / ".join(parts) + f" type 0x{self.eth_type:04x}"
+
+        if self.l4 in ("TCP", "UDP"):
+            text = " / ".join(parts + [self.l4]) + f" {src}:{self.sport} > {dst}:{self.dport}"
+            return f"{text} {self.tcp_flags_str}" if self.l4 == "TCP" else text
+        if self.l4 == "ICMP":
+            name = ICMP_TYPE_NAMES.get(self.icmp_type, f"type {self.icmp_type}")
+            return " / ".join(parts + ["ICMP"]) + f" {src} > {dst} {name} {self.icmp_code}"
+        return " / ".join(parts) + f" {src} > {dst} proto {self.proto}"
+
+    def _ipv6_addresses(self):
+        off = self.l3_offset
+        if len(self.raw) < off + IPV6_HEADER_LEN:
+            return "?", "?"
+        raw = bytes(self.raw[off + 8:off + IPV6_HEADER_LEN])
+        return f"[{socket.inet_ntop(socket.AF_INET6, raw[:16])}]", f"[{socket.inet_ntop(socket.AF_INET6, raw[16:])}]"
+
+    def to_layers(self):
+        """Dict các tầng đã giải mã (cùng định dạng với parse_packet_to_dict cũ)."""
+        layers = {}
+        if self.eth_src is not None:
+            layers['Ether'] = {"dst": self.eth_dst, "src": self.eth_src, "type": self.eth_type}
+        if self.l4 == "ARP":
+            layers['ARP'] = {"op": self.arp_op, "psrc": self.arp_psrc, "pdst": self.arp_pdst}
+        if self.has_ip:
+            layers['IP'] = {"version": self.ip_version, "ihl": self.ip_ihl, "ttl": self.ip_ttl, "proto": self.proto, "src": self.src, "dst": self.dst}
+        if self.l4 == "TCP":
+            layers['TCP'] = {"sport": self.sport, "dport": self.dport, "seq": self.tcp_seq, "ack": self.tcp_ack, "flags": self.tcp_flags_str, "window": self.tcp_window}
+        elif self.l4 == "UDP":
+            layers['UDP'] = {"sport": self.sport, "dport": self.dport, "len": self.udp_len}
+        elif self.l4 == "ICMP":
+            layers['ICMP'] = {"type": self.icmp_type, "code": self.icmp_code, "id": self.icmp_id}
+        return layers
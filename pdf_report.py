@@ -68,6 +68,20 @@ class PDFReport(FPDF):
                 self.cell(0, 10, "3. Top 5 Dịch vụ/Cổng", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 self.image("port_chart.png", x=20, w=170)
                 self.ln(10)
+
+            if "series_chart.png" in chart_files:
+                if self.get_y() > 150: self.add_page()
+                self.set_font("DejaVu", "B", 11)
+                self.cell(0, 10, "4. Lưu lượng theo Thời gian", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                self.image("series_chart.png", x=10, w=190)
+                self.ln(10)
+
+            if "distinct_chart.png" in chart_files:
+                if self.get_y() > 180: self.add_page()
+                self.set_font("DejaVu", "B", 11)
+                self.cell(0, 10, "5. Số lượng Khác nhau theo Máy (HyperLogLog)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                self.image("distinct_chart.png", x=10, w=190)
+                self.ln(10)
             
         except Exception as e:
             print(f"Lỗi khi chèn ảnh biểu đồ: {e}")
@@ -0,0 +1,538 @@
+# file: session_db.py
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from detection_pipeline import format_event_time
+from packet_store import (
+    VERDICTS, PROTO_NAMES, VERDICT_CODES, PROTO_CODES, SummaryCache, search_terms, matching_ips,
+    ip_counter, port_counter
+)
+from packet_view import PacketView, ipv4_to_int
+from sketches import DISTINCT_MAX_KEYS, DISTINCT_WINDOW_SECONDS, HEAVY_HITTER_CAPACITY, DistinctCounts, HeavyHitters
+from time_series import SERIES_BUCKET_SECONDS, SERIES_MAX_BUCKETS, TrafficSeries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packets (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    src INTEGER, dst INTEGER,
+    sport INTEGER, dport INTEGER,
+    ip_proto INTEGER, proto INTEGER, ip_version INTEGER,
+    length INTEGER,
+    verdict INTEGER NOT NULL,
+    prediction INTEGER,
+    rule TEXT, behavior TEXT,
+    iface TEXT, linktype TEXT,
+    raw BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_packets_ts ON packets(ts);
+CREATE INDEX IF NOT EXISTS idx_packets_src ON packets(src);
+CREATE INDEX IF NOT EXISTS idx_packets_dst ON packets(dst);
+CREATE INDEX IF NOT EXISTS idx_packets_sport ON packets(sport);
+CREATE INDEX IF NOT EXISTS idx_packets_dport ON packets(dport);
+CREATE INDEX IF NOT EXISTS idx_packets_verdict ON packets(verdict);
+"""
+
+FIELDS = ('id', 'ts', 'src', 'dst', 'sport', 'dport', 'ip_proto', 'proto', 'ip_version', 'length',
+          'verdict', 'prediction', 'rule', 'behavior', 'iface', 'linktype', 'raw')
+INSERT_SQL = f"INSERT INTO packets ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})"
+SELECT_SQL = f"SELECT {', '.join(FIELDS)} FROM packets"
+QUERY_CHUNK = 500   # Số id tối đa trong một câu IN (...) (giới hạn tham số của SQLite)
+PENDING_KEYS = 1 << 16   # Số khóa IP / cổng / gói gom lại trước khi cộng vào bản tóm tắt Top-k / số liệu khác nhau / chuỗi thời gian
+WRITE_QUEUE_BATCHES = 4   # Hàng đợi ghi giữ tối đa ngần này lô (batch_size dòng) chưa ghi xuống đĩa
+
+_STOP = object()
+
+
+def new_session_path(directory):
+    """Đường dẫn file phiên mới: <thư mục>/session_YYYYmmdd_HHMMSS.db"""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"session_{datetime.datetime.now():%Y%m%d_%H%M%S}.db")
+
+
+class SessionDatabase:
+    """
+    (MỚI) Kho phiên trên đĩa (SQLite, chế độ WAL) cho các phiên quét dài (vd: Gateway chạy 24 giờ).
+    Cùng giao diện với PacketStore (append / select / get / display_rows / alerts / bộ đếm), nên danh sách
+    giám sát, tab thống kê và báo cáo PDF dùng được cả hai.
+    append() chỉ đưa dòng vào hàng đợi; một luồng ghi riêng gom thành lô và ghi trong MỘT giao dịch.
+    Hàng đợi có giới hạn (WRITE_QUEUE_BATCHES lô): khi đĩa ghi chậm hơn tốc độ thêm gói, append() chờ luồng ghi,
+    luồng phân tích chậm lại và phần dư nằm trong bộ đệm vòng bắt gói (được đếm là gói bỏ khi đầy).
+    Trong bộ nhớ chỉ giữ: bộ nhớ đệm nóng (hot_cache dòng mới nhất, và hot_cache cảnh báo mới nhất)
+    và bộ đếm phán quyết / giao thức, nên bộ nhớ không tăng theo thời gian của phiên.
+    (CẬP NHẬT) Top IP / cổng là bản tóm tắt Top-k cố định top_capacity mục (sketches.HeavyHitters), như PacketStore;
+    số liệu khác nhau theo máy là sketches.DistinctCounts (HyperLogLog).
+    """
+    def __init__(self, path, batch_size=2000, hot_cache=2000, top_capacity=HEAVY_HITTER_CAPACITY,
+                 distinct_window=DISTINCT_WINDOW_SECONDS, distinct_keys=DISTINCT_MAX_KEYS):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.hot_cache = max(0, int(hot_cache))
+        self._cache = OrderedDict()          # id -> dòng (tuple theo FIELDS)
+        self._alert_cache = OrderedDict()    # id -> dòng, chỉ các cảnh báo (danh sách trực tiếp khi lưu lượng cao)
+        self._summary_cache = SummaryCache()   # id -> tóm tắt (LRU)
+        self._count = 0
+        self._verdict_counts = np.zeros(len(VERDICTS), dtype=np.int64)
+        self._proto_counts = Counter()
+        # (MỚI) Top IP / cổng cộng dồn khi thêm gói (thống kê trực tiếp không phải truy vấn cả bảng);
+        # khóa của các gói mới được gom lại và cộng vào bản tóm tắt theo lô (tối đa PENDING_KEYS khóa)
+        self.top_capacity = int(top_capacity)
+        self._ip_top = HeavyHitters(self.top_capacity)
+        self._port_top = HeavyHitters(self.top_capacity)
+        self._ip_pending = []
+        self._port_pending = []
+        # (MỚI) Số liệu khác nhau; (ts, src, dst, cổng đích) của các gói IPv4 mới được cộng theo lô
+        self.distinct_window = float(distinct_window)
+        self.distinct_keys = int(distinct_keys)
+        self._distinct = DistinctCounts(self.distinct_window, self.distinct_keys)
+        self._distinct_pending = []
+        # (MỚI) Chuỗi thời gian lưu lượng; (ts, proto, verdict, length) của các gói mới được cộng theo lô khi cần
+        self._series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)))
+        self._series_pending = []
+        # Khóa của các _fold_*: luồng nền xử lý sau khi dừng và luồng giao diện có thể gọi cùng lúc
+        self._count_lock = threading.Lock()
+        self.evicted_count = 0               # Phiên trên đĩa giữ mọi gói tin (cùng giao diện với PacketStore)
+        self.error = None
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        # Kết nối đọc dùng chung (luồng giao diện), luồng ghi có kết nối riêng (WAL: đọc không chặn ghi)
+        self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_BATCHES * self.batch_size)
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def open(cls, path, hot_cache=2000, top_capacity=HEAVY_HITTER_CAPACITY, distinct_window=DISTINCT_WINDOW_SECONDS, distinct_keys=DISTINCT_MAX_KEYS):
+        """(MỚI) Mở lại một file phiên SQLite đã có để xem (bộ đếm được đọc lại từ chỉ mục, không phát hiện lại)."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        store = cls(path, hot_cache=hot_cache, top_capacity=top_capacity, distinct_window=distinct_window, distinct_keys=distinct_keys)
+        with store._read_lock:
+            reader = store._reader
+            store._count = reader.execute("SELECT COALESCE(MAX(id), 0) FROM packets").fetchone()[0]
+            for verdict, n in reader.execute("SELECT verdict, COUNT(*) FROM packets GROUP BY verdict"):
+                store._verdict_counts[verdict] = n
+            for proto, n in reader.execute("SELECT proto, COUNT(*) FROM packets GROUP BY proto"):
+                store._proto_counts[PROTO_NAMES[proto]] = n
+        # Đếm IP / cổng và chuỗi thời gian được đọc lại từ chỉ mục khi thống kê lần đầu
+        store._ip_top = store._port_top = store._series = store._distinct = None
+        return store
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _writer_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch, markers, stop = [], [], False
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        markers.append(item)
+                    else:
+                        batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(INSERT_SQL, batch)
+                    except sqlite3.Error as e:
+                        self.error = e
+                        print(f"Lỗi ghi kho phiên {self.path}: {e}")
+                for marker in markers:
+                    marker.set()
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    @property
+    def backlog(self):
+        """Số dòng đang chờ luồng ghi (tối đa WRITE_QUEUE_BATCHES * batch_size)."""
+        return self._queue.qsize()
+
+    def append(self, record):
+        """Thêm một bản ghi kết quả của DetectionPipeline. Trả về số thứ tự (id) của gói tin."""
+        self._count += 1
+        packet_id = self._count
+        verdict = VERDICT_CODES[record['tag']]
+        proto = PROTO_CODES.get(record['proto_name'], PROTO_CODES['Other'])
+        row = (
+            packet_id, record['timestamp'],
+            ipv4_to_int(record['src']), ipv4_to_int(record['dst']),
+            record['sport'], record['dport'],
+            record['features'][1], proto, record['ip_version'],
+            record['features'][0],
+            verdict, record['prediction'] or 0,
+            record['rule_analysis'] or None, record['behavior_analysis'] or None,
+            record.get('iface'), record['linktype'],
+            bytes(record['raw']),
+        )
+        self._queue.put(row)
+        self._verdict_counts[verdict] += 1
+        self._proto_counts[PROTO_NAMES[proto]] += 1
+        ported = proto == PROTO_CODES['TCP'] or proto == PROTO_CODES['UDP']
+        if record['ip_version'] == 4:
+            self._ip_pending += row[2:4]
+            self._distinct_pending.append((record['timestamp'], row[2], row[3], record['dport'] if ported else 0))
+        if ported:
+            self._port_pending.append(proto * 65536 + record['dport'])
+        if len(self._ip_pending) >= PENDING_KEYS:
+            self._fold_top()
+            self._fold_distinct()
+        elif len(self._port_pending) >= PENDING_KEYS:
+            # Lưu lượng TCP/UDP không phải IPv4 (vd: IPv6) không làm đầy _ip_pending
+            self._fold_top()
+        self._series_pending.append((record['timestamp'], proto, verdict, record['features'][0]))
+        if len(self._series_pending) >= PENDING_KEYS:
+            self._fold_series()
+        if self.hot_cache:
+            self._cache[packet_id] = row
+            if len(self._cache) > self.hot_cache:
+                self._cache.popitem(last=False)
+            if verdict != VERDICT_CODES['normal']:
+                self._alert_cache[packet_id] = row
+                if len(self._alert_cache) > self.hot_cache:
+                    self._alert_cache.popitem(last=False)
+        return packet_id
+
+    def flush(self):
+        """Chờ luồng ghi ghi xong mọi dòng đã thêm (trước khi truy vấn)."""
+        if self._writer.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+    def _query(self, sql, params=()):
+        self.flush()
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def _iter_query(self, sql, params=(), chunk=1000):
+        """Duyệt kết quả theo từng phần (không nạp cả bảng vào bộ nhớ)."""
+        self.flush()
+        with self._read_lock:
+            cursor = self._reader.execute(sql, params)
+            rows = cursor.fetchmany(chunk)
+        while rows:
+            yield from rows
+            with self._read_lock:
+                rows = cursor.fetchmany(chunk)
+
+    def row_of(self, packet_id):
+        """Kho phiên dùng luôn id làm chỉ số dòng (None nếu không có)."""
+        packet_id = int(packet_id)
+        return packet_id if 0 < packet_id <= self._count else None
+
+    def _cached_row(self, packet_id):
+        row = self._cache.get(packet_id)
+        return row if row is not None else self._alert_cache.get(packet_id)
+
+    def _row(self, packet_id):
+        row = self._cached_row(packet_id)
+        if row is None:
+            rows = self._query(f"{SELECT_SQL} WHERE id = ?", (packet_id,))
+            row = rows[0] if rows else None
+        return row
+
+    def view(self, packet_id):
+        row = dict(zip(FIELDS, self._row(packet_id)))
+        return PacketView.from_bytes(row['raw'], row['ts'], row['linktype'])
+
+    def summary(self, packet_id):
+        """Chuỗi tóm tắt dựng từ byte tiêu đề khi cần (LRU)."""
+        return self._summary_cache.get(int(packet_id), self.view)
+
+    def time_str(self, packet_id):
+        return format_event_time(self._row(packet_id)[FIELDS.index('ts')])
+
+    @staticmethod
+    def _features(row):
+        if row['ip_version'] != 4:
+            return [row['length'], 0, 0, 0]
+        return [row['length'], row['ip_proto'], row['sport'], row['dport']]
+
+    def features(self, packet_id):
+        return self._features(dict(zip(FIELDS, self._row(packet_id))))
+
+    def get(self, packet_id):
+        """Dựng lại bản ghi dạng dict (cùng khóa với PacketStore.get) cho một gói tin."""
+        row = dict(zip(FIELDS, self._row(packet_id)))
+        return {
+            'id': row['id'],
+            'summary': self.summary(packet_id),
+            'parsed_layers': PacketView.from_bytes(row['raw'], row['ts'], row['linktype']).to_layers(),
+            'features': self._features(row),
+            'rule_analysis': row['rule'] or "",
+            'behavior_analysis': row['behavior'] or "",
+            'proto_name': PROTO_NAMES[row['proto']],
+            'iface': row['iface'] or None,
+            'timestamp': row['ts'],
+            'time': format_event_time(row['ts']),
+            'prediction': row['prediction'] or None,
+            'tag': VERDICTS[row['verdict']],
+        }
+
+    def select(self, verdicts=None, protos=None, search=None, query=None):
+        """
+        Lọc theo phán quyết / giao thức (dùng chỉ mục) và chuỗi tìm kiếm trên trường có cấu trúc.
+        (MỚI) query: truy vấn đã phân tích (packet_query.parse_query), dịch thành điều kiện WHERE trên các cột có chỉ mục.
+        (CẬP NHẬT) Trả về mảng id (np.int64, 8 byte mỗi dòng) như PacketStore.select, không phải danh sách số Python.
+        """
+        where, params = [], []
+        if verdicts is not None and len(set(verdicts)) < len(VERDICTS):
+            if not verdicts:
+                return np.empty(0, dtype=np.int64)
+            where.append(f"verdict IN ({', '.join('?' * len(verdicts))})")
+            params += [VERDICT_CODES[v] for v in verdicts]
+        if protos is not None and len(set(protos)) < len(PROTO_NAMES):
+            if not protos:
+                return np.empty(0, dtype=np.int64)
+            where.append(f"proto IN ({', '.join('?' * len(protos))})")
+            params += [PROTO_CODES[p] for p in protos]
+        if search and search.strip():
+            clause, search_params = self.search_clause(search)
+            where.append(clause)
+            params += search_params
+        if query is not None:
+            clause, query_params = query.sql(self)
+            where.append(clause)
+            params += query_params
+        if not where:
+            # Không lọc: id liên tục 1..count, không cần đọc cả bảng
+            self.flush()
+            return np.arange(1, self._count + 1, dtype=np.int64)
+        sql = f"SELECT id FROM packets WHERE {' AND '.join(where)} ORDER BY id"
+        return np.fromiter((packet_id for (packet_id,) in self._iter_query(sql, params, chunk=PENDING_KEYS)), dtype=np.int64)
+
+    def tail(self, limit, verdicts=None):
+        """
+        (MỚI) Tối đa limit id mới nhất cho danh sách trực tiếp, lấy từ bộ nhớ đệm nóng (không chờ luồng ghi,
+        không truy vấn đĩa). Chỉ cảnh báo thì lấy từ bộ nhớ đệm cảnh báo.
+        """
+        codes = None if verdicts is None else {VERDICT_CODES[v] for v in verdicts}
+        alerts_only = codes is not None and VERDICT_CODES['normal'] not in codes
+        cache = self._alert_cache if alerts_only else self._cache
+        ids = []
+        verdict_index = FIELDS.index('verdict')
+        for packet_id in reversed(cache):
+            if codes is None or cache[packet_id][verdict_index] in codes:
+                ids.append(packet_id)
+                if len(ids) >= limit:
+                    break
+        return ids[::-1]
+
+    def reference_time(self):
+        """Thời điểm của gói đầu tiên (ngày tham chiếu cho điều kiện time=HH:MM:SS)."""
+        rows = self._query("SELECT ts FROM packets ORDER BY id LIMIT 1")
+        return rows[0][0] if rows else None
+
+    def search_clause(self, search):
+        """(MỚI) Điều kiện tìm kiếm giống PacketStore: IP chứa chuỗi, cổng, tên giao thức, giao diện / lý do phát hiện."""
+        text, port, proto = search_terms(search)
+        ips = json.dumps(matching_ips((ip for (ip,) in self._query("SELECT src FROM packets UNION SELECT dst FROM packets")), text))
+        clauses = ["src IN (SELECT value FROM json_each(?))", "dst IN (SELECT value FROM json_each(?))"]
+        params = [ips, ips]
+        if port is not None:
+            clauses.append("(proto IN (?, ?) AND (sport = ? OR dport = ?))")
+            params += [PROTO_CODES['TCP'], PROTO_CODES['UDP'], port, port]
+        if proto is not None:
+            clauses.append("proto = ?")
+            params.append(proto)
+        for column in ('rule', 'behavior', 'iface'):
+            clauses.append(f"instr(lower({column}), ?) > 0")
+            params.append(text)
+        return f"({' OR '.join(clauses)})", params
+
+    def display_rows(self, ids):
+        """(id, thời gian, tóm tắt, phán quyết) cho danh sách giám sát, truy vấn theo từng phần."""
+        columns = [FIELDS.index(name) for name in ('id', 'ts', 'verdict', 'raw', 'linktype')]
+        for start in range(0, len(ids), QUERY_CHUNK):
+            chunk = [int(packet_id) for packet_id in ids[start:start + QUERY_CHUNK]]
+            # (CẬP NHẬT) Dòng còn trong bộ nhớ đệm nóng không cần truy vấn (và không phải chờ luồng ghi)
+            rows = {}
+            for packet_id in chunk:
+                row = self._cached_row(packet_id)
+                if row is not None:
+                    rows[packet_id] = tuple(row[i] for i in columns)
+            missing = [packet_id for packet_id in chunk if packet_id not in rows]
+            if missing:
+                sql = f"SELECT id, ts, verdict, raw, linktype FROM packets WHERE id IN ({', '.join('?' * len(missing))})"
+                rows.update((row[0], row) for row in self._query(sql, missing))
+            for packet_id in chunk:
+                if packet_id not in rows:
+                    continue
+                _, ts, verdict, raw, linktype = rows[packet_id]
+                summary = self._summary_cache.get(packet_id, lambda _: PacketView.from_bytes(raw, ts, linktype))
+                yield packet_id, format_event_time(ts), summary, VERDICTS[verdict]
+
+    def alerts(self):
+        """Các dòng cảnh báo (danger / anomaly) dạng dict gọn cho báo cáo PDF."""
+        sql = f"{SELECT_SQL} WHERE verdict IN (?, ?) ORDER BY id"
+        for values in self._iter_query(sql, (VERDICT_CODES['danger'], VERDICT_CODES['anomaly'])):
+            row = dict(zip(FIELDS, values))
+            yield {
+                'id': row['id'],
+                'time': format_event_time(row['ts']),
+                'summary': PacketView.from_bytes(row['raw'], row['ts'], row['linktype']).summary(),
+                'rule_analysis': row['rule'] or "",
+                'behavior_analysis': row['behavior'] or "",
+                'prediction': row['prediction'] or None,
+                'features': self._features(row),
+            }
+
+    def total_count(self):
+        return self._count
+
+    def trim(self):
+        """Phiên trên đĩa không có cửa sổ lưu giữ (bộ nhớ đã không tăng theo thời gian)."""
+
+    def verdict_counts(self):
+        return self._verdict_counts.copy()
+
+    def proto_counts(self):
+        return Counter(self._proto_counts)
+
+    def _fold_top(self):
+        """Cộng khóa IP / cổng của các gói mới vào bản tóm tắt Top-k (một lần vector hóa cho cả lô)."""
+        with self._count_lock:
+            if self._ip_top is None:
+                # Phiên mở lại: đọc lại từ chỉ mục (GROUP BY src / dst, proto / dport), cộng theo từng phần
+                sql = ("SELECT ip, SUM(n) FROM ("
+                       "SELECT src AS ip, COUNT(*) AS n FROM packets WHERE ip_version = 4 GROUP BY src "
+                       "UNION ALL SELECT dst, COUNT(*) FROM packets WHERE ip_version = 4 GROUP BY dst"
+                       ") GROUP BY ip")
+                self._ip_top = self._query_top(sql)
+                sql = "SELECT proto * 65536 + dport, COUNT(*) FROM packets WHERE proto IN (?, ?) GROUP BY proto, dport"
+                self._port_top = self._query_top(sql, (PROTO_CODES['TCP'], PROTO_CODES['UDP']))
+                self._ip_pending, self._port_pending = [], []
+            if self._ip_pending:
+                pending, self._ip_pending = self._ip_pending, []
+                self._ip_top.update(np.array(pending, dtype=np.int64))
+            if self._port_pending:
+                pending, self._port_pending = self._port_pending, []
+                self._port_top.update(np.array(pending, dtype=np.int64))
+
+    def _query_top(self, sql, params=()):
+        sketch = HeavyHitters(self.top_capacity)
+        rows = []
+        for row in self._iter_query(sql, params, chunk=PENDING_KEYS):
+            rows.append(row)
+            if len(rows) >= PENDING_KEYS:
+                sketch.add_counts(*zip(*rows))
+                rows = []
+        if rows:
+            sketch.add_counts(*zip(*rows))
+        return sketch
+
+    def _fold_distinct(self):
+        """Cộng các gói IPv4 mới vào số liệu khác nhau (phiên mở lại: đọc lại các gói theo từng phần, lần đầu cần)."""
+        with self._count_lock:
+            if self._distinct is None:
+                self._distinct = DistinctCounts(self.distinct_window, self.distinct_keys)
+                sql = ("SELECT ts, src, dst, CASE WHEN proto IN (?, ?) THEN dport ELSE 0 END FROM packets "
+                       "WHERE ip_version = 4 ORDER BY id")
+                rows = []
+                for row in self._iter_query(sql, (PROTO_CODES['TCP'], PROTO_CODES['UDP']), chunk=PENDING_KEYS):
+                    rows.append(row)
+                    if len(rows) >= PENDING_KEYS:
+                        self._distinct.add(*np.array(rows, dtype=np.float64).T)
+                        rows = []
+                if rows:
+                    self._distinct.add(*np.array(rows, dtype=np.float64).T)
+                self._distinct_pending = []
+            if self._distinct_pending:
+                pending, self._distinct_pending = self._distinct_pending, []
+                self._distinct.add(*np.array(pending, dtype=np.float64).T)
+
+    def distinct_counts(self):
+        """(MỚI) Số liệu khác nhau (HyperLogLog) của toàn phiên và cửa sổ gần nhất. Chỉ đọc."""
+        self._fold_distinct()
+        return self._distinct
+
+    def ip_counts(self, limit=None):
+        """(CẬP NHẬT) Số lần của các IPv4 nguồn + đích nhiều nhất (limit mục, None: mọi mục đang theo dõi)."""
+        self._fold_top()
+        return ip_counter(self._ip_top, limit)
+
+    def port_counts(self, limit=None):
+        """(CẬP NHẬT) Số lần của các cổng đích TCP/UDP nhiều nhất, dạng '443/TCP'."""
+        self._fold_top()
+        return port_counter(self._port_top, limit)
+
+    def count_errors(self):
+        """(MỚI) Sai số tối đa (số gói) của ip_counts / port_counts."""
+        self._fold_top()
+        return {'ips': self._ip_top.error, 'ports': self._port_top.error}
+
+    def _grouped_series(self, start, end, bucket, max_buckets):
+        """Chuỗi thời gian của đoạn [start, end) gộp sẵn trong SQLite (GROUP BY khoảng, giao thức, phán quyết; dùng chỉ mục ts)."""
+        origin = np.floor(start / bucket) * bucket
+        series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)), bucket=bucket, max_buckets=max_buckets, start=origin)
+        sql = ("SELECT CAST((ts - ?) / ? AS INTEGER) AS b, proto, verdict, COUNT(*), SUM(length) FROM packets "
+               "WHERE ts >= ? AND ts < ? GROUP BY b, proto, verdict")
+        rows = self._query(sql, (origin, bucket, start, end))
+        if rows:
+            b, proto, verdict, count, length = np.array(rows, dtype=np.float64).T
+            series.add(origin + (b + 0.5) * bucket, proto, verdict, length, packets=count)
+        return series
+
+    def _fold_series(self):
+        """Cộng các gói mới vào chuỗi thời gian (phiên mở lại: gộp lại trong SQLite, lần đầu cần)."""
+        with self._count_lock:
+            if self._series is None:
+                first, last = self._query("SELECT MIN(ts), MAX(ts) FROM packets")[0]
+                if first is None:
+                    self._series = TrafficSeries((len(PROTO_NAMES), len(VERDICTS)))
+                else:
+                    self._series = self._grouped_series(first, np.nextafter(last, np.inf), SERIES_BUCKET_SECONDS, SERIES_MAX_BUCKETS)
+                self._series_pending = []
+            if self._series_pending:
+                pending, self._series_pending = self._series_pending, []
+                ts, proto, verdict, length = np.array(pending, dtype=np.float64).T
+                self._series.add(ts, proto, verdict, length)
+
+    def traffic_series(self):
+        """(MỚI) Chuỗi thời gian lưu lượng của toàn phiên (cộng dồn khi thêm; phiên mở lại: gộp trong SQLite). Chỉ đọc."""
+        self._fold_series()
+        return self._series
+
+    def traffic_between(self, start, end, bucket):
+        """(MỚI) Chuỗi thời gian chi tiết (khoảng rộng bucket giây) cho đoạn [start, end), khi phóng to biểu đồ lưu lượng."""
+        return self._grouped_series(start, end, bucket, np.ceil((end - start) / bucket) + 2)
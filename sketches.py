@@ -0,0 +1,442 @@
+# file: sketches.py
+# -*- coding: utf-8 -*-
+
+import base64
+import math
+from array import array
+
+import numpy as np
+
+# (MỚI) Cấu trúc tóm tắt dòng dữ liệu (streaming sketch) có bộ nhớ cố định cho thống kê của phiên dài:
+# số mục không tăng theo số IP / cổng khác nhau (quét cổng, giả mạo IP nguồn), cộng theo lô NumPy khi gói tin đến
+# và gộp (merge) được giữa các lô, phần gói đã bị loại khỏi cửa sổ lưu giữ và các phiên đã lưu.
+HEAVY_HITTER_CAPACITY = 4096    # Số mục mặc định của một bản tóm tắt Top-k (mỗi mục 16 byte)
+# (MỚI) Đếm số phần tử khác nhau (HyperLogLog): 2^precision thanh ghi 1 byte mỗi khóa, sai số chuẩn ~1,04 / sqrt(2^precision)
+HLL_PRECISION = 10              # 1 KiB mỗi khóa, sai số chuẩn ~3,3 %
+DISTINCT_MAX_KEYS = 1024        # Số khóa (máy) tối đa của mỗi bảng đếm khác nhau
+DISTINCT_WINDOW_SECONDS = 60    # Độ dài cửa sổ thời gian của số liệu "cửa sổ gần nhất"
+# Các số liệu đếm khác nhau: tên -> (mô tả khóa, mô tả giá trị được đếm)
+DISTINCT_METRICS = {
+    'sources_per_dst': ("Đích", "IP nguồn khác nhau"),
+    'ports_per_src': ("Nguồn", "Cổng đích khác nhau"),
+    'peers_per_host': ("Máy", "Máy đối tác khác nhau"),
+}
+_MASK64 = (1 << 64) - 1
+_RANK_WEIGHTS = 2.0 ** -np.arange(66)      # 2^-giá trị thanh ghi (mảng cho bảng NumPy)
+_WEIGHTS = _RANK_WEIGHTS.tolist()            # (danh sách float cho đường thuần Python)
+
+
+class HeavyHitters:
+    """
+    Tóm tắt Top-k (Misra-Gries, tương đương Space-Saving) trên khóa số nguyên không âm, tối đa capacity mục.
+    Mỗi lần cộng (update / merge): cộng số đếm theo khóa, nếu vượt capacity mục thì trừ mọi số đếm đi giá trị lớn
+    thứ capacity+1 và bỏ các mục không còn dương; decrement là tổng đã trừ.
+    Với mọi khóa: counts[khóa] <= số lần thật <= counts[khóa] + decrement (khóa vắng mặt: counts = 0), và
+    decrement <= total / (capacity + 1). Khi số khóa khác nhau không vượt capacity, kết quả đúng tuyệt đối.
+    """
+    def __init__(self, capacity=HEAVY_HITTER_CAPACITY):
+        self.capacity = max(1, int(capacity))
+        self.keys = np.empty(0, dtype=np.int64)      # Tăng dần
+        self.counts = np.empty(0, dtype=np.int64)
+        self.decrement = 0
+        self.total = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def error(self):
+        """Sai số tối đa của mọi ước lượng (số lần)."""
+        return self.decrement
+
+    def update(self, values):
+        """Cộng một lô khóa (mảng số nguyên, mỗi phần tử một lần)."""
+        values = np.asarray(values)
+        if len(values):
+            keys, counts = np.unique(values, return_counts=True)
+            self.add_counts(keys, counts)
+
+    def add_counts(self, keys, counts):
+        """Cộng một lô (khóa, số lần) (khóa không cần khác nhau)."""
+        keys = np.asarray(keys, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if not len(keys):
+            return
+        all_keys = np.concatenate((self.keys, keys))
+        all_counts = np.concatenate((self.counts, counts))
+        order = np.argsort(all_keys, kind='stable')
+        all_keys = all_keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], all_keys[1:] != all_keys[:-1])))
+        self.keys = all_keys[starts]
+        self.counts = np.add.reduceat(all_counts[order], starts)
+        self.total += int(counts.sum())
+        self._shrink()
+
+    def merge(self, other):
+        """Gộp một bản tóm tắt khác (lô khác, luồng khác, phiên đã lưu); sai số của hai bên được cộng lại."""
+        self.add_counts(other.keys, other.counts)
+        self.total += other.total - int(other.counts.sum())
+        self.decrement += other.decrement
+        return self
+
+    def _shrink(self):
+        if len(self.keys) <= self.capacity:
+            return
+        cut = int(np.partition(self.counts, len(self.counts) - self.capacity - 1)[len(self.counts) - self.capacity - 1])
+        counts = self.counts - cut
+        keep = counts > 0
+        self.keys, self.counts = self.keys[keep], counts[keep]
+        self.decrement += cut
+
+    def top(self, n=None):
+        """n khóa (None: mọi khóa đang giữ) có số đếm lớn nhất: danh sách (khóa, số đếm chắc chắn), giảm dần.
+        Số thật của mỗi khóa lớn hơn số đếm không quá error."""
+        order = np.argsort(-self.counts, kind='stable')[:n]
+        return [(int(k), int(c)) for k, c in zip(self.keys[order], self.counts[order])]
+
+    def nbytes(self):
+        return self.keys.nbytes + self.counts.nbytes
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'keys': self.keys.tolist(), 'counts': self.counts.tolist(),
+                'decrement': self.decrement, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data, capacity=None):
+        sketch = cls(capacity or data['capacity'])
+        sketch.add_counts(data['keys'], data['counts'])
+        sketch.total = int(data['total'])
+        sketch.decrement += int(data['decrement'])
+        return sketch
+
+
+def mix64(value):
+    """Băm 64 bit (splitmix64) của một số nguyên không âm; cùng kết quả với hash64 (vector hóa)."""
+    z = (value + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def hash64(values):
+    """mix64 trên cả mảng số nguyên (phép nhân uint64 của NumPy tràn vòng như & _MASK64)."""
+    z = np.asarray(values).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _registers(hashes, precision):
+    # precision bit đầu: chỉ số thanh ghi; phần còn lại: vị trí bit 1 đầu tiên (số 0 đứng đầu + 1)
+    shift = 64 - precision
+    index = (hashes >> np.uint64(shift)).astype(np.int64)
+    rest = hashes & np.uint64((1 << shift) - 1)
+    # Độ dài bit tính trên hai nửa 32 bit (float64 biểu diễn đúng mọi số 32 bit)
+    high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    rank = shift + 1 - np.where(high > 0, high + 32, low)
+    return index, rank.astype(np.uint8)
+
+
+def _unique_counts(values):
+    # Giá trị khác nhau (tăng dần) và số lần: sắp xếp một lần (nhanh hơn np.unique theo bảng băm trên lô lớn)
+    values = np.sort(values)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+def _unique_inverse(values):
+    # Giá trị khác nhau (tăng dần) và chỉ số của từng phần tử trong đó: unique[inverse] == values
+    order = np.argsort(values)
+    values = values[order]
+    first = np.concatenate(([True], values[1:] != values[:-1]))
+    inverse = np.empty(len(values), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return values[first], inverse
+
+
+def _alpha(m):
+    return 0.7213 / (1 + 1.079 / m)
+
+
+def _estimate(inv_sum, zeros, m):
+    """Ước lượng HyperLogLog từ tổng 2^-thanh ghi; vùng nhỏ (còn thanh ghi 0) dùng đếm tuyến tính."""
+    raw = _alpha(m) * m * m / inv_sum
+    if zeros and raw <= 2.5 * m:
+        return m * math.log(m / zeros)
+    return raw
+
+
+class HyperLogLog:
+    """
+    Đếm số giá trị khác nhau (số nguyên không âm) với bộ nhớ tối đa 2^precision byte, dù có bao nhiêu giá trị.
+    add() từng giá trị (thuần Python, dùng trên đường phân tích từng gói); count() O(1) nhờ giữ sẵn tổng 2^-thanh ghi.
+    Khi mới chạm ít thanh ghi, chỉ giữ các thanh ghi khác 0 (mảng (chỉ số << 8 | giá trị)), nên bộ đếm của hàng
+    triệu nguồn giả mạo mỗi nguồn một gói vẫn nhỏ. Gộp (merge) được giữa các cửa sổ / tiến trình cùng precision.
+    """
+    __slots__ = ('precision', 'm', 'registers', '_sparse', '_zeros', '_inv_sum')
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = int(precision)
+        self.m = 1 << self.precision
+        self.registers = None
+        self._sparse = array('I')
+        self._zeros = self.m
+        self._inv_sum = float(self.m)
+
+    def add(self, value):
+        """Thêm một giá trị; trả về True nếu ước lượng có thể đã thay đổi (một thanh ghi tăng)."""
+        shift = 64 - self.precision
+        h = mix64(value)
+        index = h >> shift
+        rank = shift + 1 - (h & ((1 << shift) - 1)).bit_length()
+        if self.registers is None:
+            sparse = self._sparse
+            for i, packed in enumerate(sparse):
+                if packed >> 8 == index:
+                    old = packed & 0xFF
+                    if rank <= old:
+                        return False
+                    sparse[i] = index << 8 | rank
+                    self._inv_sum += _WEIGHTS[rank] - _WEIGHTS[old]
+                    return True
+            sparse.append(index << 8 | rank)
+            self._inv_sum += _WEIGHTS[rank] - 1.0
+            self._zeros -= 1
+            if len(sparse) > self.m // 16:
+                self.registers = self.dense()
+                self._sparse = None
+            return True
+        old = self.registers[index]
+        if rank <= old:
+            return False
+        self.registers[index] = rank
+        self._inv_sum += _WEIGHTS[rank] - _WEIGHTS[old]
+        if not old:
+            self._zeros -= 1
+        return True
+
+    def dense(self):
+        """Mọi thanh ghi (bytearray 2^precision byte)."""
+        if self.registers is not None:
+            return self.registers
+        registers = bytearray(self.m)
+        for packed in self._sparse:
+            registers[packed >> 8] = packed & 0xFF
+        return registers
+
+    def count(self):
+        return _estimate(self._inv_sum, self._zeros, self.m)
+
+    def merge(self, other):
+        registers = np.maximum(np.frombuffer(self.dense(), dtype=np.uint8), np.frombuffer(other.dense(), dtype=np.uint8))
+        self.registers = bytearray(registers.tobytes())
+        self._sparse = None
+        self._zeros = int((registers == 0).sum())
+        self._inv_sum = float(_RANK_WEIGHTS[registers].sum())
+        return self
+
+    def nbytes(self):
+        return len(self.registers) if self.registers is not None else self._sparse.itemsize * len(self._sparse)
+
+
+class KeyedHyperLogLog:
+    """
+    Một HyperLogLog cho mỗi khóa (vd: số IP nguồn khác nhau của mỗi IP đích), mọi thanh ghi trong một mảng
+    NumPy (số khóa x 2^precision), cộng theo lô (vector hóa). Khóa và giá trị là số nguyên 32 bit (IPv4, cổng).
+    Tối đa max_keys khóa: khi vượt, giữ các khóa có ước lượng lớn nhất (khóa mới xếp theo số thanh ghi khác nhau
+    trong lô, hòa thì giữ khóa cũ), nên bộ nhớ cố định dù có bao nhiêu nguồn giả mạo; số khóa bị bỏ ở dropped.
+    """
+    def __init__(self, precision=HLL_PRECISION, max_keys=DISTINCT_MAX_KEYS):
+        self.precision = int(precision)
+        self.m = 1 << self.precision
+        self.max_keys = max(1, int(max_keys))
+        self.keys = np.empty(0, dtype=np.int64)      # Tăng dần, dòng i của registers
+        self.registers = np.zeros((0, self.m), dtype=np.uint8)
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, keys, values):
+        """Cộng các cặp (khóa, giá trị)."""
+        self.add_hashes(keys, hash64(values))
+
+    def add_hashes(self, keys, hashes):
+        """Như add() với giá trị đã băm sẵn (hash64), khi một giá trị được đếm trong nhiều bảng."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return
+        index, rank = _registers(hashes, self.precision)
+        # Tìm dòng cho các khóa khác nhau của lô (ít hơn nhiều so với số gói) rồi trải lại cho từng gói
+        unique, inverse = _unique_inverse(keys)
+        rows, found = self._rows(unique)
+        if not found.all():
+            # Điểm của khóa mới: số thanh ghi khác nhau nó chạm tới trong lô (xấp xỉ số giá trị khác nhau)
+            fresh = ~found[inverse]
+            pairs, _ = _unique_counts(keys[fresh] * self.m + index[fresh])
+            new, scores = _unique_counts(pairs // self.m)
+            self._admit(new, scores)
+            rows, found = self._rows(unique)
+        rows, found = rows[inverse], found[inverse]
+        np.maximum.at(self.registers, (rows[found], index[found]), rank[found])
+
+    def _rows(self, keys):
+        rows = np.searchsorted(self.keys, keys)
+        rows = np.minimum(rows, max(0, len(self.keys) - 1))
+        found = self.keys[rows] == keys if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        return rows, found
+
+    def _admit(self, new, scores):
+        """Thêm dòng cho các khóa mới (tăng dần, chưa có); vượt max_keys thì chỉ giữ các khóa điểm cao nhất."""
+        if len(self.keys) + len(new) > self.max_keys:
+            old_scores = self.estimates()
+            order = np.argsort(-np.concatenate((old_scores, scores)), kind='stable')[:self.max_keys]
+            keep_old = np.sort(order[order < len(self.keys)])
+            new = np.sort(new[order[order >= len(self.keys)] - len(self.keys)])
+            self.dropped += len(self.keys) + len(scores) - self.max_keys
+            self.keys, self.registers = self.keys[keep_old], self.registers[keep_old]
+        if not len(new):
+            return
+        keys = np.concatenate((self.keys, new))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.registers = np.concatenate((self.registers, np.zeros((len(new), self.m), dtype=np.uint8)))[order]
+
+    def merge(self, other):
+        """Gộp bảng khác cùng precision (cửa sổ khác, tiến trình khác): max từng thanh ghi của cùng khóa."""
+        rows, found = self._rows(other.keys)
+        if not found.all():
+            self._admit(other.keys[~found], other.estimates()[~found])
+            rows, found = self._rows(other.keys)
+        self.registers[rows[found]] = np.maximum(self.registers[rows[found]], other.registers[found])
+        self.dropped += other.dropped
+        return self
+
+    def copy(self):
+        table = KeyedHyperLogLog(self.precision, self.max_keys)
+        table.keys, table.registers, table.dropped = self.keys.copy(), self.registers.copy(), self.dropped
+        return table
+
+    def estimates(self):
+        """Ước lượng số giá trị khác nhau của từng khóa (cùng thứ tự với keys)."""
+        if not len(self.keys):
+            return np.empty(0)
+        m = self.m
+        inv_sum = _RANK_WEIGHTS[self.registers].sum(axis=1)
+        zeros = (self.registers == 0).sum(axis=1)
+        raw = _alpha(m) * m * m / inv_sum
+        linear = m * np.log(m / np.maximum(zeros, 1))
+        return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+    def top(self, n):
+        """n khóa có nhiều giá trị khác nhau nhất: danh sách (khóa, ước lượng làm tròn), giảm dần."""
+        estimates = self.estimates()
+        order = np.argsort(-estimates, kind='stable')[:n]
+        return [(int(self.keys[i]), int(round(estimates[i]))) for i in order]
+
+    def nbytes(self):
+        return self.keys.nbytes + self.registers.nbytes
+
+    def to_dict(self):
+        return {'precision': self.precision, 'max_keys': self.max_keys, 'keys': self.keys.tolist(),
+                'registers': base64.b64encode(self.registers.tobytes()).decode('ascii'), 'dropped': self.dropped}
+
+    @classmethod
+    def from_dict(cls, data, max_keys=None):
+        saved = cls(data['precision'], max(1, len(data['keys'])))
+        saved.keys = np.array(data['keys'], dtype=np.int64)
+        saved.registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).reshape(len(saved.keys), saved.m).copy()
+        saved.dropped = int(data['dropped'])
+        return cls(saved.precision, max_keys or data['max_keys']).merge(saved)
+
+
+class DistinctCounts:
+    """
+    Các số liệu đếm khác nhau của lưu lượng IPv4 (DISTINCT_METRICS): số IP nguồn khác nhau của mỗi đích
+    (DDoS / nguồn giả mạo), số cổng đích khác nhau của mỗi nguồn (quét cổng), số máy đối tác của mỗi máy (quét mạng),
+    cho toàn phiên và cho cửa sổ window_seconds gần nhất (window, bắt đầu tại window_start).
+    Gói tin chỉ được cộng vào bảng của cửa sổ; khi sang cửa sổ mới, cửa sổ cũ được gộp vào session (các cửa sổ đã qua
+    và gói đến trễ), số liệu toàn phiên = session gộp với cửa sổ hiện tại, nên mỗi gói chỉ băm / cộng một lần.
+    Thêm cùng một gói nhiều lần không đổi kết quả, nên kho mở lại có thể cộng lại các dòng đã có trong bản lưu.
+    """
+    def __init__(self, window_seconds=DISTINCT_WINDOW_SECONDS, max_keys=DISTINCT_MAX_KEYS, precision=HLL_PRECISION):
+        self.window_seconds = max(1.0, float(window_seconds))
+        self.max_keys = int(max_keys)
+        self.precision = int(precision)
+        self.session = self._tables()
+        self.window = self._tables()
+        self.window_start = None
+
+    def _tables(self):
+        return {name: KeyedHyperLogLog(self.precision, self.max_keys) for name in DISTINCT_METRICS}
+
+    def add(self, ts, src, dst, dport):
+        """Cộng một lô gói IPv4 (mảng cột): thời điểm, IP nguồn / đích (số nguyên), cổng đích (0: không có)."""
+        ts = np.asarray(ts, dtype=np.float64)
+        if not len(ts):
+            return
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        dport = np.asarray(dport, dtype=np.int64)
+        start = np.floor(ts.max() / self.window_seconds) * self.window_seconds
+        if self.window_start is None or start > self.window_start:
+            self._roll(start)
+        hashes = (hash64(src), hash64(dst), hash64(dport))
+        current = ts >= self.window_start
+        if current.all():
+            self._add(self.window, src, dst, dport, hashes)
+            return
+        late = ~current
+        self._add(self.session, src[late], dst[late], dport[late], tuple(h[late] for h in hashes))
+        if current.any():
+            self._add(self.window, src[current], dst[current], dport[current], tuple(h[current] for h in hashes))
+
+    def _roll(self, start):
+        """Bắt đầu cửa sổ mới tại start; cửa sổ hiện tại được gộp vào session."""
+        if self.window_start is not None:
+            for name in DISTINCT_METRICS:
+                self.session[name].merge(self.window[name])
+        self.window, self.window_start = self._tables(), start
+
+    @staticmethod
+    def _add(tables, src, dst, dport, hashes):
+        src_hash, dst_hash, port_hash = hashes
+        tables['sources_per_dst'].add_hashes(dst, src_hash)
+        ported = dport > 0
+        tables['ports_per_src'].add_hashes(src[ported], port_hash[ported])
+        tables['peers_per_host'].add_hashes(np.concatenate((src, dst)), np.concatenate((dst_hash, src_hash)))
+
+    def merge(self, other):
+        """Gộp số liệu của kho / tiến trình khác; cửa sổ gần nhất lấy theo bên có cửa sổ muộn hơn."""
+        for name in DISTINCT_METRICS:
+            self.session[name].merge(other.session[name])
+        if other.window_start is not None:
+            if self.window_start is None or other.window_start > self.window_start:
+                self._roll(other.window_start)
+            tables = self.window if other.window_start == self.window_start else self.session
+            for name in DISTINCT_METRICS:
+                tables[name].merge(other.window[name])
+        return self
+
+    def top(self, scope='window', n=5):
+        """{số liệu: [(khóa, ước lượng)...]} của cửa sổ gần nhất ('window') hoặc toàn phiên ('session')."""
+        if scope == 'window':
+            return {name: self.window[name].top(n) for name in DISTINCT_METRICS}
+        return {name: self.session[name].copy().merge(self.window[name]).top(n) for name in DISTINCT_METRICS}
+
+    def nbytes(self):
+        return sum(table.nbytes() for tables in (self.session, self.window) for table in tables.values())
+
+    def to_dict(self):
+        return {'window_seconds': self.window_seconds, 'window_start': self.window_start, 'precision': self.precision,
+                'session': {name: table.to_dict() for name, table in self.session.items()},
+                'window': {name: table.to_dict() for name, table in self.window.items()}}
+
+    @classmethod
+    def from_dict(cls, data, max_keys=DISTINCT_MAX_KEYS):
+        counts = cls(data['window_seconds'], max_keys, data['precision'])
+        counts.window_start = data['window_start']
+        counts.session = {name: KeyedHyperLogLog.from_dict(data['session'][name], max_keys) for name in DISTINCT_METRICS}
+        counts.window = {name: KeyedHyperLogLog.from_dict(data['window'][name], max_keys) for name in DISTINCT_METRICS}
+        return counts
@@ -0,0 +1,166 @@
+# file: time_series.py
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# (MỚI) Chuỗi thời gian lưu lượng cho Tab Thống kê: số gói / số byte theo từng khoảng thời gian cố định (bucket),
+# tách theo từng ô (giao thức x phán quyết), cộng dồn khi gói tin đến.
+# Phiên dài: khi vượt SERIES_MAX_BUCKETS khoảng, các cặp khoảng liền nhau được gộp (độ rộng khoảng gấp đôi),
+# nên bộ nhớ và chi phí vẽ không tăng theo thời gian của phiên. Chi tiết mịn hơn khi phóng to một đoạn thời gian
+# được tính lại từ các gói trong kho (PacketStore / SessionDatabase .traffic_between).
+SERIES_BUCKET_SECONDS = 1.0
+SERIES_MAX_BUCKETS = 1 << 14     # ~4,5 giờ ở 1 giây / khoảng, sau đó gộp đôi
+SERIES_MAX_POINTS = 600          # Số điểm tối đa của mỗi đường sau khi giảm mẫu (LTTB)
+# Các độ rộng khoảng "tròn" khi tính lại chi tiết cho đoạn đang phóng to (giây)
+NICE_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600)
+
+
+def nice_bucket(span, points=SERIES_MAX_POINTS):
+    """Độ rộng khoảng tròn nhỏ nhất để đoạn dài span giây có không quá points khoảng."""
+    target = span / max(1, points)
+    for bucket in NICE_BUCKETS:
+        if bucket >= target:
+            return float(bucket)
+    return float(NICE_BUCKETS[-1] * np.ceil(target / NICE_BUCKETS[-1]))
+
+
+class TrafficSeries:
+    """
+    Số gói và số byte theo khoảng thời gian cố định, mỗi khoảng một dòng gồm shape[0] x shape[1] ô
+    (giao thức x phán quyết; mã do kho gói tin quy định). start: thời điểm bắt đầu khoảng 0 (epoch, giây).
+    add() nhận các mảng cột (vector hóa, một lần bincount), có thể là các dòng đã gộp sẵn (trọng số packets).
+    """
+    def __init__(self, shape, bucket=SERIES_BUCKET_SECONDS, max_buckets=SERIES_MAX_BUCKETS, start=None):
+        self.shape = tuple(shape)
+        self.cells = int(np.prod(self.shape))
+        self.bucket = float(bucket)
+        self.max_buckets = max(2, int(max_buckets))
+        self.start = start
+        self.size = 0
+        capacity = min(256, self.max_buckets)
+        self._packets = np.zeros((capacity, self.cells), dtype=np.int64)
+        self._bytes = np.zeros((capacity, self.cells), dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, size):
+        capacity = len(self._packets)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ('_packets', '_bytes'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, self.cells), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _rollup(self):
+        """Gộp từng cặp khoảng liền nhau: độ rộng khoảng gấp đôi, số khoảng giảm một nửa."""
+        n = self.size
+        half = (n + 1) // 2
+        for arr in (self._packets, self._bytes):
+            merged = arr[0:n:2].copy()
+            merged[:n // 2] += arr[1:n:2]
+            arr[:half] = merged
+            arr[half:n] = 0
+        self.size = half
+        self.bucket *= 2
+
+    def _prepend(self, lo):
+        """Thêm khoảng trống phía trước cho gói có thời điểm sớm hơn start (gói đến trễ, file pcap không theo thứ tự)."""
+        while True:
+            count = int(np.ceil((self.start - lo) / self.bucket))
+            if self.size + count <= self.max_buckets:
+                break
+            self._rollup()
+        self._reserve(self.size + count)
+        for arr in (self._packets, self._bytes):
+            arr[count:count + self.size] = arr[:self.size].copy()
+            arr[:count] = 0
+        self.start -= count * self.bucket
+        self.size += count
+
+    def add(self, ts, proto, verdict, length, packets=None):
+        ts = np.asarray(ts, dtype=np.float64)
+        if not len(ts):
+            return
+        lo, hi = float(ts.min()), float(ts.max())
+        if self.start is None:
+            self.start = np.floor(lo / self.bucket) * self.bucket
+        if lo < self.start:
+            self._prepend(lo)
+        while int((hi - self.start) / self.bucket) >= self.max_buckets:
+            self._rollup()
+        # floor((ts - start) / bucket), như CAST(... AS INTEGER) của SQLite: hai kho chia khoảng giống nhau
+        idx = np.floor((ts - self.start) / self.bucket).astype(np.int64)
+        base, last = int(idx.min()), int(idx.max())
+        span = last - base + 1
+        self._reserve(last + 1)
+        key = (idx - base) * self.cells + np.asarray(proto, dtype=np.int64) * self.shape[1] + np.asarray(verdict, dtype=np.int64)
+        counts = np.bincount(key, weights=packets, minlength=span * self.cells).reshape(span, self.cells)
+        self._packets[base:last + 1] += counts.astype(np.int64)
+        self._bytes[base:last + 1] += np.bincount(key, weights=np.asarray(length, dtype=np.float64), minlength=span * self.cells).reshape(span, self.cells)
+        self.size = max(self.size, last + 1)
+
+    def span(self):
+        """(đầu, cuối) của đoạn thời gian có dữ liệu (epoch), hoặc None."""
+        if self.start is None or not self.size:
+            return None
+        return self.start, self.start + self.size * self.bucket
+
+    def rates(self, metric='packets', axis=0, start=None, end=None):
+        """
+        Tốc độ trung bình mỗi khoảng (đơn vị / giây) trong [start, end):
+        metric 'packets' hoặc 'bytes'; axis 0: tách theo chiều thứ nhất của shape (giao thức), 1: theo chiều thứ hai (phán quyết).
+        Trả về (x: thời điểm đầu mỗi khoảng, y: mảng số_khoảng x số_nhóm).
+        """
+        groups = self.shape[axis]
+        if not self.size:
+            return np.empty(0), np.empty((0, groups))
+        lo = 0 if start is None else min(self.size, max(0, int(np.floor((start - self.start) / self.bucket))))
+        hi = self.size if end is None else min(self.size, max(lo, int(np.ceil((end - self.start) / self.bucket))))
+        data = (self._packets if metric == 'packets' else self._bytes)[lo:hi].reshape(hi - lo, *self.shape)
+        y = data.sum(axis=2 - axis) / self.bucket
+        x = self.start + np.arange(lo, hi) * self.bucket
+        return x, y
+
+
+def lttb(x, y, threshold):
+    """
+    Giảm mẫu Largest-Triangle-Three-Buckets: giữ threshold điểm (đầu, cuối và trong mỗi nhóm điểm tạo tam giác
+    lớn nhất với điểm đã chọn trước đó và trung bình nhóm kế tiếp), giữ được hình dạng và các đỉnh của đường.
+    y: một đường (n,) hoặc nhiều đường cùng trục x (n, k), được giảm mẫu cùng lúc (mỗi đường chỉ số riêng).
+    Trả về chỉ số các điểm được giữ, cùng hình dạng (threshold,) / (threshold, k).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    single = y.ndim == 1
+    if single:
+        y = y[:, None]
+    n, k = y.shape
+    if threshold >= n or threshold < 3:
+        keep = np.repeat(np.arange(n)[:, None], k, axis=1)
+        return keep[:, 0] if single else keep
+    # Nhóm i (0..threshold-3) gồm các điểm [edges[i], edges[i+1]); điểm đầu và cuối luôn được giữ
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1], axis=0) / sizes[:, None]
+    keep = np.empty((threshold, k), dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    cols = np.arange(k)
+    a = np.zeros(k, dtype=np.int64)
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 1 < threshold - 2:
+            cx, cy = mean_x[i + 1], mean_y[i + 1]
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        ax, ay = x[a], y[a, cols]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end, None]) * (cy - ay))
+        a = start + area.argmax(axis=0)
+        keep[i + 1] = a
+    return keep[:, 0] if single else keep
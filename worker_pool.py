@@ -0,0 +1,227 @@
+# file: worker_pool.py
+# -*- coding: utf-8 -*-
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import zlib
+
+from anomaly_detector import AnomalyDetector
+from behavioral_analyzer import BehavioralAnalyzer
+from detection_pipeline import PRUNE_INTERVAL, DetectionPipeline
+from packet_view import PacketView, RawFrame, VLAN_TYPES
+
+# Thứ tự trường của bản ghi kết quả gọn nhẹ (tuple) gửi từ tiến trình con về giao diện
+RECORD_FIELDS = ('raw', 'linktype', 'ip_version', 'src', 'dst', 'sport', 'dport', 'features', 'rule_analysis', 'behavior_analysis',
+                 'proto_name', 'iface', 'timestamp', 'time', 'prediction', 'tag')
+
+
+def shard_of(raw, n_workers):
+    """
+    Chọn tiến trình phân tích cho một khung Ethernet, đọc thẳng từ byte thô.
+    Khóa phân mảnh là địa chỉ NGUỒN (IPv4 src / ARP psrc): mọi gói của cùng một nguồn
+    đi về cùng một tiến trình, nên bộ theo dõi Quét Cổng/Quét Mạng (theo nguồn) luôn nhất quán.
+    Lũ lụt (theo đích, thường từ nhiều nguồn) bị chia ra nhiều tiến trình, nên được kiểm tra ở tiến trình chính.
+    """
+    if n_workers <= 1:
+        return 0
+    offset = 12
+    eth_type = raw[offset:offset + 2]
+    while len(eth_type) == 2 and int.from_bytes(eth_type, "big") in VLAN_TYPES:
+        offset += 4
+        eth_type = raw[offset:offset + 2]
+    offset += 2
+    if eth_type == b"\x08\x00":
+        key = raw[offset + 12:offset + 16]      # IPv4 src
+    elif eth_type == b"\x08\x06":
+        key = raw[offset + 14:offset + 18]      # ARP psrc
+    else:
+        key = raw[6:12]                         # MAC nguồn
+    return zlib.crc32(key) % n_workers
+
+
+def _worker_main(index, in_queue, out_queue, config, target_ips):
+    """
+    Vòng lặp của một tiến trình phân tích: nhận lô byte thô, trả về bản ghi gọn.
+    Mô hình AI do tiến trình chính gửi tới (('model', mô hình, chỉ số)); trước đó các gói chưa được chấm điểm,
+    như giai đoạn huấn luyện khi chạy một tiến trình. Không kiểm tra Lũ lụt (tiến trình chính kiểm tra).
+    """
+    detector = AnomalyDetector(n_packets_to_train=None)
+    analyzer = BehavioralAnalyzer.from_config(config, floods=False)
+
+    results = []
+    pipeline = DetectionPipeline(
+        detector, analyzer,
+        lambda rec: results.append(tuple(rec[k] for k in RECORD_FIELDS)),
+        target_ips=target_ips,
+        batch_size=config.get('batch_size', 256),
+        max_delay=config.get('batch_max_delay_ms', 20) / 1000.0
+    )
+
+    def send_results():
+        if results:
+            out_queue.put((index, list(results)))
+            results.clear()
+
+    while True:
+        try:
+            chunk = in_queue.get(timeout=pipeline.batcher.max_delay)
+        except queue.Empty:
+            pipeline.flush_if_due()
+            send_results()
+            continue
+        if chunk is None:
+            break
+        if isinstance(chunk, tuple):
+            # Các gói nhận trước mô hình được xả (không chấm điểm) trước khi dùng mô hình
+            pipeline.flush()
+            send_results()
+            detector.use_model(chunk[1], chunk[2])
+            continue
+        for raw, ts, linktype, iface in chunk:
+            view = PacketView.from_bytes(raw, ts, linktype)
+            pipeline.process(view, iface)
+        pipeline.flush_if_due()
+        send_results()
+
+    pipeline.flush()
+    send_results()
+    out_queue.put((index, None))
+
+
+class AnalysisWorkerPool:
+    """
+    (MỚI) Tách phân tích ra N tiến trình con để vượt giới hạn GIL.
+    Luồng bắt gói chỉ chia gói tin (byte thô) theo địa chỉ nguồn; mỗi tiến trình chạy bộ phát hiện riêng
+    và gửi bản ghi kết quả gọn về; luồng thu gom gọi on_record(packet_data) trong tiến trình chính.
+    (CẬP NHẬT) Cho kết quả như khi chạy một tiến trình:
+    - Mô hình AI được huấn luyện MỘT lần trong tiến trình chính trên training_packets gói đầu tiên (theo thứ tự bắt)
+      rồi gửi cho mọi tiến trình con (hoặc tải từ model_path), thay vì mỗi tiến trình tự huấn luyện trên phần của nó.
+    - Lũ lụt được kiểm tra trong luồng thu gom trên bản ghi của mọi tiến trình (check_flood). Chỉ gói có bản ghi
+      (gói của IP mục tiêu, thường đã được BPF lọc sẵn) được đếm.
+    """
+    def __init__(self, n_workers, config, on_record, model_path, stats_path, target_ips=None, chunk_size=64):
+        self.n_workers = max(1, int(n_workers))
+        self.config = dict(config)
+        self.on_record = on_record
+        self.model_path = model_path
+        self.stats_path = stats_path
+        self.target_ips = set(target_ips or ())
+        self.chunk_size = chunk_size
+        self.detector = AnomalyDetector(n_packets_to_train=self.config.get('training_packets', 1000))
+        self.flood_analyzer = BehavioralAnalyzer.from_config(self.config)
+        self._last_prune = None
+
+        self._pending = [[] for _ in range(self.n_workers)]
+        self._lock = threading.Lock()
+        self._in_queues = []
+        self._processes = []
+        self._out_queue = None
+        self._collector = None
+
+    def start(self):
+        # "spawn": an toàn khi tiến trình chính có nhiều luồng và Tkinter (giống Windows)
+        ctx = mp.get_context("spawn")
+        self._out_queue = ctx.Queue()
+        for i in range(self.n_workers):
+            in_queue = ctx.Queue(maxsize=1024)
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(i, in_queue, self._out_queue, self.config, self.target_ips),
+                daemon=True
+            )
+            proc.start()
+            self._in_queues.append(in_queue)
+            self._processes.append(proc)
+        # Ứng dụng có thể đã tải mô hình vào chính bộ phát hiện này (dùng để giải thích cảnh báo)
+        if self.detector.is_trained or self.detector.load_model(self.model_path, self.stats_path):
+            self._send_model()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        print(f"[PHÂN TÍCH] Đã khởi động {self.n_workers} tiến trình phân tích.")
+
+    def submit(self, packet, iface=None):
+        """Gửi một gói tin (scapy hoặc RawFrame) tới tiến trình phụ trách (theo địa chỉ nguồn)."""
+        frame = RawFrame.from_packet(packet)
+        self.submit_raw(frame.original, frame.time, frame.linktype, iface)
+
+    def submit_raw(self, raw, timestamp, linktype="Ether", iface=None):
+        idx = shard_of(raw, self.n_workers)
+        with self._lock:
+            chunk = self._pending[idx]
+            chunk.append((raw, timestamp, linktype, iface))
+            if len(chunk) >= self.chunk_size:
+                self._pending[idx] = []
+                self._in_queues[idx].put(chunk)
+            if not self.detector.is_trained:
+                # Giai đoạn huấn luyện: đặc trưng của các gói đầu tiên, theo đúng thứ tự bắt
+                self.detector.process_packet(PacketView.from_bytes(raw, timestamp, linktype))
+                if self.detector.is_trained:
+                    # Các gói đã chia (gồm gói này) không được chấm điểm; mô hình áp dụng từ gói sau
+                    self._flush_locked()
+                    self._send_model()
+
+    def _send_model(self):
+        for in_queue in self._in_queues:
+            in_queue.put(('model', self.detector.model, self.detector.training_stats))
+
+    def _flush_locked(self):
+        for idx, chunk in enumerate(self._pending):
+            if chunk:
+                self._pending[idx] = []
+                self._in_queues[idx].put(chunk)
+
+    def flush_pending(self):
+        """Gửi các lô chưa đầy (gọi định kỳ khi lưu lượng thưa)."""
+        with self._lock:
+            self._flush_locked()
+
+    def stop(self):
+        """Gửi nốt gói tin, chờ mọi tiến trình xử lý xong và thu gom hết kết quả."""
+        self.flush_pending()
+        for in_queue in self._in_queues:
+            in_queue.put(None)
+        if self._collector:
+            self._collector.join()
+        for proc in self._processes:
+            proc.join(timeout=5.0)
+            if proc.is_alive():
+                proc.terminate()
+        # Lưu mô hình vừa huấn luyện (chưa có file)
+        if self.detector.is_trained and not os.path.exists(self.model_path):
+            self.detector.save_model(self.model_path, self.stats_path)
+        print("[PHÂN TÍCH] Đã dừng các tiến trình phân tích.")
+
+    def _collect(self):
+        finished = 0
+        while finished < self.n_workers:
+            try:
+                index, records = self._out_queue.get(timeout=1.0)
+            except queue.Empty:
+                # Tiến trình con bị lỗi/kết thúc bất thường: không chờ mãi
+                if not any(proc.is_alive() for proc in self._processes):
+                    break
+                continue
+            if records is None:
+                finished += 1
+                continue
+            for record in records:
+                record = dict(zip(RECORD_FIELDS, record))
+                self._check_flood(record)
+                self.on_record(record)
+
+    def _check_flood(self, record):
+        """Kiểm tra Lũ lụt trên bản ghi (mọi tiến trình con); cảnh báo thay cho phân tích hành vi của gói, như process_packet."""
+        if not record['ip_version']:
+            return
+        now = record['timestamp']
+        if self._last_prune is None:
+            self._last_prune = now
+        elif now - self._last_prune >= PRUNE_INTERVAL:
+            self._last_prune = now
+            self.flood_analyzer.prune(now)
+        alert = self.flood_analyzer.check_flood(record['dst'], record['features'][1], record['dport'], now)
+        if alert:
+            record['behavior_analysis'] = alert
+            record['tag'] = 'danger'